@@ -0,0 +1,389 @@
+"""
+HTTP API for pushing statements and pulling detected subscriptions without the UI.
+
+Run with:
+    uvicorn api:app --workers 4
+
+Storage goes through supabase_integration (credentials from
+.streamlit/secrets.toml) unless DATABASE_URL is set, in which case rows are
+read and written directly over a Postgres connection pool.
+
+Every /v1 request needs an X-API-Key header. API_KEYS maps each key to the
+user (and optionally the organization) it acts for, e.g.
+"key1=<user uuid>:<org id>,key2=<user uuid>"; the server refuses to start
+without it. A `user_id` or `org_id` passed by the client must match the key's.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+import pandas as pd
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from batch_process import build_batch_categorizer, process_statement
+from instrumentation import span, prometheus_text
+from subscriptions import validate_and_normalize, infer_merchant_from_description
+
+# Largest accepted statement upload
+MAX_UPLOAD_BYTES = int(os.environ.get("API_MAX_UPLOAD_BYTES", 50 * 1024 ** 2))
+
+# Uploads up to this size stay in memory while streaming; larger ones spill to disk
+SPOOL_BYTES = 8 * 1024 ** 2
+
+# Comma-separated "key=user_id[:organization_id]" entries accepted in the X-API-Key header
+API_KEYS = os.environ.get("API_KEYS", "")
+
+# Most rows returned by one /subscriptions page
+MAX_PAGE_SIZE = 1000
+
+
+class Caller:
+    """
+    The user and organization an API key acts for.
+    """
+
+    def __init__(self, user_id, organization_id=None):
+        self.user_id = user_id
+        self.organization_id = organization_id
+
+
+def parse_api_keys(value):
+    """
+    Parse API_KEYS into {key: Caller}.
+    """
+    keys = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        key, _, owner = entry.strip().partition("=")
+        user_id, _, org_id = owner.partition(":")
+        if not key or not user_id:
+            raise ValueError("API_KEYS entries must look like key=user_id or key=user_id:organization_id.")
+        keys[key] = Caller(user_id, int(org_id) if org_id else None)
+    return keys
+
+
+class SupabaseBackend:
+    """
+    Storage through the same functions the Streamlit app uses.
+    """
+
+    def __init__(self):
+        import supabase_integration
+
+        self.db = supabase_integration
+
+    def save_upload(self, user_id, file_name, data, organization_id=None):
+        response = self.db.upload_bank_data(user_id, file_name, data, organization_id)
+        if not response.data:
+            raise ValueError("Error uploading bank data.")
+        return response.data[0]["id"]
+
+    def save_subscriptions(self, user_id, data, organization_id=None):
+        return self.db.save_validated_subscriptions(user_id, data, organization_id)
+
+    def config_store(self):
+        from config_store import ConfigStore, SupabaseConfigBackend
+
+        return ConfigStore(SupabaseConfigBackend())
+
+    def renewal_index(self, config):
+        from renewals import RenewalIndex, SupabaseRenewalBackend
+
+        return RenewalIndex(SupabaseRenewalBackend(), config)
+
+    def fetch_subscriptions(self, user_id, limit, offset):
+        response = (
+            self.db.supabase.table("validated_subscriptions").select("*")
+            .eq("user_id", user_id).order("id").range(offset, offset + limit - 1).execute()
+        )
+        return response.data or []
+
+    def close(self):
+        pass
+
+
+class PostgresBackend:
+    """
+    Storage over a direct Postgres connection pool (self-hosted or a local stand-in).
+    """
+
+    def __init__(self, dsn, max_size=10):
+        from pg_writer import PostgresWriter
+
+        self.writer = PostgresWriter(dsn, min_size=1, max_size=max_size)
+
+    def save_upload(self, user_id, file_name, data, organization_id=None):
+        row = {
+            "user_id": user_id,
+            "file_name": file_name,
+            "data": json.loads(data.to_json(orient="records", date_format="iso")),
+            "uploaded_at": pd.Timestamp.now().isoformat(),
+        }
+        if organization_id is not None:
+            row["organization_id"] = organization_id
+        result = self.writer.insert_returning("uploaded_files", row)
+        return result.data[0]["id"]
+
+    def save_subscriptions(self, user_id, data, organization_id=None):
+        rows = pd.DataFrame({
+            "user_id": user_id,
+            "organization_id": organization_id,
+            "merchant": data["Merchant"],
+            "description": data["Description"] if "Description" in data.columns else None,
+            "amount": data["Amount"],
+            "category": data["Category"],
+        })
+        return self.writer.copy_frame("validated_subscriptions", rows)
+
+    def config_store(self):
+        from config_store import ConfigStore, PostgresConfigBackend
+
+        return ConfigStore(PostgresConfigBackend(self.writer.pool))
+
+    def renewal_index(self, config):
+        from renewals import RenewalIndex, PostgresRenewalBackend
+
+        return RenewalIndex(PostgresRenewalBackend(self.writer), config)
+
+    def fetch_subscriptions(self, user_id, limit, offset):
+        from psycopg.rows import dict_row
+
+        with self.writer.pool.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    "SELECT * FROM public.validated_subscriptions WHERE user_id = %s ORDER BY id LIMIT %s OFFSET %s",
+                    (user_id, limit, offset),
+                )
+                return cur.fetchall()
+
+    def close(self):
+        self.writer.close()
+
+
+def build_backend():
+    dsn = os.environ.get("DATABASE_URL")
+    if dsn:
+        return PostgresBackend(dsn, max_size=int(os.environ.get("DATABASE_POOL_SIZE", 10)))
+    return SupabaseBackend()
+
+
+_categorizers = {}
+_categorizers_lock = threading.Lock()
+
+
+def get_categorizer(org_id=None):
+    """
+    Return the categorizer for an organization, rebuilt only when its
+    keywords change (checked through the config store's version polling).
+    """
+    config = app.state.config.get(org_id)
+    with _categorizers_lock:
+        version, categorizer = _categorizers.get(org_id, (None, None))
+        if categorizer is None or version != config.version:
+            categorizer = build_batch_categorizer(org_id, keywords=config.keywords)
+            _categorizers[org_id] = (config.version, categorizer)
+        return categorizer
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.api_keys = parse_api_keys(API_KEYS)
+    if not app.state.api_keys:
+        # Backends read and write any user's rows, so the API never runs open
+        raise RuntimeError("API_KEYS is not set; configure at least one key=user_id entry.")
+    app.state.backend = build_backend()
+    app.state.config = app.state.backend.config_store()
+    app.state.renewals = app.state.backend.renewal_index(app.state.config)
+    try:
+        yield
+    finally:
+        app.state.backend.close()
+
+
+app = FastAPI(title="trkacka", lifespan=lifespan)
+
+
+def authenticate(request: Request, x_api_key: str = Header(default=None)):
+    """
+    Return the Caller for the request's API key.
+    """
+    caller = getattr(request.app.state, "api_keys", {}).get(x_api_key) if x_api_key else None
+    if caller is None:
+        raise HTTPException(status_code=401, detail="Invalid API key.")
+    return caller
+
+
+def caller_user(caller, user_id=None):
+    """
+    The key's user; a client-supplied `user_id` must name the same user.
+    """
+    if user_id is not None and user_id != caller.user_id:
+        raise HTTPException(status_code=403, detail="user_id does not match the API key.")
+    return caller.user_id
+
+
+def caller_org(caller, org_id=None):
+    """
+    The key's organization; a client-supplied `org_id` must name the same organization.
+    """
+    if org_id is not None and org_id != caller.organization_id:
+        raise HTTPException(status_code=403, detail="org_id does not match the API key.")
+    return caller.organization_id
+
+
+def frame_response(data):
+    """
+    Serialize a DataFrame straight to a JSON response without intermediate dicts.
+    """
+    return Response(data.to_json(orient="records", date_format="iso"), media_type="application/json")
+
+
+async def read_statement(request):
+    """
+    Stream the request body into a spooled temporary file, rejecting oversized uploads.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            spool.close()
+            raise HTTPException(status_code=413, detail="Statement is too large.")
+        spool.write(chunk)
+    if size == 0:
+        spool.close()
+        raise HTTPException(status_code=400, detail="Empty request body.")
+    spool.seek(0)
+    return spool
+
+
+def _categorize(data, org_id):
+    result, _ = get_categorizer(org_id).categorize(data)
+    return result
+
+
+def _analyze(spool, org_id):
+    try:
+        return process_statement(spool, get_categorizer(org_id))
+    finally:
+        spool.close()
+
+
+class Transaction(BaseModel):
+    description: str
+    amount: float | None = None
+    merchant: str | None = None
+
+
+class CategorizeRequest(BaseModel):
+    transactions: list[Transaction]
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/v1/statements")
+async def upload_statement(request: Request, user_id: str | None = None, file_name: str = "statement.csv",
+                           caller: Caller = Depends(authenticate)):
+    """
+    Store a raw CSV statement (request body) after validating and normalizing it.
+    """
+    user_id, org_id = caller_user(caller, user_id), caller.organization_id
+    spool = await read_statement(request)
+    with span("api.upload_statement") as s:
+        try:
+            data = await run_in_threadpool(validate_and_normalize, spool)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        finally:
+            spool.close()
+        file_id = await run_in_threadpool(request.app.state.backend.save_upload, user_id, file_name, data, org_id)
+        await run_in_threadpool(request.app.state.renewals.update, user_id, data, org_id)
+        s.rows = len(data)
+    return {"file_id": file_id, "rows": len(data)}
+
+
+@app.post("/v1/detect")
+async def detect(request: Request, user_id: str | None = None, org_id: int | None = None, save: bool = False,
+                 caller: Caller = Depends(authenticate)):
+    """
+    Detect recurring charges in a CSV statement (request body).
+
+    Returns the per-merchant subscription summary; with `save=true` the
+    recurring transactions are stored as validated subscriptions for the key's user.
+    """
+    user_id, org_id = caller_user(caller, user_id), caller_org(caller, org_id)
+    spool = await read_statement(request)
+    with span("api.detect") as s:
+        try:
+            data, costs = await run_in_threadpool(_analyze, spool, org_id)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        s.rows = len(data)
+        if save:
+            recurring = data[data["Is_Recurring"]]
+            await run_in_threadpool(request.app.state.backend.save_subscriptions, user_id, recurring, org_id)
+    return frame_response(costs)
+
+
+@app.post("/v1/categorize")
+async def categorize(body: CategorizeRequest, org_id: int | None = None, caller: Caller = Depends(authenticate)):
+    """
+    Categorize transactions with keyword rules and the organization's stored model.
+    """
+    org_id = caller_org(caller, org_id)
+    data = pd.DataFrame([transaction.model_dump() for transaction in body.transactions],
+                        columns=["description", "amount", "merchant"])
+    data = data.rename(columns={"description": "Description", "amount": "Amount", "merchant": "Merchant"})
+    missing = data["Merchant"].isna()
+    data.loc[missing, "Merchant"] = data.loc[missing, "Description"].map(infer_merchant_from_description)
+    with span("api.categorize") as s:
+        result = await run_in_threadpool(_categorize, data, org_id)
+        s.rows = len(result)
+    return frame_response(result[["Description", "Merchant", "Category", "Category Source", "Category Confidence"]])
+
+
+@app.get("/v1/renewals")
+async def renewals(request: Request, user_id: str | None = None, days: int = Query(30, ge=1, le=366),
+                   caller: Caller = Depends(authenticate)):
+    """
+    Renewals expected within the next `days` days, from the renewal index.
+    """
+    user_id = caller_user(caller, user_id)
+    with span("api.renewals") as s:
+        result = await run_in_threadpool(request.app.state.renewals.upcoming, user_id, days)
+        s.rows = len(result)
+    return frame_response(result)
+
+
+@app.get("/v1/renewals/missed")
+async def missed_renewals(request: Request, user_id: str | None = None, caller: Caller = Depends(authenticate)):
+    """
+    Renewals whose expected charge did not arrive (likely cancelled).
+    """
+    user_id = caller_user(caller, user_id)
+    with span("api.missed_renewals") as s:
+        result = await run_in_threadpool(request.app.state.renewals.missed, user_id)
+        s.rows = len(result)
+    return frame_response(result)
+
+
+@app.get("/v1/subscriptions")
+async def subscriptions(request: Request, user_id: str | None = None, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+                        offset: int = Query(0, ge=0), caller: Caller = Depends(authenticate)):
+    """
+    Page through a user's stored validated subscriptions.
+    """
+    user_id = caller_user(caller, user_id)
+    rows = await run_in_threadpool(request.app.state.backend.fetch_subscriptions, user_id, limit, offset)
+    return Response(json.dumps(rows, default=str), media_type="application/json")
@@ -0,0 +1,232 @@
+"""
+Process directories of bank statements without the Streamlit UI.
+
+Each file is validated and normalized, merchants are inferred and grouped
+under canonical merchant keys, transactions
+are categorized (keyword rules plus the organization's stored model when
+--org-id is given), recurring charges are detected and yearly subscription
+costs estimated. Files are spread over a process pool; results are written
+as Parquet/CSV per file and/or bulk-loaded into validated_subscriptions.
+
+Usage:
+    python batch_process.py "statements/2019/*.csv" --output-dir out --workers 8
+    python batch_process.py statements/ --org-id 3 --user-id <uuid> --dsn postgresql://...
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from categorizer import Categorizer, load_keywords, DEFAULT_KEYWORDS_PATH
+from merchant_normalization import add_merchant_key
+from subscriptions import (
+    validate_and_normalize,
+    infer_merchant_from_description,
+    detect_recurring_charges,
+    estimate_subscription_costs,
+)
+
+# Columns written to validated_subscriptions
+DB_COLUMNS = ["user_id", "organization_id", "merchant", "description", "amount", "category"]
+
+# Categorizer built once per worker process by `_init_worker`
+_worker_categorizer = None
+
+
+def find_statements(paths):
+    """
+    Expand directories (recursively) and glob patterns into a sorted list of CSV files.
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, "**", "*.csv"), recursive=True))
+        else:
+            files.update(match for match in glob.glob(path, recursive=True) if os.path.isfile(match))
+    return sorted(files)
+
+
+def build_batch_categorizer(org_id=None, keywords_path=DEFAULT_KEYWORDS_PATH, keywords=None):
+    """
+    Build a categorizer from the keyword database (or `keywords`, e.g. from
+    a config_store.ConfigStore) and, for an organization, its current stored
+    model. Nothing here needs Supabase credentials.
+    """
+    model = None
+    if org_id is not None:
+        import model_store
+
+        try:
+            model = model_store.load_model(org_id)
+        except ValueError:
+            model = None
+    return Categorizer(keywords=keywords if keywords is not None else load_keywords(keywords_path), model=model)
+
+
+def _init_worker(org_id, keywords_path):
+    global _worker_categorizer
+    _worker_categorizer = build_batch_categorizer(org_id, keywords_path)
+
+
+def process_statement(path, categorizer=None):
+    """
+    Run the full pipeline on one statement.
+
+    Returns (transactions, subscription costs) as DataFrames.
+    """
+    categorizer = categorizer or _worker_categorizer or build_batch_categorizer()
+    data = validate_and_normalize(path)
+
+    # Infer merchants once per distinct description
+    codes, uniques = pd.factorize(data["Description"].astype(str))
+    merchants = pd.array([infer_merchant_from_description(desc) for desc in uniques], dtype=object)
+    data["Merchant"] = merchants[codes]
+
+    data = add_merchant_key(data)
+
+    data, _ = categorizer.categorize(data)
+    data = data.sort_values(["Merchant Key", "Date"], kind="stable").reset_index(drop=True)
+    data = detect_recurring_charges(data)
+    return data, estimate_subscription_costs(data)
+
+
+def _output_base(path, output_dir, input_root):
+    relative = os.path.relpath(path, input_root) if input_root else os.path.basename(path)
+    return os.path.join(output_dir, os.path.splitext(relative)[0])
+
+
+def write_outputs(data, costs, base, output_format):
+    """
+    Write a statement's transactions and subscription costs next to each other under `base`.
+    """
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    if output_format == "parquet":
+        data.to_parquet(f"{base}.parquet", index=False, compression="zstd")
+        costs.to_parquet(f"{base}.subscriptions.parquet", index=False, compression="zstd")
+    else:
+        data.to_csv(f"{base}.csv", index=False)
+        costs.to_csv(f"{base}.subscriptions.csv", index=False)
+
+
+def to_db_rows(data, user_id, organization_id):
+    """
+    Shape recurring transactions as validated_subscriptions rows.
+    """
+    recurring = data[data["Is_Recurring"]]
+    return pd.DataFrame({
+        "user_id": user_id,
+        "organization_id": organization_id,
+        "merchant": recurring["Merchant"].to_numpy(),
+        "description": recurring["Description"].to_numpy(),
+        "amount": recurring["Amount"].to_numpy(),
+        "category": recurring["Category"].to_numpy(),
+    }, columns=DB_COLUMNS)
+
+
+def run_file(path, output_dir=None, output_format="parquet", input_root=None, db_rows=None):
+    """
+    Worker entry point: process one file, write its outputs and return a small
+    summary (plus validated_subscriptions rows when `db_rows` is a (user_id, org_id) pair).
+    """
+    start = time.perf_counter()
+    data, costs = process_statement(path)
+    if output_dir:
+        write_outputs(data, costs, _output_base(path, output_dir, input_root), output_format)
+    rows = to_db_rows(data, *db_rows) if db_rows else None
+    return {
+        "path": path,
+        "rows": len(data),
+        "subscriptions": len(costs),
+        "seconds": time.perf_counter() - start,
+    }, rows
+
+
+def run_batch(files, workers=None, org_id=None, keywords_path=DEFAULT_KEYWORDS_PATH, output_dir=None,
+              output_format="parquet", input_root=None, writer=None, user_id=None):
+    """
+    Process `files` over a process pool and return a per-file summary DataFrame.
+
+    With a `writer` (pg_writer.PostgresWriter), each file's recurring charges
+    are bulk-loaded with COPY from the parent process as results arrive.
+    Files that fail are reported with their error instead of stopping the batch.
+    """
+    db_rows = (user_id, org_id) if writer is not None else None
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(org_id, keywords_path)) as executor:
+        futures = {
+            executor.submit(run_file, path, output_dir, output_format, input_root, db_rows): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary, rows = future.result()
+            except Exception as e:
+                results.append({"path": path, "rows": 0, "subscriptions": 0, "seconds": 0.0, "error": str(e)})
+                print(f"FAILED {path}: {e}", file=sys.stderr)
+                continue
+            if writer is not None and rows is not None and not rows.empty:
+                writer.copy_frame("validated_subscriptions", rows)
+            results.append({**summary, "error": None})
+    return pd.DataFrame(results, columns=["path", "rows", "subscriptions", "seconds", "error"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("--output-dir", help="Write per-file results under this directory")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--org-id", type=int, help="Use this organization's stored model")
+    parser.add_argument("--keywords", default=DEFAULT_KEYWORDS_PATH)
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"),
+                        help="Bulk-load recurring charges into validated_subscriptions")
+    parser.add_argument("--user-id", help="Owner of rows written with --dsn")
+    args = parser.parse_args(argv)
+
+    files = find_statements(args.paths)
+    if not files:
+        parser.error("no CSV files found")
+    if not args.output_dir and not args.dsn:
+        parser.error("nothing to do: pass --output-dir and/or --dsn")
+    if args.dsn and not args.user_id:
+        parser.error("--user-id is required with --dsn")
+
+    writer = None
+    if args.dsn:
+        from pg_writer import PostgresWriter
+
+        writer = PostgresWriter(args.dsn, min_size=1, max_size=2)
+
+    input_root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    start = time.perf_counter()
+    try:
+        results = run_batch(
+            [os.path.abspath(path) for path in files],
+            workers=args.workers,
+            org_id=args.org_id,
+            keywords_path=args.keywords,
+            output_dir=args.output_dir,
+            output_format=args.format,
+            input_root=input_root,
+            writer=writer,
+            user_id=args.user_id,
+        )
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+
+    failed = results["error"].notna().sum()
+    rows = results["rows"].sum()
+    print(f"{len(results) - failed} files processed, {failed} failed")
+    print(f"{rows} rows, {results['subscriptions'].sum()} recurring merchants in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/s, {len(results) / elapsed:.1f} files/s, {args.workers} workers)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Load-test the HTTP API with concurrent clients.
+
+Either target a running server (--url) or let the script start one in process
+against a local Postgres stand-in (--dsn): the schema is applied with
+local_postgres.prepare_database, a user is created with an API key and the
+API runs with DATABASE_URL pointing at it.
+
+Usage:
+    python benchmarks/api_load_test.py --dsn postgresql://postgres@localhost/postgres --concurrency 32 --requests 2000
+    python benchmarks/api_load_test.py --url http://localhost:8000 --api-key <key>
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Share of each request type in the generated mix
+MIX = [("upload", 0.2), ("detect", 0.3), ("categorize", 0.3), ("subscriptions", 0.2)]
+
+
+def make_statement(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    descriptions = np.array(["Netflix 123", "Spotify P0", "Gym monthly", "ELECTRIC CO", "COFFEE SHOP"])
+    data = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Description": descriptions[rng.integers(0, len(descriptions), rows)],
+        "Amount": rng.choice([9.99, 4.5, 30.0, 72.1], rows),
+    })
+    return data.to_csv(index=False).encode("utf-8")
+
+
+def start_local_server(dsn):
+    """
+    Prepare the stand-in database and serve the API on a free port in a background thread.
+    Returns (base URL, API key).
+    """
+    import psycopg
+    import uvicorn
+    from local_postgres import prepare_database
+
+    user_id = uuid.uuid4()
+    with psycopg.connect(dsn) as conn:
+        prepare_database(conn)
+        conn.execute("INSERT INTO auth.users (id, email) VALUES (%s, 'load@example.com')", (user_id,))
+        conn.commit()
+
+    api_key = uuid.uuid4().hex
+    os.environ["DATABASE_URL"] = dsn
+    os.environ["API_KEYS"] = f"{api_key}={user_id}"
+    from api import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", api_key
+
+
+async def one_request(client, kind, statement, transactions):
+    # The API key determines the user
+    if kind == "upload":
+        return await client.post("/v1/statements", content=statement)
+    if kind == "detect":
+        return await client.post("/v1/detect", params={"save": "true"}, content=statement)
+    if kind == "categorize":
+        return await client.post("/v1/categorize", json={"transactions": transactions})
+    return await client.get("/v1/subscriptions", params={"limit": 100})
+
+
+async def run_load(url, api_key, total, concurrency, statement_rows, seed=0):
+    statement = make_statement(statement_rows, seed)
+    transactions = [{"description": desc, "amount": 9.99} for desc in
+                    ["Netflix 123", "Spotify P0", "Gym monthly", "ELECTRIC CO", "COFFEE SHOP"] * 20]
+    rng = np.random.default_rng(seed)
+    kinds = rng.choice([kind for kind, _ in MIX], size=total, p=[share for _, share in MIX])
+    queue = asyncio.Queue()
+    for kind in kinds:
+        queue.put_nowait(kind)
+    samples = []
+
+    headers = {"X-API-Key": api_key}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=120) as client:
+        async def worker():
+            while not queue.empty():
+                kind = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await one_request(client, kind, statement, transactions)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                samples.append((kind, time.perf_counter() - start, ok))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return pd.DataFrame(samples, columns=["kind", "seconds", "ok"]), elapsed
+
+
+def report(samples, elapsed):
+    print(f"{len(samples)} requests in {elapsed:.2f}s ({len(samples) / elapsed:,.1f} req/s), "
+          f"{(~samples['ok']).sum()} errors")
+    print(f"{'endpoint':<14} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for kind, group in samples.groupby("kind"):
+        ms = group["seconds"] * 1000
+        print(f"{kind:<14} {len(group):>6} {(~group['ok']).sum():>6} {ms.quantile(0.5):9.1f} "
+              f"{ms.quantile(0.95):9.1f} {ms.quantile(0.99):9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running API")
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DATABASE_URL"),
+                        help="Start the API in process against this Postgres")
+    parser.add_argument("--api-key", help="Key of the user to act as with --url")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--statement-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.api_key:
+            parser.error("--api-key is required with --url")
+        url, api_key = args.url, args.api_key
+    elif args.dsn:
+        url, api_key = start_local_server(args.dsn)
+    else:
+        parser.error("pass --url or --dsn")
+
+    samples, elapsed = asyncio.run(run_load(url, api_key, args.requests, args.concurrency, args.statement_rows))
+    report(samples, elapsed)
+    sys.exit(1 if (~samples["ok"]).any() else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare rows/sec for validated-subscription writes: COPY through the direct
+Postgres writer, row-by-row INSERTs (what one PostgREST insert per payload
+costs the database), and optionally the real PostgREST path.
+
+Usage:
+    python benchmarks/bulk_write_benchmark.py --dsn postgresql://postgres@localhost/postgres --rows 100000
+    python benchmarks/bulk_write_benchmark.py --dsn ... --supabase-url http://localhost:54321 --supabase-key <service key>
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import psycopg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pg_writer import PostgresWriter
+from local_postgres import prepare_database
+
+COLUMNS = ["user_id", "merchant", "description", "amount", "category"]
+
+
+def make_rows(rows, user_id, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "user_id": str(user_id),
+        "merchant": [f"Merchant {i}" for i in rng.integers(0, 500, rows)],
+        "description": "monthly charge",
+        "amount": rng.uniform(1, 100, rows).round(2),
+        "category": [f"Cat {i}" for i in rng.integers(0, 12, rows)],
+    })
+
+
+def report(label, rows, seconds):
+    print(f"{label:<24} {rows:>9} rows  {seconds:8.3f}s  {rows / seconds:12,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DATABASE_URL", "postgresql://postgres@localhost/postgres"))
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--insert-rows", type=int, default=5_000, help="rows for the row-by-row baseline")
+    parser.add_argument("--supabase-url")
+    parser.add_argument("--supabase-key")
+    args = parser.parse_args()
+
+    user_id = uuid.uuid4()
+    with psycopg.connect(args.dsn) as conn:
+        prepare_database(conn)
+        conn.execute("INSERT INTO auth.users (id, email) VALUES (%s, 'bench@example.com')", (user_id,))
+        conn.commit()
+
+    data = make_rows(args.rows, user_id)
+
+    writer = PostgresWriter(args.dsn)
+    start = time.perf_counter()
+    writer.copy_frame("validated_subscriptions", data, COLUMNS)
+    report("COPY (direct writer)", args.rows, time.perf_counter() - start)
+    writer.close()
+
+    sample = data.head(args.insert_rows)
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        start = time.perf_counter()
+        for row in sample.itertuples(index=False, name=None):
+            conn.execute(
+                "INSERT INTO public.validated_subscriptions (user_id, merchant, description, amount, category) "
+                "VALUES (%s, %s, %s, %s, %s) RETURNING *",
+                row,
+            )
+        report("row-by-row INSERT", len(sample), time.perf_counter() - start)
+
+    if args.supabase_url and args.supabase_key:
+        from supabase import create_client
+
+        client = create_client(args.supabase_url, args.supabase_key)
+        records = sample.to_dict(orient="records")
+        start = time.perf_counter()
+        for record in records:
+            client.table("validated_subscriptions").insert(record).execute()
+        report("PostgREST per payload", len(records), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare default CSV parsing with date inference against the sniffing, typed parser.
+
+Usage:
+    python benchmarks/csv_benchmark.py --rows 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from csv_parser import parse_bank_csv, sniff_csv
+
+
+def write_statement(path, rows, seed=0):
+    """
+    Write a synthetic European-style statement (semicolons, day-first dates, comma decimals).
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D")
+    amounts = rng.uniform(1, 2000, rows)
+    merchants = np.array(["NETFLIX.COM", "SPOTIFY P0123", "LOCAL GYM", "ELECTRIC CO", "COFFEE SHOP"])
+    data = pd.DataFrame({
+        "Date": dates.strftime("%d/%m/%Y"),
+        "Description": merchants[rng.integers(0, len(merchants), rows)],
+        "Amount": amounts,
+    })
+    data.to_csv(path, index=False, sep=";", decimal=",", float_format="%.2f")
+
+
+def baseline(path):
+    data = pd.read_csv(path, sep=";", decimal=",")
+    data["Date"] = pd.to_datetime(data["Date"], errors="coerce", dayfirst=True)
+    return data
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "statement.csv")
+        write_statement(path, args.rows)
+
+        base, base_time = timed(lambda: baseline(path))
+        csv_format, sniff_time = timed(lambda: sniff_csv(path))
+        typed, typed_time = timed(lambda: parse_bank_csv(path, csv_format=csv_format))
+
+    print(f"rows: {args.rows}  detected: {csv_format}")
+    print(f"read_csv + to_datetime inference  {base_time:8.3f}s")
+    print(f"sniff                             {sniff_time:8.3f}s")
+    print(f"parse_bank_csv                    {typed_time:8.3f}s  ({base_time / typed_time:.1f}x)")
+    print(f"dates match baseline: {base['Date'].equals(typed['Date'].astype(base['Date'].dtype))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Check that the app's query shapes use index scans under RLS on seeded data.
+
+Runs each query from supabase_integration.py as an `authenticated` user with
+EXPLAIN (ANALYZE), reports the scan types and timings, and compares the
+initplan-friendly `(select auth.uid())` policy form with bare `auth.uid()`.
+
+Usage:
+    python benchmarks/explain_rls.py --dsn postgresql://postgres@localhost/postgres --orgs 50 --rows 200000
+"""
+import argparse
+import json
+import os
+import sys
+import psycopg
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from local_postgres import prepare_database, act_as, reset_role
+
+SEED = """
+INSERT INTO public.organizations (id, name)
+SELECT g, 'org ' || g FROM generate_series(1, %(orgs)s) g;
+
+INSERT INTO auth.users (id, email, organization_id)
+SELECT md5('user' || g)::uuid, 'user' || g || '@example.com', 1 + g %% %(orgs)s
+FROM generate_series(1, %(users)s) g;
+
+INSERT INTO public.profiles (id, username, organization_id)
+SELECT id, 'user_' || organization_id || '_' || left(id::text, 8), organization_id FROM auth.users;
+
+INSERT INTO public.validated_subscriptions (user_id, organization_id, merchant, description, amount, category, created_at)
+SELECT u.id, u.organization_id, 'Merchant ' || (g %% 500), 'desc', (g %% 100) + 0.99, 'Cat ' || (g %% 12),
+       now() - (g %% 1000) * interval '1 day'
+FROM generate_series(1, %(rows)s) g
+JOIN auth.users u ON u.id = md5('user' || (1 + g %% %(users)s))::uuid;
+
+INSERT INTO public.uploaded_files (user_id, organization_id, file_name, data, uploaded_at)
+SELECT u.id, u.organization_id, 'file_' || g || '.csv', '[]'::jsonb, now() - (g %% 1000) * interval '1 hour'
+FROM generate_series(1, %(files)s) g
+JOIN auth.users u ON u.id = md5('user' || (1 + g %% %(users)s))::uuid;
+
+INSERT INTO public.enriched_data (user_id, organization_id, file_name, data, uploaded_at)
+SELECT user_id, organization_id, id::text, '[]'::jsonb, uploaded_at FROM public.uploaded_files;
+
+INSERT INTO public.app_logs (action, user_id, organization_id, details, created_at)
+SELECT 'action', u.id, u.organization_id, '{}'::jsonb, now() - (g %% 1000) * interval '1 minute'
+FROM generate_series(1, %(rows)s) g
+JOIN auth.users u ON u.id = md5('user' || (1 + g %% %(users)s))::uuid;
+"""
+
+# (name, sql) pairs mirroring supabase_integration.py filters
+QUERIES = [
+    ("fetch_stored_subscriptions", "SELECT * FROM public.validated_subscriptions WHERE user_id = %(user_id)s"),
+    ("fetch_organization_data", "SELECT * FROM public.validated_subscriptions WHERE organization_id = %(org_id)s"),
+    ("fetch_uploaded_files", "SELECT * FROM public.uploaded_files WHERE user_id = %(user_id)s ORDER BY uploaded_at DESC"),
+    ("fetch_file_data", "SELECT data FROM public.uploaded_files WHERE id = %(file_id)s"),
+    ("fetch_enriched_data", "SELECT data FROM public.enriched_data WHERE user_id = %(user_id)s AND file_name = %(file_name)s"),
+]
+
+BARE_POLICY = """
+DROP POLICY IF EXISTS "Organization members can read validated subscriptions" ON public.validated_subscriptions;
+CREATE POLICY "Organization members can read validated subscriptions"
+ON public.validated_subscriptions FOR SELECT TO authenticated
+USING (organization_id = public.current_organization_id());
+"""
+
+INITPLAN_POLICY = """
+DROP POLICY IF EXISTS "Organization members can read validated subscriptions" ON public.validated_subscriptions;
+CREATE POLICY "Organization members can read validated subscriptions"
+ON public.validated_subscriptions FOR SELECT TO authenticated
+USING (organization_id = (select public.current_organization_id()));
+"""
+
+
+def scan_types(plan):
+    """
+    Collect (node type, relation) pairs from an EXPLAIN JSON plan.
+    """
+    found = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if "Scan" in node["Node Type"] and "Relation Name" in node:
+            found.append((node["Node Type"], node["Relation Name"]))
+        stack.extend(node.get("Plans", []))
+    return found
+
+
+def explain(conn, sql, params):
+    row = conn.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params).fetchone()
+    result = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+    return result[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DATABASE_URL", "postgresql://postgres@localhost/postgres"))
+    parser.add_argument("--orgs", type=int, default=50)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--files", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with psycopg.connect(args.dsn) as conn:
+        skipped = prepare_database(conn)
+        print(f"schema applied ({skipped} duplicate/unsupported statements skipped)")
+        seed_params = {"orgs": args.orgs, "users": args.users, "rows": args.rows, "files": args.files}
+        for statement in SEED.split(";"):
+            if statement.strip():
+                conn.execute(statement, seed_params)
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        user_id, org_id = conn.execute("SELECT id, organization_id FROM auth.users LIMIT 1").fetchone()
+        file_id, file_name = conn.execute(
+            "SELECT id, id::text FROM public.uploaded_files WHERE user_id = %s LIMIT 1", (user_id,)
+        ).fetchone()
+        params = {"user_id": user_id, "org_id": org_id, "file_id": file_id, "file_name": file_name}
+
+        failures = 0
+        act_as(conn, user_id)
+        print(f"{'query':<28} {'ms':>9}  scans")
+        for name, sql in QUERIES:
+            plan = explain(conn, sql, params)
+            scans = scan_types(plan["Plan"])
+            indexed = all(node != "Seq Scan" for node, _ in scans)
+            failures += not indexed
+            label = ", ".join(f"{node} on {relation}" for node, relation in scans)
+            print(f"{name:<28} {plan['Execution Time']:9.2f}  {label}{'' if indexed else '  <-- NOT INDEXED'}")
+        reset_role(conn)
+
+        # Same org-wide read under each policy form
+        org_sql = "SELECT count(*) FROM public.validated_subscriptions"
+        for label, policy in (("bare auth call", BARE_POLICY), ("(select ...) initplan", INITPLAN_POLICY)):
+            conn.execute(policy)
+            conn.commit()
+            act_as(conn, user_id)
+            plan = explain(conn, org_sql, {})
+            reset_role(conn)
+            print(f"policy {label:<24} {plan['Execution Time']:9.2f} ms")
+        conn.rollback()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
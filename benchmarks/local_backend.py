@@ -0,0 +1,249 @@
+"""
+In-memory stand-ins for `supabase_integration` and `auth_management`.
+
+`install(backend)` registers modules under those names in sys.modules, so the
+app's own imports (including Streamlit reruns of app.py) resolve to functions
+backed by a thread-safe in-process store instead of Supabase. Only the calls
+made by the load-tested page flows are implemented; anything else raises.
+"""
+import os
+import sys
+import threading
+import types
+import uuid
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pg_writer import WriteResult
+from transaction_schema import compact_frame
+
+
+class LocalBackend:
+    """
+    Tables held as lists of dicts; file payloads as DataFrames, copied on read
+    like a deserialized JSON/Parquet payload would be.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.organizations = [{"id": 1, "name": "Load Test Org", "is_active": True}]
+        self.users = {}
+        self.uploaded_files = []
+        self.payloads = {}
+        self.enriched_data = []
+        self.validated_subscriptions = []
+        self.upcoming_renewals = {}
+        self.logs = []
+        self.calls = {}
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def add_user(self, email, password="secret", organization_id=1):
+        user = types.SimpleNamespace(id=str(uuid.uuid4()), email=email, organization_id=organization_id,
+                                     is_superuser=False)
+        with self.lock:
+            self.users[email] = (password, user)
+        return user
+
+    def add_file(self, user_id, file_name, data, organization_id=1):
+        with self.lock:
+            file_id = len(self.uploaded_files) + 1
+            self.uploaded_files.append({
+                "id": file_id,
+                "user_id": user_id,
+                "organization_id": organization_id,
+                "file_name": file_name,
+                "uploaded_at": pd.Timestamp.now().isoformat(),
+            })
+            self.payloads[file_id] = data
+        return file_id
+
+    def add_subscriptions(self, rows):
+        with self.lock:
+            start = len(self.validated_subscriptions)
+            for offset, row in enumerate(rows):
+                self.validated_subscriptions.append({"id": start + offset + 1, **row})
+
+
+def _unavailable(name):
+    def call(*args, **kwargs):
+        raise NotImplementedError(f"{name} is not available in the local stand-in")
+    call.__name__ = name
+    return call
+
+
+def build_supabase_integration(backend):
+    """
+    Module implementing the supabase_integration calls used by the tested pages.
+    """
+    module = types.ModuleType("supabase_integration")
+
+    def fetch_uploaded_files(user_id):
+        backend.count("fetch_uploaded_files")
+        with backend.lock:
+            return [dict(row) for row in backend.uploaded_files if row["user_id"] == user_id]
+
+    def fetch_file_data(file_id, columns=None, filters=None, client=None):
+        backend.count("fetch_file_data")
+        with backend.lock:
+            data = backend.payloads.get(file_id)
+        if data is None:
+            return pd.DataFrame()
+        data = data.copy()
+        if columns is not None:
+            data = data[[col for col in columns if col in data.columns]]
+        return compact_frame(data)
+
+    def fetch_organization_files(org_id):
+        backend.count("fetch_organization_files")
+        with backend.lock:
+            return [{"id": row["id"], "user_id": row["user_id"], "file_name": row["file_name"],
+                     "uploaded_at": row["uploaded_at"], "format": None, "path": None}
+                    for row in backend.uploaded_files if row["organization_id"] == org_id]
+
+    def upload_bank_data(user_id, file_name, data, organization_id=None):
+        backend.count("upload_bank_data")
+        file_id = backend.add_file(user_id, file_name, data.copy(), organization_id or 1)
+        return WriteResult([{"id": file_id}])
+
+    def upload_enriched_data(user_id, file_name, data):
+        backend.count("upload_enriched_data")
+        with backend.lock:
+            backend.enriched_data.append({"user_id": user_id, "file_name": file_name, "rows": len(data)})
+        return WriteResult([{"id": len(backend.enriched_data)}])
+
+    def fetch_stored_subscriptions(user_id):
+        backend.count("fetch_stored_subscriptions")
+        with backend.lock:
+            return [dict(row) for row in backend.validated_subscriptions if row["user_id"] == user_id]
+
+    def save_validated_subscriptions(user_id, data, organization_id=None):
+        backend.count("save_validated_subscriptions")
+        backend.add_subscriptions([
+            {"user_id": user_id, "organization_id": organization_id, "merchant": merchant, "amount": amount,
+             "category": category, "created_at": pd.Timestamp.now().isoformat(), "status": "active"}
+            for merchant, amount, category in zip(data["Merchant"], data["Amount"], data["Category"])
+        ])
+        return WriteResult([{"rows": len(data)}])
+
+    def fetch_organizations():
+        backend.count("fetch_organizations")
+        with backend.lock:
+            return pd.DataFrame(backend.organizations)
+
+    def fetch_organization_data(org_id, table_name):
+        backend.count("fetch_organization_data")
+        with backend.lock:
+            rows = getattr(backend, table_name, [])
+            return [dict(row) for row in rows if row.get("organization_id") == org_id]
+
+    def fetch_config_versions(org_ids):
+        return {}
+
+    def fetch_org_config(org_id):
+        return [], []
+
+    def fetch_renewal_series(user_id):
+        backend.count("fetch_renewal_series")
+        with backend.lock:
+            return [dict(row) for (owner, _), row in backend.upcoming_renewals.items() if owner == user_id]
+
+    def upsert_renewal_series(user_id, rows, organization_id=None):
+        backend.count("upsert_renewal_series")
+        records = rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+        with backend.lock:
+            for record in records:
+                backend.upcoming_renewals[(user_id, record["merchant_key"])] = {
+                    "user_id": user_id, "organization_id": organization_id, **record}
+        return WriteResult(records)
+
+    def _renewals(user_id, column, low=None, high=None):
+        with backend.lock:
+            rows = [dict(row) for (owner, _), row in backend.upcoming_renewals.items()
+                    if owner == user_id and row[column] is not None
+                    and (low is None or row[column] >= low) and (high is None or row[column] <= high)]
+        return sorted(rows, key=lambda row: row[column])
+
+    def fetch_upcoming_renewals(user_id, start, end):
+        backend.count("fetch_upcoming_renewals")
+        return _renewals(user_id, "next_charge_date", start, end)
+
+    def fetch_missed_renewals(user_id, as_of):
+        backend.count("fetch_missed_renewals")
+        return [row for row in _renewals(user_id, "missed_after") if row["missed_after"] < as_of]
+
+    def fetch_renewal_horizon(user_id):
+        rows = _renewals(user_id, "last_charge_date")
+        return rows[-1]["last_charge_date"] if rows else None
+
+    def log_action(action, user_id, organization_id=None, details=None):
+        with backend.lock:
+            backend.logs.append({"action": action, "user_id": user_id, "organization_id": organization_id})
+        return WriteResult(backend.logs[-1:])
+
+    # Payloads live in memory, as if stored in the JSON column without a Parquet store
+    module.frame_store = None
+    module.service_supabase = None
+    for function in [fetch_uploaded_files, fetch_file_data, fetch_organization_files, upload_bank_data,
+                     upload_enriched_data, fetch_stored_subscriptions, save_validated_subscriptions,
+                     fetch_organizations, fetch_organization_data, fetch_config_versions, fetch_org_config,
+                     fetch_renewal_series, upsert_renewal_series, fetch_upcoming_renewals, fetch_missed_renewals,
+                     fetch_renewal_horizon, log_action]:
+        setattr(module, function.__name__, function)
+    # Imported by ui_management for the superuser pages, which are not load-tested
+    for name in ["fetch_users_page", "fetch_logs", "update_user", "update_organization", "fetch_app_statistics",
+                 "upsert_validated_subscriptions"]:
+        setattr(module, name, _unavailable(f"supabase_integration.{name}"))
+    return module
+
+
+def build_auth_management(backend):
+    """
+    Module with the same login/sign-up widgets as auth_management, checking
+    credentials against the backend's users.
+    """
+    import streamlit as st
+
+    module = types.ModuleType("auth_management")
+
+    def authenticate_user():
+        st.title("Login")
+        email = st.text_input("Email")
+        password = st.text_input("Password", type="password")
+        if st.button("Login"):
+            backend.count("authenticate_user")
+            with backend.lock:
+                expected, user = backend.users.get(email, (None, None))
+            if user is not None and password == expected:
+                st.success(f"Welcome, {user.email}!")
+                st.session_state.user = user
+                return user
+            st.error("Invalid credentials.")
+        return None
+
+    def signup_user():
+        st.title("Sign Up")
+        email = st.text_input("Email")
+        password = st.text_input("Password", type="password")
+        if st.button("Sign Up") and email:
+            backend.add_user(email, password)
+            st.success("Account created successfully! Please log in.")
+
+    def create_superuser():
+        pass
+
+    for function in [authenticate_user, signup_user, create_superuser]:
+        setattr(module, function.__name__, function)
+    return module
+
+
+def install(backend=None):
+    """
+    Register the stand-in modules and return the backend behind them.
+    """
+    backend = backend or LocalBackend()
+    sys.modules["supabase_integration"] = build_supabase_integration(backend)
+    sys.modules["auth_management"] = build_auth_management(backend)
+    return backend
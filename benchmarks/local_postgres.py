@@ -0,0 +1,114 @@
+"""
+Helpers for running benchmarks against a plain local Postgres.
+
+A minimal stand-in for Supabase's `auth` schema is created (auth.users,
+auth.uid(), auth.role() and the anon/authenticated/service_role roles), then
+databaseschema.sql is applied statement by statement.
+"""
+import os
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "databaseschema.sql")
+
+AUTH_STUB = """
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN CREATE ROLE anon NOLOGIN; END IF;
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN CREATE ROLE authenticated NOLOGIN; END IF;
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN CREATE ROLE service_role NOLOGIN BYPASSRLS; END IF;
+END
+$$;
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE TABLE IF NOT EXISTS auth.users (
+  id uuid PRIMARY KEY,
+  email text,
+  organization_id integer,
+  is_superuser boolean DEFAULT false,
+  is_active boolean DEFAULT true,
+  created_at timestamp DEFAULT now()
+);
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS uuid LANGUAGE sql STABLE AS $$
+  SELECT nullif(current_setting('request.jwt.claim.sub', true), '')::uuid
+$$;
+CREATE OR REPLACE FUNCTION auth.role() RETURNS text LANGUAGE sql STABLE AS $$
+  SELECT coalesce(nullif(current_setting('request.jwt.claim.role', true), ''), 'anon')
+$$;
+GRANT USAGE ON SCHEMA auth TO anon, authenticated, service_role;
+GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA auth TO anon, authenticated, service_role;
+"""
+
+# Errors from statements the schema file repeats, or extensions a plain Postgres lacks
+SKIPPABLE_ERRORS = ("DuplicateTable", "DuplicateObject", "DuplicateFunction", "DuplicateSchema", "DuplicateColumn",
+                    "UndefinedFile")
+
+TENANT_TABLES = ["validated_subscriptions", "uploaded_files", "enriched_data", "app_logs", "keywords", "thresholds"]
+
+
+def split_statements(sql):
+    """
+    Split a SQL script on semicolons outside of $$-quoted bodies and comments.
+    """
+    statements, current, in_dollar = [], [], False
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not in_dollar and stripped.startswith("--"):
+            continue
+        current.append(line)
+        if line.count("$$") % 2 == 1:
+            in_dollar = not in_dollar
+        if not in_dollar and stripped.endswith(";"):
+            statements.append("\n".join(current))
+            current = []
+    if "".join(current).strip():
+        statements.append("\n".join(current))
+    return statements
+
+
+def prepare_database(conn, schema_path=SCHEMA_PATH):
+    """
+    Reset the auth stand-in, apply the schema and enable RLS on tenant tables.
+
+    Statements that fail because an object already exists (the schema file
+    repeats some definitions) or an extension is not installed are skipped;
+    any other error is raised. Returns the number of skipped statements.
+    """
+    from psycopg import errors
+
+    skippable = tuple(getattr(errors, name) for name in SKIPPABLE_ERRORS)
+
+    with conn.cursor() as cur:
+        cur.execute(AUTH_STUB)
+        # Start from an empty database; public tables are recreated by the schema
+        cur.execute("TRUNCATE auth.users CASCADE")
+    conn.commit()
+
+    with open(schema_path) as f:
+        statements = split_statements(f.read())
+    skipped = 0
+    for statement in statements:
+        try:
+            with conn.transaction():
+                conn.execute(statement)
+        except skippable:
+            skipped += 1
+
+    with conn.cursor() as cur:
+        for table in TENANT_TABLES + ["organizations", "profiles"]:
+            cur.execute(f"ALTER TABLE public.{table} ENABLE ROW LEVEL SECURITY")
+        cur.execute("GRANT USAGE ON SCHEMA public TO anon, authenticated, service_role")
+        cur.execute("GRANT ALL ON ALL TABLES IN SCHEMA public TO authenticated, service_role")
+        cur.execute("GRANT ALL ON ALL SEQUENCES IN SCHEMA public TO authenticated, service_role")
+    conn.commit()
+    return skipped
+
+
+def act_as(conn, user_id, role="authenticated"):
+    """
+    Switch the session to a Supabase-style request context for `user_id`.
+    """
+    conn.execute(f"SET ROLE {role}")
+    conn.execute("SELECT set_config('request.jwt.claim.sub', %s, false)", (str(user_id),))
+    conn.execute("SELECT set_config('request.jwt.claim.role', %s, false)", (role,))
+
+
+def reset_role(conn):
+    conn.execute("RESET ROLE")
@@ -0,0 +1,64 @@
+"""
+Measure the memory of a statement set before and after `compact_frame`.
+
+The baseline mirrors what the ingest path used to hold: object strings,
+float64 amounts and "Yes"/"No" flag columns.
+
+Usage:
+    python benchmarks/memory_benchmark.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from transaction_schema import compact_frame, memory_mb
+
+
+def make_statements(rows, merchants=2000, seed=0):
+    """
+    Build `rows` transactions across many statements with realistic repetition:
+    a few thousand merchants, descriptions carrying a reference number.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"MERCHANT {i:04d}" for i in range(merchants)], dtype=object)
+    picks = rng.zipf(1.3, rows) % merchants
+    references = rng.integers(0, 50, rows)
+    categories = np.array(["Entertainment", "Utilities", "Groceries", "Software", "Transport", "Others"], dtype=object)
+    return pd.DataFrame({
+        "Date": (pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 2500, rows), unit="D")).strftime("%Y-%m-%d").astype(object),
+        "Description": pd.Series(names[picks] + " REF " + references.astype(str).astype(object), dtype=object),
+        "Merchant": pd.Series(names[picks], dtype=object),
+        "Amount": rng.uniform(1, 500, rows).round(2),
+        "Category": pd.Series(categories[picks % len(categories)], dtype=object),
+        "Is_Recurring": pd.Series(np.where(rng.random(rows) < 0.2, "Yes", "No"), dtype=object),
+        "Is_New_Subscription": pd.Series(np.full(rows, "Unknown"), dtype=object),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    data = make_statements(args.rows)
+    before = memory_mb(data)
+
+    start = time.perf_counter()
+    compact = compact_frame(data)
+    seconds = time.perf_counter() - start
+    after = memory_mb(compact)
+
+    print(f"{'column':<22} {'before MB':>10} {'after MB':>10}  dtype")
+    before_columns = data.memory_usage(deep=True, index=False) / 1024 ** 2
+    after_columns = compact.memory_usage(deep=True, index=False) / 1024 ** 2
+    for col in data.columns:
+        print(f"{col:<22} {before_columns[col]:10.1f} {after_columns[col]:10.1f}  {compact[col].dtype}")
+    print(f"{'total':<22} {before:10.1f} {after:10.1f}  ({before / after:.1f}x smaller, converted in {seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Load-test the Streamlit app with concurrent simulated sessions.
+
+Each session drives app.py through Streamlit's AppTest: initial load, login,
+statement upload through the Upload Files page, then alternating Dashboard
+and Recurring Charge Detection page runs. Supabase and auth calls go to the
+in-memory stand-in in local_backend.py, so the numbers measure the app
+itself. Statements carry a Merchant column so the detection page does not
+call the web-search enrichment.
+
+AppTest sets process-wide state around each run (the `global.appTest` config
+option and the Runtime singleton) and resets it afterwards, which breaks runs
+that overlap in threads. It also compiles app.py afresh for every run.
+`app_test_globals` keeps both settings in place for the whole load test and
+shares one compiled script, as the Streamlit server does. AppTest also gives
+every session the same session ID, so the shared-frame summary counts them as
+one session; memory per session comes from process RSS instead.
+
+Reports page-run throughput, latency percentiles per step and process memory
+per live session.
+
+Usage:
+    python benchmarks/session_load_test.py --sessions 16 --iterations 5 --rows 2000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_backend import install
+
+APP_PATH = os.path.join(ROOT, "app.py")
+
+MERCHANTS = ["Netflix", "Spotify", "Gym", "ELECTRIC CO", "COFFEE SHOP", "Hulu", "Udemy", "Water Utility"]
+
+
+def make_statement(rows, seed=0):
+    """
+    A CSV statement with monthly subscriptions mixed into everyday spending.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(MERCHANTS), rows)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D")
+    data = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Description": [f"{MERCHANTS[pick]} {ref}" for pick, ref in zip(picks, rng.integers(1000, 9999, rows))],
+        "Merchant": [MERCHANTS[pick] for pick in picks],
+        "Amount": rng.choice([9.99, 14.99, 4.5, 30.0, 72.1], rows),
+    }).sort_values("Date")
+    return data.to_csv(index=False).encode("utf-8")
+
+
+def rss_mb():
+    """
+    Current resident set size of this process in MB (peak RSS where /proc is unavailable).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def app_test_globals():
+    """
+    Keep AppTest's process-wide settings stable while sessions run concurrently.
+    """
+    from unittest.mock import MagicMock, patch
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import patch_config_options
+
+    fallback = MagicMock(spec=Runtime)
+    fallback.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    fallback.cache_storage_manager = MemoryCacheStorageManager()
+    # Each run still installs its own runtime; when another run has just
+    # cleared it, fall back to a shared one instead of failing
+    instance = classmethod(lambda cls: cls._instance or fallback)
+    exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    with patch_config_options({"global.appTest": True}), \
+            patch.object(Runtime, "instance", instance), patch.object(Runtime, "exists", exists), \
+            patch("streamlit.testing.v1.app_test.ScriptCache", lambda: script_cache), \
+            patch("streamlit.testing.v1.local_script_runner.ScriptCache", lambda: script_cache):
+        yield
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+class SimulatedSession:
+    """
+    One browser session: an AppTest instance plus the user it logs in as.
+    """
+
+    def __init__(self, index, backend, statement, timeout):
+        self.index = index
+        self.email = f"user{index}@example.com"
+        self.user = backend.add_user(self.email)
+        self.statement = statement
+        self.timeout = timeout
+        self.app = None
+        self.timings = []
+
+    def _step(self, name, action):
+        start = time.perf_counter()
+        error = None
+        try:
+            action()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        # An exception raised by the app script explains any failed widget lookup
+        if self.app is not None and len(self.app.exception):
+            error = self.app.exception[0].message
+        self.timings.append({
+            "session": self.index,
+            "step": name,
+            "ms": (time.perf_counter() - start) * 1000,
+            "error": error,
+        })
+
+    def _load(self):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+        self.app.run()
+
+    def _login(self):
+        _widget(self.app.text_input, "Email").set_value(self.email)
+        _widget(self.app.text_input, "Password").set_value("secret")
+        _widget(self.app.button, "Login").click()
+        self.app.run()
+        if self.app.session_state["user"] is None:
+            raise RuntimeError("login failed")
+
+    def _upload(self):
+        self._page("Upload Files")
+        self.app.get("file_uploader")[0].upload("statement.csv", self.statement, "text/csv")
+        self.app.run()
+        _widget(self.app.button, "Save and Process").click()
+        self.app.run()
+        if not any(message.value == "File processed successfully!" for message in self.app.success):
+            raise RuntimeError("upload failed")
+
+    def _page(self, page):
+        _widget(self.app.sidebar.radio, "Navigation").set_value(page)
+        self.app.run()
+
+    def run(self, iterations):
+        self._step("load", self._load)
+        self._step("login", self._login)
+        self._step("upload", self._upload)
+        for _ in range(iterations):
+            self._step("dashboard", lambda: self._page("Dashboard"))
+            self._step("recurring", lambda: self._page("Recurring Charge Detection"))
+        return self.timings
+
+
+def summarize(timings, elapsed):
+    """
+    Per-step count, errors and latency percentiles, plus an overall row.
+    """
+    frame = pd.DataFrame(timings)
+    rows = []
+    for step, group in list(frame.groupby("step", sort=False)) + [("all", frame)]:
+        rows.append({
+            "step": step,
+            "count": len(group),
+            "errors": int(group["error"].notna().sum()),
+            "p50_ms": group["ms"].quantile(0.5),
+            "p95_ms": group["ms"].quantile(0.95),
+            "p99_ms": group["ms"].quantile(0.99),
+            "max_ms": group["ms"].max(),
+        })
+    summary = pd.DataFrame(rows).set_index("step")
+    summary.attrs["throughput"] = len(frame) / elapsed
+    return summary
+
+
+def run_load_test(sessions, iterations, rows, timeout=60):
+    """
+    Run `sessions` concurrent sessions and return (summary, memory report, raw timings).
+
+    Sessions stay alive until the end, so the RSS difference divided by the
+    number of sessions approximates memory held per session.
+    """
+    backend = install()
+    statement = make_statement(rows)
+    globals_patch = app_test_globals()
+    globals_patch.__enter__()
+
+    # Warm imports and caches with one session so they are not billed to the others
+    SimulatedSession(-1, backend, statement, timeout).run(1)
+    baseline = rss_mb()
+
+    simulated = [SimulatedSession(index, backend, statement, timeout) for index in range(sessions)]
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample_memory():
+        while not done.wait(0.2):
+            peak[0] = max(peak[0], rss_mb())
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(lambda session: session.run(iterations), simulated))
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    globals_patch.__exit__(None, None, None)
+
+    live = rss_mb()
+    timings = [timing for result in results for timing in result]
+    memory = {
+        "baseline_mb": baseline,
+        "live_mb": live,
+        "peak_mb": max(peak[0], live),
+        "per_session_mb": (live - baseline) / max(sessions, 1),
+        "backend_calls": dict(backend.calls),
+    }
+    try:
+        from session_store import get_session_store
+
+        memory["session_store"] = get_session_store().summary()
+    except ImportError:
+        pass
+    return summarize(timings, elapsed), memory, pd.DataFrame(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=3, help="Dashboard/detection page pairs per session")
+    parser.add_argument("--rows", type=int, default=2000, help="Transactions per uploaded statement")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds allowed per page run")
+    parser.add_argument("--output", help="Write per-step timings to this CSV file")
+    args = parser.parse_args(argv)
+
+    summary, memory, timings = run_load_test(args.sessions, args.iterations, args.rows, args.timeout)
+    pd.set_option("display.width", 120)
+    print(f"{args.sessions} sessions x {args.iterations} iterations, {args.rows} rows per statement")
+    print(f"{summary.attrs['throughput']:.1f} page runs/s")
+    print(summary.round(1).to_string())
+    print(f"RSS: baseline {memory['baseline_mb']:.0f} MB, with sessions live {memory['live_mb']:.0f} MB, "
+          f"peak {memory['peak_mb']:.0f} MB, {memory['per_session_mb']:.1f} MB per session")
+    if "session_store" in memory:
+        store = memory["session_store"]
+        print(f"Shared frames: {store['frames_in_memory']} in memory ({store['memory_mb']:.1f} MB), "
+              f"{store['loads']} loads, {store['hits']} hits")
+    errors = timings[timings["error"].notna()]
+    if not errors.empty:
+        print("Errors:")
+        print(errors.groupby(["step", "error"]).size().to_string())
+    if args.output:
+        timings.to_csv(args.output, index=False)
+    return 1 if not errors.empty else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Compare the JSON-in-table storage path with Parquet storage.
+
+Usage:
+    python benchmarks/storage_benchmark.py --rows 200000
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parquet_storage import LocalParquetStore, write_frame, read_frame
+
+
+def make_transactions(rows, seed=0):
+    """
+    Build a synthetic bank statement with `rows` transactions.
+    """
+    rng = np.random.default_rng(seed)
+    merchants = np.array(["Netflix", "Spotify", "Local Gym", "Electric Co", "Coffee Shop", "Grocer"])
+    picks = rng.integers(0, len(merchants), rows)
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 1500, rows)), unit="D"),
+        "Amount": rng.uniform(1, 200, rows).round(2),
+        "Description": np.char.add(merchants[picks], " PURCHASE"),
+        "Merchant": merchants[picks],
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    data = make_transactions(args.rows)
+
+    payload, json_write = timed(lambda: data.to_json(orient="records"))
+    json_frame, json_read = timed(lambda: pd.read_json(io.StringIO(payload)))
+
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalParquetStore(root)
+        _, pq_write = timed(lambda: write_frame(store, "bench/data.parquet", data))
+        pq_frame, pq_read = timed(lambda: read_frame(store, "bench/data.parquet"))
+        _, pq_pruned = timed(lambda: read_frame(
+            store, "bench/data.parquet",
+            columns=["Date", "Amount"],
+            filters=[("Date", ">=", pd.Timestamp("2023-06-01"))],
+        ))
+        pq_size = os.path.getsize(os.path.join(root, "bench/data.parquet"))
+
+    print(f"rows: {args.rows}")
+    print(f"json     write {json_write:8.3f}s  read {json_read:8.3f}s  size {len(payload) / 1e6:8.2f} MB  Date dtype {json_frame['Date'].dtype}")
+    print(f"parquet  write {pq_write:8.3f}s  read {pq_read:8.3f}s  size {pq_size / 1e6:8.2f} MB  Date dtype {pq_frame['Date'].dtype}")
+    print(f"parquet  pruned read (2 columns, Date >= 2023-06-01) {pq_pruned:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
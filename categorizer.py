@@ -0,0 +1,241 @@
+import json
+import os
+import re
+import time
+import pandas as pd
+from instrumentation import timed
+from transaction_schema import text_values
+
+# Tiers in resolution order
+TIERS = ["lookup", "keywords", "model", "enrichment"]
+
+# Minimum model probability for a prediction to be accepted without enrichment
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+
+# Shipped keyword file, found relative to this module rather than the working directory
+DEFAULT_KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "keywords.json")
+
+# Category assigned to rows no tier could resolve
+FALLBACK_CATEGORY = "Others"
+
+# Cumulative per-tier counters for this process
+CATEGORIZER_STATS = {tier: {"rows": 0, "hits": 0, "seconds": 0.0} for tier in TIERS}
+
+
+def normalize_merchant(values):
+    """
+    Normalize merchant names for exact lookup (case- and whitespace-insensitive).
+    """
+    return text_values(values).str.strip().str.casefold().str.replace(r"\s+", " ", regex=True)
+
+
+def load_keywords(path=DEFAULT_KEYWORDS_PATH):
+    """
+    Load category keywords from a JSON file of {category: [keyword, ...]}.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compile_keyword_rules(keywords):
+    """
+    Compile {category: [keyword, ...]} into one case-insensitive, word-bounded
+    regex per category. Categories without keywords are skipped.
+    """
+    rules = []
+    for category, words in keywords.items():
+        words = [word for word in words if word]
+        if not words:
+            continue
+        # Longest first so "Amazon Prime" wins over "Amazon" within a category
+        alternation = "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+        rules.append((category, re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)))
+    return rules
+
+
+def summarize_stats(stats=None):
+    """
+    Return per-tier counters as a DataFrame with hit rate and mean latency per row.
+    """
+    stats = CATEGORIZER_STATS if stats is None else stats
+    summary = pd.DataFrame.from_dict(stats, orient="index")
+    summary["hit_rate"] = (summary["hits"] / summary["rows"]).where(summary["rows"] > 0, 0.0)
+    summary["ms_per_row"] = (summary["seconds"] * 1000 / summary["rows"]).where(summary["rows"] > 0, 0.0)
+    return summary
+
+
+class Categorizer:
+    """
+    Resolve transaction categories through progressively more expensive tiers:
+
+    1. lookup: exact (normalized) merchant -> category table, then the
+       canonical `Merchant Key` when present.
+    2. keywords: compiled keyword rules over merchant and description.
+    3. model: the organization's ML model, accepted above `confidence_threshold`.
+    4. enrichment: an external callable, only for remaining low-confidence rows.
+
+    Each tier only sees the rows earlier tiers left unresolved.
+    """
+
+    def __init__(self, lookup=None, keywords=None, model=None, enricher=None,
+                 confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD):
+        lookup = lookup or {}
+        self.lookup = dict(zip(normalize_merchant(pd.Series(list(lookup), dtype=object)), lookup.values()))
+        self.rules = compile_keyword_rules(keywords or {})
+        self.model = model
+        self.enricher = enricher
+        self.confidence_threshold = confidence_threshold
+
+    def _lookup_tier(self, data):
+        matched = normalize_merchant(data["Merchant"]).map(self.lookup)
+        if "Merchant Key" in data.columns:
+            # Fall back to the canonical key ("NETFLIX" for "NETFLIX.COM 866-579 CA")
+            matched = matched.fillna(normalize_merchant(data["Merchant Key"]).map(self.lookup))
+        return matched, pd.Series(1.0, index=data.index)
+
+    def _keyword_tier(self, data):
+        text = text_values(data["Merchant"]).str.cat(text_values(data["Description"]), sep=" ")
+        matched = pd.Series(None, index=data.index, dtype=object)
+        for category, pattern in self.rules:
+            open_rows = matched.isna()
+            if not open_rows.any():
+                break
+            hits = text[open_rows].str.contains(pattern)
+            matched[hits[hits].index] = category
+        return matched, pd.Series(1.0, index=data.index)
+
+    def _model_tier(self, data):
+        from ml_model import predict_chunk
+
+        predictions = predict_chunk(self.model, data)
+        return predictions["Predicted Category"], predictions["Confidence"]
+
+    def _enrichment_tier(self, data):
+        column = "Merchant Key" if "Merchant Key" in data.columns else "Merchant"
+        merchants = text_values(data[column])
+        # The enricher is called once per distinct merchant
+        categories = self.enricher(sorted(set(merchants)))
+        return merchants.map(categories), pd.Series(1.0, index=data.index)
+
+    @timed("categorizer.categorize")
+    def categorize(self, data):
+        """
+        Categorize `data` (with `Merchant` and `Description` columns).
+
+        Returns a copy with `Category`, `Category Source` and `Category Confidence`
+        columns, and a dict of this call's per-tier counters.
+        """
+        result = data.copy()
+        if "Merchant" not in result.columns:
+            result["Merchant"] = ""
+        if "Description" not in result.columns:
+            result["Description"] = ""
+
+        category = pd.Series(None, index=result.index, dtype=object)
+        source = pd.Series(None, index=result.index, dtype=object)
+        confidence = pd.Series(0.0, index=result.index)
+        # Best guess for rows the model saw, accepted or not
+        model_guess = pd.Series(None, index=result.index, dtype=object)
+
+        tiers = [
+            ("lookup", self._lookup_tier, bool(self.lookup)),
+            ("keywords", self._keyword_tier, bool(self.rules)),
+            ("model", self._model_tier, self.model is not None),
+            ("enrichment", self._enrichment_tier, self.enricher is not None),
+        ]
+        stats = {tier: {"rows": 0, "hits": 0, "seconds": 0.0} for tier in TIERS}
+        for name, resolve, enabled in tiers:
+            open_rows = category.isna()
+            if not enabled or not open_rows.any():
+                continue
+            subset = result.loc[open_rows]
+            start = time.perf_counter()
+            matched, scores = resolve(subset)
+            elapsed = time.perf_counter() - start
+
+            if name == "model":
+                # Every row keeps the model's score; only confident ones are accepted
+                model_guess[subset.index] = matched
+                confidence[subset.index] = scores
+                matched = matched.where(scores >= self.confidence_threshold)
+            hits = matched.notna()
+            category[hits[hits].index] = matched[hits]
+            source[hits[hits].index] = name
+            confidence[hits[hits].index] = scores[hits]
+
+            stats[name] = {"rows": len(subset), "hits": int(hits.sum()), "seconds": elapsed}
+            for key, value in stats[name].items():
+                CATEGORIZER_STATS[name][key] += value
+
+        # Low-confidence model guesses beat the generic fallback
+        guessed = category.isna() & model_guess.notna()
+        category[guessed] = model_guess[guessed]
+        source[guessed] = "model_low_confidence"
+        unresolved = category.isna()
+        category[unresolved] = FALLBACK_CATEGORY
+        source[unresolved] = "fallback"
+
+        result["Category"] = category
+        result["Category Source"] = source
+        result["Category Confidence"] = confidence
+        return result, stats
+
+
+def keyword_search_enricher(search, keywords):
+    """
+    Build an enricher that runs `search(merchant)` (e.g. a web search tool) and
+    applies the keyword rules to the returned text.
+    """
+    rules = compile_keyword_rules(keywords)
+
+    def enrich(merchants):
+        categories = {}
+        for merchant in merchants:
+            if not merchant:
+                continue
+            text = str(search(merchant))
+            for category, pattern in rules:
+                if pattern.search(text):
+                    categories[merchant] = category
+                    break
+        return categories
+
+    return enrich
+
+
+def build_categorizer(org_id, enrich=False, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD):
+    """
+    Build a categorizer for an organization from its validated subscriptions,
+    the keyword database and its trained model (when one exists).
+    """
+    from config_store import get_config_store
+    from supabase_integration import fetch_organization_data
+    from ml_model import load_model
+
+    validated = fetch_organization_data(org_id, "validated_subscriptions")
+    lookup = {row["merchant"]: row["category"] for row in validated if row.get("merchant") and row.get("category")}
+    # Feedback rows (one per canonical merchant) override earlier labels
+    for row in validated:
+        if row.get("merchant_key") and row.get("category"):
+            lookup[row["merchant_key"]] = row["category"]
+            lookup[row["merchant"]] = row["category"]
+
+    # File defaults plus global and organization keywords, cached per config version
+    keywords = get_config_store().keywords(org_id)
+
+    try:
+        model = load_model(org_id)
+    except ValueError:
+        model = None
+
+    enricher = None
+    if enrich:
+        from crewai_tools import SerperDevTool
+
+        serper_tool = SerperDevTool()
+        enricher = keyword_search_enricher(lambda merchant: serper_tool.run(search_query=merchant), keywords)
+
+    return Categorizer(lookup, keywords, model, enricher, confidence_threshold)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Most points sent to the browser per chart series
+MAX_POINTS = 500
+
+# Bucket sizes tried from finest to coarsest when the resolution is "auto"
+RESOLUTIONS = {"daily": "D", "weekly": "W-MON", "monthly": "MS", "quarterly": "QS", "yearly": "YS"}
+
+_APPROX_DAYS = {"daily": 1, "weekly": 7, "monthly": 30.44, "quarterly": 91.3, "yearly": 365.25}
+
+
+def choose_resolution(start, end, max_points=MAX_POINTS):
+    """
+    Return the finest bucket size that keeps the range within `max_points` buckets.
+    """
+    days = max((pd.Timestamp(end) - pd.Timestamp(start)).days + 1, 1)
+    for name, length in _APPROX_DAYS.items():
+        if days / length <= max_points:
+            return name
+    return "yearly"
+
+
+def resample(dates, values, resolution, how="sum"):
+    """
+    Aggregate values into calendar buckets ("daily", "weekly", "monthly", ...).
+
+    Returns a Series indexed by bucket start; empty buckets inside the range are 0 for sums.
+    """
+    series = pd.Series(np.asarray(values, dtype="float64"), index=pd.DatetimeIndex(dates)).sort_index()
+    if series.empty:
+        return series
+    buckets = series.resample(RESOLUTIONS[resolution], label="left", closed="left").agg(how)
+    if how in ("sum", "count", "size"):
+        buckets = buckets.fillna(0)
+    return buckets
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, per bucket, the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    mean, which preserves peaks and troughs. Returns the kept indices.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Mean of the next bucket (the last point for the final bucket)
+        next_start, next_stop = stop, edges[i + 2] if i + 2 < len(edges) else n
+        if next_start >= next_stop:
+            next_start, next_stop = n - 1, n
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return kept
+
+
+def downsample(dates, values, max_points=MAX_POINTS, resolution="auto", how="sum"):
+    """
+    Reduce a time series to at most `max_points` points for charting.
+
+    - "auto": calendar buckets at the finest resolution that fits the range.
+    - "daily"/"weekly"/"monthly"/...: those buckets, then LTTB if still too many.
+    - "raw": the individual points, thinned with LTTB.
+
+    Returns a Series indexed by date.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if len(dates) == 0:
+        return pd.Series(dtype="float64", index=pd.DatetimeIndex([]))
+    if resolution == "auto":
+        resolution = choose_resolution(dates.min(), dates.max(), max_points)
+    if resolution == "raw":
+        series = pd.Series(np.asarray(values, dtype="float64"), index=dates).sort_index()
+    else:
+        series = resample(dates, values, resolution, how)
+    if len(series) <= max_points:
+        return series
+    kept = lttb(series.index.asi8, series.to_numpy(), max_points)
+    return series.iloc[kept]
@@ -2,11 +2,16 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import pandas as pd
 import streamlit as st
+from visual_analysis import plot_elbow
 
 def cluster_transactions(data):
     """
     Cluster transactions based on amount and frequency.
     """
+    if 'Frequency' not in data.columns and 'Merchant Key' in data.columns:
+        # Transactions per canonical merchant
+        data['Frequency'] = data.groupby('Merchant Key', observed=True)['Merchant Key'].transform('size')
+
     scaler = StandardScaler()
     clustering_features = data[['Amount', 'Frequency']].fillna(0)
     scaled_data = scaler.fit_transform(clustering_features)
@@ -21,7 +26,8 @@ def display_cluster_analysis(data):
     Display cluster analysis results.
     """
     st.title("Transaction Clusters")
-    st.write(data[['Merchant', 'Cluster']].groupby('Cluster').count())
+    merchant = 'Merchant Key' if 'Merchant Key' in data.columns else 'Merchant'
+    st.write(data[[merchant, 'Cluster']].groupby('Cluster').nunique())
     st.write("Cluster Visualization Coming Soon!")
 
 
@@ -39,12 +45,7 @@ def perform_dynamic_clustering(data, max_clusters=10):
         kmeans.fit(scaled_data)
         inertia.append(kmeans.inertia_)
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(range(1, max_clusters + 1), inertia, marker='o')
-    plt.title("Elbow Method for Optimal Clusters")
-    plt.xlabel("Number of Clusters")
-    plt.ylabel("Inertia")
-    st.pyplot(plt)
+    plot_elbow(inertia)
 
     optimal_k = inertia.index(min(inertia[1:])) + 1
     kmeans = KMeans(n_clusters=optimal_k)
@@ -0,0 +1,265 @@
+import json
+import os
+import threading
+import time
+
+# Seconds between version checks per organization; config reads in between are served from memory
+POLL_SECONDS = float(os.environ.get("CONFIG_POLL_SECONDS", 5))
+
+# Version row for settings that apply to every organization (organization_id IS NULL)
+GLOBAL_SCOPE = 0
+
+# Shipped defaults, found relative to this module rather than the working directory
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_KEYWORDS_PATH = os.path.join(DATA_DIR, "keywords.json")
+DEFAULT_THRESHOLDS_PATH = os.path.join(DATA_DIR, "thresholds.json")
+
+
+def _load_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+class Config:
+    """
+    Effective thresholds and keywords for one organization at one version.
+    """
+
+    def __init__(self, version, thresholds, keywords, own_keywords=None):
+        self.version = version
+        self.thresholds = thresholds
+        self.keywords = keywords
+        # Keywords stored for this organization itself (the only ones it may remove)
+        self.own_keywords = own_keywords or {}
+
+    def __repr__(self):
+        return f"Config(version={self.version}, thresholds={len(self.thresholds)}, keywords={len(self.keywords)})"
+
+
+def merge_config(defaults, threshold_rows, keyword_rows):
+    """
+    Layer thresholds and keywords: file defaults, then global rows
+    (organization_id NULL), then the organization's own rows.
+
+    Returns (thresholds, keywords, own keywords).
+    """
+    thresholds = dict(defaults["thresholds"])
+    keywords = {category: list(words) for category, words in defaults["keywords"].items()}
+    # Global rows first so organization rows win
+    for row in sorted(threshold_rows, key=lambda row: row.get("organization_id") is not None):
+        thresholds[row["pattern"]] = int(row["days"])
+    own = {}
+    for row in keyword_rows:
+        words = keywords.setdefault(row["category"], [])
+        if row["keyword"] not in words:
+            words.append(row["keyword"])
+        if row.get("organization_id") is not None:
+            own.setdefault(row["category"], []).append(row["keyword"])
+    return thresholds, keywords, own
+
+
+class SupabaseConfigBackend:
+    """
+    Config reads and writes through supabase_integration.
+    """
+
+    def __init__(self):
+        import supabase_integration
+
+        self.db = supabase_integration
+
+    def fetch_versions(self, org_id):
+        return self.db.fetch_config_versions([GLOBAL_SCOPE, org_id or GLOBAL_SCOPE])
+
+    def fetch_rows(self, org_id):
+        return self.db.fetch_org_config(org_id)
+
+    def write_thresholds(self, org_id, thresholds):
+        self.db.update_thresholds(thresholds, org_id)
+
+    def add_keywords(self, org_id, rows):
+        self.db.insert_keywords(rows, org_id)
+
+    def remove_keywords(self, org_id, rows):
+        self.db.delete_keywords(rows, org_id)
+
+
+class PostgresConfigBackend:
+    """
+    Config reads and writes over a direct Postgres connection pool.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def fetch_versions(self, org_id):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT organization_id, version FROM public.config_versions WHERE organization_id = ANY(%s)",
+                ([GLOBAL_SCOPE, org_id or GLOBAL_SCOPE],),
+            ).fetchall()
+        return dict(rows)
+
+    def fetch_rows(self, org_id):
+        scope = "organization_id IS NULL OR organization_id = %s"
+        with self.pool.connection() as conn:
+            thresholds = conn.execute(
+                f"SELECT organization_id, pattern, days FROM public.thresholds WHERE {scope}", (org_id,)
+            ).fetchall()
+            keywords = conn.execute(
+                f"SELECT organization_id, category, keyword FROM public.keywords WHERE {scope} ORDER BY id", (org_id,)
+            ).fetchall()
+        return (
+            [{"organization_id": org, "pattern": pattern, "days": days} for org, pattern, days in thresholds],
+            [{"organization_id": org, "category": category, "keyword": keyword} for org, category, keyword in keywords],
+        )
+
+    def write_thresholds(self, org_id, thresholds):
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                conn.cursor().executemany(
+                    "INSERT INTO public.thresholds (organization_id, pattern, days) VALUES (%s, %s, %s) "
+                    "ON CONFLICT (organization_id, pattern) DO UPDATE SET days = EXCLUDED.days, updated_at = now()",
+                    [(org_id, pattern, days) for pattern, days in thresholds.items()],
+                )
+
+    def add_keywords(self, org_id, rows):
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                conn.cursor().executemany(
+                    "INSERT INTO public.keywords (organization_id, category, keyword) VALUES (%s, %s, %s)",
+                    [(org_id, category, keyword) for category, keyword in rows],
+                )
+
+    def remove_keywords(self, org_id, rows):
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                conn.cursor().executemany(
+                    "DELETE FROM public.keywords WHERE organization_id IS NOT DISTINCT FROM %s "
+                    "AND category = %s AND keyword = %s",
+                    [(org_id, category, keyword) for category, keyword in rows],
+                )
+
+
+class ConfigStore:
+    """
+    Per-organization thresholds and keywords, cached in process.
+
+    Every change to the `thresholds`/`keywords` tables bumps a counter in
+    `config_versions` (see databaseschema.sql). Reads poll only that counter,
+    at most every `poll_seconds`, and reload the tables when it moved, so all
+    app processes converge on new settings without re-reading full tables on
+    every rerun. Writes go out only when a value actually changes.
+    """
+
+    def __init__(self, backend, poll_seconds=POLL_SECONDS, keywords_path=DEFAULT_KEYWORDS_PATH,
+                 thresholds_path=DEFAULT_THRESHOLDS_PATH):
+        self.backend = backend
+        self.poll_seconds = poll_seconds
+        self.defaults = {
+            "thresholds": _load_json(thresholds_path, {}),
+            "keywords": _load_json(keywords_path, {}),
+        }
+        self.reloads = 0
+        self.polls = 0
+        self._cache = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def version(self, org_id=None):
+        """
+        Current (global, organization) version pair; one small query.
+        """
+        self.polls += 1
+        versions = self.backend.fetch_versions(org_id)
+        return (versions.get(GLOBAL_SCOPE, 0), versions.get(org_id or GLOBAL_SCOPE, 0))
+
+    def get(self, org_id=None, force=False):
+        """
+        Return the organization's Config, reloading only when its version changed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(org_id)
+            if cached is not None and not force and now - self._checked.get(org_id, 0) < self.poll_seconds:
+                return cached
+        version = self.version(org_id)
+        if cached is not None and not force and cached.version == version:
+            with self._lock:
+                self._checked[org_id] = now
+            return cached
+        threshold_rows, keyword_rows = self.backend.fetch_rows(org_id)
+        config = Config(version, *merge_config(self.defaults, threshold_rows, keyword_rows))
+        with self._lock:
+            self.reloads += 1
+            self._cache[org_id] = config
+            self._checked[org_id] = now
+        return config
+
+    def thresholds(self, org_id=None):
+        return self.get(org_id).thresholds
+
+    def keywords(self, org_id=None):
+        return self.get(org_id).keywords
+
+    def invalidate(self, org_id=None):
+        with self._lock:
+            self._checked.pop(org_id, None)
+
+    def set_thresholds(self, org_id, thresholds):
+        """
+        Write only the thresholds that differ from the current values.
+
+        Returns the changed {pattern: days}; empty when nothing was written.
+        """
+        current = self.get(org_id, force=True).thresholds
+        changed = {pattern: int(days) for pattern, days in thresholds.items() if current.get(pattern) != int(days)}
+        if changed:
+            self.backend.write_thresholds(org_id, changed)
+            self.invalidate(org_id)
+        return changed
+
+    def set_keywords(self, org_id, category, keywords):
+        """
+        Make `keywords` the organization's list for `category`, adding and
+        removing only the difference. Returns (added, removed).
+        """
+        config = self.get(org_id, force=True)
+        current = config.keywords.get(category, [])
+        wanted = list(dict.fromkeys(word.strip() for word in keywords if word and word.strip()))
+        added = [word for word in wanted if word not in current]
+        # File defaults and global rows are not the organization's to remove
+        removed = [word for word in config.own_keywords.get(category, []) if word not in wanted]
+        if added:
+            self.backend.add_keywords(org_id, [(category, word) for word in added])
+        if removed:
+            self.backend.remove_keywords(org_id, [(category, word) for word in removed])
+        if added or removed:
+            self.invalidate(org_id)
+        return added, removed
+
+    def add_keyword(self, org_id, category, keyword):
+        """
+        Add one keyword unless the category already has it. Returns True when written.
+        """
+        current = self.keywords(org_id).get(category, [])
+        added, _ = self.set_keywords(org_id, category, current + [keyword])
+        return bool(added)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_config_store():
+    """
+    Process-wide ConfigStore backed by Supabase, created on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConfigStore(SupabaseConfigBackend())
+        return _store
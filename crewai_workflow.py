@@ -1,6 +1,13 @@
+import io
+import json
 import pandas as pd
 from crewai import Agent, Task, Crew, Process
 from crewai_tools import SerperDevTool
+from categorizer import Categorizer, load_keywords
+from instrumentation import timed
+from merchant_normalization import add_merchant_key
+from transaction_schema import compact_frame, amount_cents, writable, text_values
+from result_cache import ResultCache, task_key
 import os
 
 # Load OpenAI API key (if needed for CrewAI tools like SerperDevTool)
@@ -9,11 +16,22 @@ os.environ["OPENAI_API_KEY"] = "your_openai_api_key_here"
 # Initialize SerperDevTool for enrichment
 serper_tool = SerperDevTool()
 
+# Agent and crew outputs keyed by task, agent configuration and inputs
+result_cache = ResultCache()
+
 # Step 1: Normalize Data
+@timed()
 def normalize_data(data):
     """
     Prepare the data for processing by cleaning and standardizing columns.
+
+    Accepts a DataFrame, an Arrow table, or (for older callers) a JSON records string.
     """
+    if isinstance(data, str):
+        data = pd.read_json(io.StringIO(data))
+    elif hasattr(data, "to_pandas"):
+        data = data.to_pandas()
+
     # Drop unnamed columns
     data = data.loc[:, ~data.columns.str.contains('^Unnamed')]
 
@@ -23,45 +41,46 @@ def normalize_data(data):
     if missing_columns:
         raise ValueError(f"The following required columns are missing: {', '.join(missing_columns)}")
 
-    # Convert date column to datetime for easier grouping
-    data["Date"] = pd.to_datetime(data["Date"])
+    # Canonical merchant key for grouping near-duplicate descriptions
+    if "Merchant Key" not in data.columns:
+        data = add_merchant_key(data)
 
-    return data
+    # Dates as datetime64, amounts in whole cents, repetitive text as categoricals
+    return compact_frame(data)
 
 # Step 2: Detect Recurring Charges
+@timed()
 def detect_recurring_charges(data):
     """
-    Detect potential recurring charges by grouping descriptions and amounts.
+    Detect potential recurring charges by grouping merchants and amounts.
     """
-    # Group by description and amount to find recurring charges
-    recurring = (
-        data.groupby(["Description", "Amount"])
-        .size()
-        .reset_index(name="Frequency")
-    )
+    # Group by canonical merchant key (raw description without one) and amount;
+    # amounts are compared in integer cents so float noise cannot split a group
+    merchant = "Merchant Key" if "Merchant Key" in data.columns else "Description"
+    cents = amount_cents(data)
+    frequency = data.groupby([data[merchant], cents], observed=True)[merchant].transform("size")
 
-    # Filter for transactions that occur more than once
-    recurring = recurring[recurring["Frequency"] > 1]
+    # Keep transactions that occur more than once
+    recurring_data = data[frequency > 1].assign(Frequency=frequency[frequency > 1])
 
-    # Merge back to include original details
-    recurring_data = data.merge(
-        recurring, on=["Description", "Amount"], how="inner"
-    ).sort_values(by=["Description", "Date"])
+    return recurring_data.sort_values(by=[merchant, "Date"])
 
-    return recurring_data
-
-def enrich_merchant_data(data):
+@timed()
+def enrich_merchant_data(data, categorizer=None):
     """
     Enrich recurring transactions by inferring merchant details from descriptions.
+
+    Categories come from the tiered categorizer; without an organization-specific
+    one (see `categorizer.build_categorizer`), only the keyword rules are used.
     """
     # Infer the 'Merchant' column if it is missing
     if "Merchant" not in data.columns:
         data["Merchant"] = data["Description"].apply(lambda desc: infer_merchant_from_description(desc))
 
     # Add enrichment context (e.g., category)
-    data["Category"] = data["Merchant"].apply(
-        lambda merchant: "Subscription" if merchant != "Unknown Merchant" else "Unknown"
-    )
+    if categorizer is None:
+        categorizer = Categorizer(keywords=load_keywords())
+    data, _ = categorizer.categorize(data)
 
     return data
 
@@ -80,10 +99,78 @@ def infer_merchant_from_description(description):
     else:
         return "Unknown Merchant"
 
+def needs_agent_reasoning(data):
+    """
+    Flag rows the deterministic stages could not resolve: unknown merchants or
+    categories that only came from the fallback or a low-confidence model guess.
+    """
+    unknown_merchant = data["Merchant"] == "Unknown Merchant"
+    if "Category Source" in data.columns:
+        unresolved = data["Category Source"].isin(["fallback", "model_low_confidence"])
+    else:
+        unresolved = pd.Series(False, index=data.index)
+    return unknown_merchant | unresolved
+
+def parse_agent_enrichment(output):
+    """
+    Parse the enrichment agent's JSON answer into {description: (merchant, category)}.
+    """
+    text = str(output)
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    enrichment = {}
+    for item in items:
+        if isinstance(item, dict) and item.get("description"):
+            enrichment[item["description"]] = (item.get("merchant"), item.get("category"))
+    return enrichment
+
+@timed()
+def run_agent_enrichment(descriptions, crew=None, cache=None):
+    """
+    Ask the enrichment agent about distinct descriptions the local stages could not resolve.
+
+    Answers are cached per description, so merchants seen in earlier files
+    are not sent again; only the misses go to the agent, in one call.
+    `crew` can be any object with a `kickoff(inputs=...)` method.
+    """
+    crew = crew or enrichment_crew
+    cache = cache or result_cache
+    task = crew.tasks[0] if getattr(crew, "tasks", None) else agent_enrichment_task
+    enrichment = {}
+    missing = []
+    for description in descriptions:
+        cached = cache.get(task_key(task, {"description": description}))
+        if cached is None:
+            missing.append(description)
+        else:
+            enrichment[description] = tuple(cached)
+    if not missing:
+        return enrichment
+
+    result = crew.kickoff(inputs={"descriptions": "\n".join(missing)})
+    answers = parse_agent_enrichment(getattr(result, "raw", result))
+    for description in missing:
+        if description in answers:
+            # Unanswered descriptions are not cached so they are retried next time
+            cache.put(task_key(task, {"description": description}), list(answers[description]))
+            enrichment[description] = answers[description]
+    return enrichment
+
 # Step 4: Full Workflow
-def run_crewai_workflow(data):
+@timed()
+def run_crewai_workflow(data, categorizer=None, use_agents=True, crew=None):
     """
     Full workflow to detect recurring transactions and enrich them.
+
+    Stages pass DataFrames in process: normalize, detect and enrich run
+    locally, and the CrewAI enrichment agent is only called once for the
+    distinct descriptions that are still unresolved afterwards. `crew` is
+    passed to `run_agent_enrichment`.
     """
     try:
         # Step 1: Normalize data
@@ -97,13 +184,34 @@ def run_crewai_workflow(data):
             return None
 
         # Step 3: Enrich recurring transactions
-        enriched_data = enrich_merchant_data(recurring_data)
-
-        return enriched_data
+        enriched_data = enrich_merchant_data(recurring_data, categorizer)
     except Exception as e:
         print(f"Error detecting recurring subscriptions: {e}")
         return None
 
+    # Step 4: Agent enrichment for the remaining rows only
+    if use_agents:
+        pending = needs_agent_reasoning(enriched_data)
+        descriptions = sorted(enriched_data.loc[pending, "Description"].dropna().astype(str).unique())
+        try:
+            agent_results = run_agent_enrichment(descriptions, crew=crew)
+        except Exception as e:
+            print(f"Error running enrichment agent: {e}")
+            agent_results = {}
+        if agent_results:
+            enriched_data = writable(enriched_data, ["Merchant", "Category", "Category Source"])
+            answered = pending & enriched_data["Description"].isin(agent_results.keys())
+            # Description stays categorical on compacted frames; map plain strings
+            answers = text_values(enriched_data.loc[answered, "Description"]).map(agent_results)
+            merchants = answers.str[0]
+            categories = answers.str[1]
+            enriched_data.loc[answered, "Merchant"] = merchants.where(merchants.notna(), enriched_data.loc[answered, "Merchant"])
+            enriched_data.loc[answered, "Category"] = categories.where(categories.notna(), enriched_data.loc[answered, "Category"])
+            if "Category Source" in enriched_data.columns:
+                enriched_data.loc[answered, "Category Source"] = "agent"
+
+    return enriched_data
+
 # Step 5: Integration with CrewAI
 # Define CrewAI agents and tasks
 normalizer_agent = Agent(
@@ -148,6 +256,19 @@ enrichment_task = Task(
     agent=enrichment_agent
 )
 
+# Targeted enrichment of descriptions the local stages could not resolve
+agent_enrichment_task = Task(
+    description=(
+        "Identify the merchant and spending category for each of these bank "
+        "transaction descriptions, one per line:\n{descriptions}"
+    ),
+    expected_output=(
+        'A JSON list of objects with "description" (copied exactly), '
+        '"merchant" and "category" keys.'
+    ),
+    agent=enrichment_agent
+)
+
 # Define Crew
 crew = Crew(
     agents=[normalizer_agent, recurring_detector_agent, enrichment_agent],
@@ -155,3 +276,8 @@ crew = Crew(
     process=Process.sequential  # Sequential execution of tasks
 )
 
+enrichment_crew = Crew(
+    agents=[enrichment_agent],
+    tasks=[agent_enrichment_task],
+    process=Process.sequential
+)
@@ -0,0 +1,269 @@
+import csv
+from collections import Counter
+import re
+import numpy as np
+import pandas as pd
+
+# Bytes read from the start of a file to detect its format
+SAMPLE_SIZE = 64 * 1024
+
+# Lines scanned for the header row (banks often prepend account summaries)
+MAX_HEADER_SCAN = 20
+
+CANDIDATE_ENCODINGS = ["utf-8-sig", "cp1252", "latin-1"]
+CANDIDATE_DELIMITERS = ",;\t|"
+CANDIDATE_DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%d/%y",
+    "%d/%m/%y",
+    "%d.%m.%Y",
+    "%d-%m-%Y",
+    "%m-%d-%Y",
+    "%d %b %Y",
+    "%d-%b-%Y",
+]
+
+# Known bank export layouts: source column -> canonical column
+BANK_FORMATS = {
+    "generic": {"Date": "Date", "Amount": "Amount", "Description": "Description"},
+    "chase": {"Posting Date": "Date", "Amount": "Amount", "Description": "Description"},
+    "bank_of_america": {"Posted Date": "Date", "Amount": "Amount", "Payee": "Description"},
+    "revolut": {"Started Date": "Date", "Amount": "Amount", "Description": "Description"},
+    "monzo": {"Date": "Date", "Amount": "Amount", "Name": "Description"},
+    "n26": {"Date": "Date", "Amount (EUR)": "Amount", "Payee": "Description"},
+    "commbank": {"Transaction Date": "Date", "Amount": "Amount", "Narrative": "Description"},
+}
+
+_AMOUNT = re.compile(r"^[-+]?\d[\d.,]*$")
+
+
+def register_bank_format(name, columns):
+    """
+    Register a bank export layout as a mapping of source column to canonical column.
+    """
+    canonical = set(columns.values())
+    missing = {"Date", "Amount", "Description"} - canonical
+    if missing:
+        raise ValueError(f"Bank format '{name}' does not map: {', '.join(sorted(missing))}")
+    BANK_FORMATS[name] = dict(columns)
+
+
+def _read_sample(source):
+    """
+    Read the first SAMPLE_SIZE bytes of a path or file-like object, rewinding the latter.
+    """
+    if hasattr(source, "read"):
+        position = source.tell()
+        sample = source.read(SAMPLE_SIZE)
+        source.seek(position)
+    else:
+        with open(source, "rb") as f:
+            sample = f.read(SAMPLE_SIZE)
+    if isinstance(sample, str):
+        sample = sample.encode("utf-8")
+    return sample
+
+
+def _detect_encoding(sample):
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            # The sample may end mid-character; only the tail is allowed to fail
+            sample[:-4].decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def _detect_delimiter(lines):
+    """
+    Pick the delimiter that splits the most lines into the same number (>1) of fields.
+
+    Unlike `csv.Sniffer`, this tolerates free-text preamble lines above the header.
+    """
+    best, best_score = ",", 0
+    for delimiter in CANDIDATE_DELIMITERS:
+        widths = Counter(len(row) for row in csv.reader(lines, delimiter=delimiter) if len(row) > 1)
+        if widths:
+            score = widths.most_common(1)[0][1]
+            if score > best_score:
+                best, best_score = delimiter, score
+    return best
+
+
+def _detect_header(rows):
+    """
+    Find the header row and the bank format whose columns it contains.
+    """
+    for index, row in enumerate(rows[:MAX_HEADER_SCAN]):
+        cells = {cell.strip() for cell in row}
+        for name, columns in BANK_FORMATS.items():
+            if set(columns).issubset(cells):
+                return index, name
+    return 0, None
+
+
+def _decimal_vote(value):
+    """
+    The decimal separator one amount implies: "," or ".", or None when it
+    could be either (e.g. "1,000" is a thousand or one with three decimals).
+    """
+    dot, comma = value.rfind("."), value.rfind(",")
+    if dot >= 0 and comma >= 0:
+        return "." if dot > comma else ","
+    separator = "." if dot >= 0 else ","
+    if value.count(separator) > 1:
+        # Repeated separators can only group thousands
+        return "," if separator == "." else "."
+    if len(value) - value.rfind(separator) - 1 == 3:
+        return None
+    return separator
+
+
+def _detect_decimal(values):
+    """
+    Decide the decimal and thousands separators from the whole Amount column.
+
+    Values such as "15,99" or "1.234,50" vote for a comma decimal, "9.99" or
+    "1,234.50" for a point; "1,000" is ambiguous and does not vote. A comma
+    decimal needs at least one vote and none against, so US amounts without
+    cents keep "," as the thousands separator.
+    """
+    values = [value.strip() for value in values if value and value.strip()]
+    votes = {_decimal_vote(value) for value in values if _AMOUNT.match(value) and ("," in value or "." in value)}
+    if "," in votes and "." not in votes:
+        return ",", "."
+    if any("," in value for value in values):
+        return ".", ","
+    return ".", None
+
+
+def _detect_date_format(values):
+    values = [value.strip() for value in values if value and value.strip()]
+    if not values:
+        return None
+    sample = pd.Series(values)
+    for date_format in CANDIDATE_DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=date_format, errors="coerce")
+        if parsed.notna().all():
+            return date_format
+    return None
+
+
+def parse_dates(values, date_format=None):
+    """
+    Convert date strings to datetime64, parsing each distinct value only once.
+
+    Statements repeat the same few hundred dates across many rows, so parsing
+    the uniques and broadcasting back is much cheaper than parsing every row.
+    """
+    codes, uniques = pd.factorize(values)
+    if date_format is not None:
+        parsed = pd.to_datetime(pd.Series(uniques), format=date_format, errors="coerce")
+    else:
+        parsed = pd.to_datetime(pd.Series(uniques), errors="coerce")
+    # Missing values have code -1, which takes the NaT appended last (also when
+    # the column is all missing and there are no uniques)
+    parsed = parsed.to_numpy()
+    result = np.append(parsed, np.array(["NaT"], dtype=parsed.dtype)).take(codes)
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def sniff_csv(source):
+    """
+    Detect encoding, delimiter, header row, bank format, date format and
+    decimal conventions from a sample at the start of the file.
+    """
+    sample = _read_sample(source)
+    encoding = _detect_encoding(sample)
+    lines = sample.decode(encoding, errors="replace").splitlines()
+    if len(sample) == SAMPLE_SIZE:
+        # Drop the possibly truncated last line
+        lines = lines[:-1]
+    delimiter = _detect_delimiter(lines)
+    rows = list(csv.reader(lines, delimiter=delimiter))
+    header_row, bank_format = _detect_header(rows)
+
+    columns = BANK_FORMATS.get(bank_format, BANK_FORMATS["generic"])
+    header = [cell.strip() for cell in rows[header_row]] if rows else []
+    source_for = {canonical: source_col for source_col, canonical in columns.items()}
+
+    def column_values(canonical):
+        name = source_for.get(canonical)
+        if name not in header:
+            return []
+        position = header.index(name)
+        return [row[position] for row in rows[header_row + 1:] if len(row) > position]
+
+    decimal, thousands = _detect_decimal(column_values("Amount"))
+    return {
+        "encoding": encoding,
+        "delimiter": delimiter,
+        "header_row": header_row,
+        "bank_format": bank_format,
+        "columns": columns,
+        "date_format": _detect_date_format(column_values("Date")),
+        "decimal": decimal,
+        "thousands": thousands,
+    }
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def parse_bank_csv(source, csv_format=None, engine=None):
+    """
+    Parse a bank statement CSV into canonical `Date`, `Amount` and `Description`
+    columns (plus any other columns in the file) with explicit dtypes.
+
+    Parameters:
+    - source: Path or file-like object.
+    - csv_format: Result of `sniff_csv`; detected when not provided.
+    - engine: pandas CSV engine; defaults to "pyarrow" when installed and the
+      file's conventions allow it, otherwise "c".
+    """
+    if csv_format is None:
+        csv_format = sniff_csv(source)
+    columns = csv_format["columns"]
+    # Dates and descriptions stay text until converted below so that numeric
+    # conventions (e.g. "." thousands separators) cannot mangle them
+    text_columns = {src: "string" for src, canonical in columns.items() if canonical in ("Date", "Description")}
+
+    if engine is None:
+        # pyarrow has no thousands separator and counts skipped rows differently
+        usable = csv_format["thousands"] is None and csv_format["header_row"] == 0
+        engine = "pyarrow" if usable and _pyarrow_available() else "c"
+
+    options = {
+        "sep": csv_format["delimiter"],
+        "encoding": csv_format["encoding"],
+        "skiprows": csv_format["header_row"],
+        "decimal": csv_format["decimal"],
+        "dtype": text_columns,
+        "engine": engine,
+    }
+    if csv_format["thousands"] is not None:
+        options["thousands"] = csv_format["thousands"]
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    data = pd.read_csv(source, **options)
+    data.columns = [str(col).strip() for col in data.columns]
+    data = data.loc[:, ~data.columns.str.startswith("Unnamed")]
+    data = data.rename(columns=columns)
+
+    if "Date" in data.columns and not pd.api.types.is_datetime64_any_dtype(data["Date"]):
+        data["Date"] = parse_dates(data["Date"], csv_format["date_format"])
+    if "Amount" in data.columns and not pd.api.types.is_numeric_dtype(data["Amount"]):
+        data["Amount"] = pd.to_numeric(data["Amount"], errors="coerce")
+
+    return data
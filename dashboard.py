@@ -1,6 +1,88 @@
 import streamlit as st
 import pandas as pd
 from supabase_integration import fetch_uploaded_files, fetch_stored_subscriptions, fetch_organizations
+from chart_data import MAX_POINTS, downsample
+from renewals import get_renewal_index
+
+# How long downsampled chart series are cached per user and date range
+CHART_TTL_SECONDS = 300
+
+# Date ranges offered on the dashboard, in days (None for all history)
+DATE_RANGES = {"Last 3 months": 91, "Last year": 365, "Last 3 years": 3 * 365, "All time": None}
+
+RESOLUTION_OPTIONS = {
+    "Auto": "auto",
+    "Daily": "daily",
+    "Weekly": "weekly",
+    "Monthly": "monthly",
+    "Individual charges (LTTB)": "raw",
+}
+
+# Upcoming renewal windows offered on the dashboard, in days
+RENEWAL_WINDOWS = [7, 30]
+
+RENEWAL_DISPLAY = ["merchant", "pattern", "amount", "last_charge_date", "next_charge_date"]
+RENEWAL_LABELS = {"merchant": "Merchant", "pattern": "Frequency", "amount": "Amount",
+                  "last_charge_date": "Last Charge", "next_charge_date": "Next Charge"}
+
+
+def subscription_frame(rows):
+    """
+    Normalize stored subscription rows to `Date`, `Amount`, `Category` and `status` columns.
+    """
+    data = pd.DataFrame(rows)
+    if data.empty:
+        return pd.DataFrame(columns=["Date", "Amount", "Category", "status"])
+    date_column = next((col for col in ["Date", "date", "created_at"] if col in data.columns), None)
+    return pd.DataFrame({
+        "Date": pd.to_datetime(data[date_column], errors="coerce", utc=True).dt.tz_localize(None) if date_column else pd.NaT,
+        "Amount": pd.to_numeric(data.get("Amount", data.get("amount")), errors="coerce"),
+        "Category": data.get("Category", data.get("category")),
+        "status": data.get("status"),
+    }).dropna(subset=["Date", "Amount"])
+
+
+@st.cache_data(ttl=CHART_TTL_SECONDS, max_entries=256, show_spinner=False)
+def load_chart_data(user_id, start, end, resolution, max_points=MAX_POINTS):
+    """
+    Build the dashboard's chart series for one user and date range.
+
+    Only the downsampled series (at most `max_points` points each) and small
+    aggregates are cached and sent to the browser, never the raw rows.
+    """
+    data = subscription_frame(fetch_stored_subscriptions(user_id))
+    if start is not None:
+        data = data[data["Date"] >= pd.Timestamp(start)]
+    data = data[data["Date"] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+    return {
+        "rows": len(data),
+        "cancelled": int((data["status"] == "cancelled").sum()),
+        "amount": downsample(data["Date"], data["Amount"], max_points, resolution).rename("Amount"),
+        "monthly": downsample(data["Date"], data["Amount"], max_points, "monthly").rename("Amount"),
+        "categories": data["Category"].value_counts(),
+    }
+
+
+def render_renewals(user):
+    """
+    Show renewals expected soon and expected charges that never arrived,
+    both read from the precomputed renewal index.
+    """
+    index = get_renewal_index()
+    st.subheader("Upcoming Renewals")
+    days = st.radio("Renewing within", RENEWAL_WINDOWS, format_func=lambda days: f"{days} days", horizontal=True)
+    upcoming = index.upcoming(user.id, days)
+    if upcoming.empty:
+        st.info(f"No renewals expected in the next {days} days.")
+    else:
+        st.metric("Expected Charges", f"{upcoming['amount'].abs().sum():,.2f}")
+        st.dataframe(upcoming[RENEWAL_DISPLAY].rename(columns=RENEWAL_LABELS), hide_index=True)
+
+    missed = index.missed(user.id)
+    if not missed.empty:
+        st.warning(f"{len(missed)} expected charges did not arrive; these subscriptions may have been cancelled.")
+        st.dataframe(missed[RENEWAL_DISPLAY].rename(columns=RENEWAL_LABELS), hide_index=True)
+
 
 def render_dashboard(user):
     """
@@ -10,7 +92,6 @@ def render_dashboard(user):
 
     # Fetch organization information
     organizations_df = fetch_organizations()
-    st.write("Organizations DataFrame:", organizations_df)  # Debugging information
     if "id" not in organizations_df.columns:
         st.error("The 'id' column is missing from the organizations DataFrame.")
         return
@@ -21,9 +102,14 @@ def render_dashboard(user):
     files = fetch_uploaded_files(user.id)
     num_files = len(files)
 
-    # Fetch subscriptions
-    subscriptions = fetch_stored_subscriptions(user.id)
-    num_subscriptions = len(subscriptions)
+    # Chart range and resolution; the cache key uses whole days
+    col1, col2 = st.columns(2)
+    range_label = col1.selectbox("Date range", list(DATE_RANGES), index=1)
+    resolution_label = col2.selectbox("Resolution", list(RESOLUTION_OPTIONS))
+    end = pd.Timestamp.now().normalize().date()
+    days = DATE_RANGES[range_label]
+    start = (pd.Timestamp(end) - pd.Timedelta(days=days)).date() if days else None
+    charts = load_chart_data(user.id, start, end, RESOLUTION_OPTIONS[resolution_label])
 
     # Display information
     st.subheader("User Information")
@@ -32,25 +118,24 @@ def render_dashboard(user):
 
     st.subheader("Statistics")
     st.metric("Number of Files Loaded", num_files)
-    st.metric("Subscriptions Found", num_subscriptions)
-    st.metric("Cancelled Subscriptions", len(subscriptions[subscriptions["status"] == "cancelled"]))
+    st.metric("Subscriptions Found", charts["rows"])
+    st.metric("Cancelled Subscriptions", charts["cancelled"])
+
+    render_renewals(user)
 
     # Visualization options
     st.subheader("Visualizations")
 
-    # Example: Line chart of subscriptions over time
-    if not subscriptions.empty:
-        subscriptions["Date"] = pd.to_datetime(subscriptions["Date"])
-        subscriptions.set_index("Date", inplace=True)
-        st.line_chart(subscriptions["Amount"])
-
-    # Example: Bar chart of subscriptions by category
-    if "Category" in subscriptions.columns:
-        category_counts = subscriptions["Category"].value_counts()
-        st.bar_chart(category_counts)
-
-    # Example: Area chart of spending trends
-    if not subscriptions.empty:
-        subscriptions["Month"] = subscriptions.index.to_period("M")
-        monthly_spending = subscriptions.groupby("Month")["Amount"].sum()
-        st.area_chart(monthly_spending)
+    if charts["rows"] == 0:
+        st.info("No subscriptions in this date range.")
+        return
+
+    # Subscription amounts over time, at most MAX_POINTS points
+    st.line_chart(charts["amount"])
+    st.caption(f"{charts['rows']} charges shown as {len(charts['amount'])} points.")
+
+    # Subscriptions by category
+    st.bar_chart(charts["categories"])
+
+    # Monthly spending trend
+    st.area_chart(charts["monthly"])
@@ -122,97 +122,97 @@ ON public.organizations (admin_user_id);
 CREATE POLICY "Authenticated users can read their own profile data" 
 ON auth.users 
 FOR SELECT 
-USING (auth.uid() = id);
+USING ((select auth.uid()) = id);
 
 -- Allow authenticated users to update their own profile data
 CREATE POLICY "Authenticated users can update their own profile data" 
 ON auth.users 
 FOR UPDATE 
-USING (auth.uid() = id);
+USING ((select auth.uid()) = id);
 
 -- Allow service role to update any user data
 CREATE POLICY "Service role can update any user data" 
 ON auth.users 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow authenticated users to read their own organization data
 CREATE POLICY "Authenticated users can read their own organization data" 
 ON public.organizations 
 FOR SELECT 
-USING (auth.uid() = admin_user_id);
+USING ((select auth.uid()) = admin_user_id);
 
 -- Allow authenticated users to insert organization data
 CREATE POLICY "Authenticated users can insert their own organization data" 
 ON public.organizations 
 FOR INSERT 
-WITH CHECK (auth.uid() = admin_user_id);
+WITH CHECK ((select auth.uid()) = admin_user_id);
 
 -- Allow authenticated users to read their own validated subscriptions
 CREATE POLICY "Authenticated users can read their own validated subscriptions" 
 ON public.validated_subscriptions 
 FOR SELECT 
-USING (auth.uid() = user_id);
+USING ((select auth.uid()) = user_id);
 
 -- Allow authenticated users to insert validated subscriptions
 CREATE POLICY "Authenticated users can insert their own validated subscriptions" 
 ON public.validated_subscriptions 
 FOR INSERT 
-WITH CHECK (auth.uid() = user_id);
+WITH CHECK ((select auth.uid()) = user_id);
 
 -- Allow service role to update any validated subscriptions
 CREATE POLICY "Service role can update any validated subscriptions" 
 ON public.validated_subscriptions 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow authenticated users to read their own uploaded files
 CREATE POLICY "Authenticated users can read their own uploaded files" 
 ON public.uploaded_files 
 FOR SELECT 
-USING (auth.uid() = user_id);
+USING ((select auth.uid()) = user_id);
 
 -- Allow authenticated users to insert uploaded files
 CREATE POLICY "Authenticated users can insert their own uploaded files" 
 ON public.uploaded_files 
 FOR INSERT 
-WITH CHECK (auth.uid() = user_id);
+WITH CHECK ((select auth.uid()) = user_id);
 
 -- Allow service role to update any uploaded files
 CREATE POLICY "Service role can update any uploaded files" 
 ON public.uploaded_files 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow authenticated users to read their own enriched data
 CREATE POLICY "Authenticated users can read their own enriched data" 
 ON public.enriched_data 
 FOR SELECT 
-USING (auth.uid() = user_id);
+USING ((select auth.uid()) = user_id);
 
 -- Allow authenticated users to insert enriched data
 CREATE POLICY "Authenticated users can insert their own enriched data" 
 ON public.enriched_data 
 FOR INSERT 
-WITH CHECK (auth.uid() = user_id);
+WITH CHECK ((select auth.uid()) = user_id);
 
 -- Allow service role to update any enriched data
 CREATE POLICY "Service role can update any enriched data" 
 ON public.enriched_data 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow service role to insert logs
 CREATE POLICY "Service role can insert logs" 
 ON public.app_logs 
 FOR INSERT 
-WITH CHECK (auth.role() = 'service_role');
+WITH CHECK ((select auth.role()) = 'service_role');
 
 -- Allow service role to read logs
 CREATE POLICY "Service role can read logs" 
 ON public.app_logs 
 FOR SELECT 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Create the tables
 
@@ -304,97 +304,97 @@ ON public.organizations (admin_user_id);
 CREATE POLICY "Authenticated users can read their own profile data" 
 ON auth.users 
 FOR SELECT 
-USING (auth.uid() = id);
+USING ((select auth.uid()) = id);
 
 -- Allow authenticated users to update their own profile data
 CREATE POLICY "Authenticated users can update their own profile data" 
 ON auth.users 
 FOR UPDATE 
-USING (auth.uid() = id);
+USING ((select auth.uid()) = id);
 
 -- Allow service role to update any user data
 CREATE POLICY "Service role can update any user data" 
 ON auth.users 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow authenticated users to read their own organization data
 CREATE POLICY "Authenticated users can read their own organization data" 
 ON public.organizations 
 FOR SELECT 
-USING (auth.uid() = admin_user_id);
+USING ((select auth.uid()) = admin_user_id);
 
 -- Allow authenticated users to insert organization data
 CREATE POLICY "Authenticated users can insert their own organization data" 
 ON public.organizations 
 FOR INSERT 
-WITH CHECK (auth.uid() = admin_user_id);
+WITH CHECK ((select auth.uid()) = admin_user_id);
 
 -- Allow authenticated users to read their own validated subscriptions
 CREATE POLICY "Authenticated users can read their own validated subscriptions" 
 ON public.validated_subscriptions 
 FOR SELECT 
-USING (auth.uid() = user_id);
+USING ((select auth.uid()) = user_id);
 
 -- Allow authenticated users to insert validated subscriptions
 CREATE POLICY "Authenticated users can insert their own validated subscriptions" 
 ON public.validated_subscriptions 
 FOR INSERT 
-WITH CHECK (auth.uid() = user_id);
+WITH CHECK ((select auth.uid()) = user_id);
 
 -- Allow service role to update any validated subscriptions
 CREATE POLICY "Service role can update any validated subscriptions" 
 ON public.validated_subscriptions 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow authenticated users to read their own uploaded files
 CREATE POLICY "Authenticated users can read their own uploaded files" 
 ON public.uploaded_files 
 FOR SELECT 
-USING (auth.uid() = user_id);
+USING ((select auth.uid()) = user_id);
 
 -- Allow authenticated users to insert uploaded files
 CREATE POLICY "Authenticated users can insert their own uploaded files" 
 ON public.uploaded_files 
 FOR INSERT 
-WITH CHECK (auth.uid() = user_id);
+WITH CHECK ((select auth.uid()) = user_id);
 
 -- Allow service role to update any uploaded files
 CREATE POLICY "Service role can update any uploaded files" 
 ON public.uploaded_files 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow authenticated users to read their own enriched data
 CREATE POLICY "Authenticated users can read their own enriched data" 
 ON public.enriched_data 
 FOR SELECT 
-USING (auth.uid() = user_id);
+USING ((select auth.uid()) = user_id);
 
 -- Allow authenticated users to insert enriched data
 CREATE POLICY "Authenticated users can insert their own enriched data" 
 ON public.enriched_data 
 FOR INSERT 
-WITH CHECK (auth.uid() = user_id);
+WITH CHECK ((select auth.uid()) = user_id);
 
 -- Allow service role to update any enriched data
 CREATE POLICY "Service role can update any enriched data" 
 ON public.enriched_data 
 FOR UPDATE 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Allow service role to insert logs
 CREATE POLICY "Service role can insert logs" 
 ON public.app_logs 
 FOR INSERT 
-WITH CHECK (auth.role() = 'service_role');
+WITH CHECK ((select auth.role()) = 'service_role');
 
 -- Allow service role to read logs
 CREATE POLICY "Service role can read logs" 
 ON public.app_logs 
 FOR SELECT 
-USING (auth.role() = 'service_role');
+USING ((select auth.role()) = 'service_role');
 
 -- Drop existing policies on auth.users
 drop policy if exists "Allow authenticated users to read their own data" on auth.users;
@@ -429,92 +429,92 @@ drop policy if exists "Allow service role to read logs" on public.app_logs;
 create policy "Allow authenticated users to read their own data"
 on auth.users
 for select
-using (auth.uid() = id);
+using ((select auth.uid()) = id);
 
 create policy "Allow authenticated users to update their own data"
 on auth.users
 for update
-using (auth.uid() = id);
+using ((select auth.uid()) = id);
 
 create policy "Allow service role to update any user data"
 on auth.users
 for update
-using (auth.role() = 'service_role');
+using ((select auth.role()) = 'service_role');
 
 -- Recreate policies on public.organizations
 create policy "Allow authenticated users to read their own organization data"
 on public.organizations
 for select
-using (auth.uid() = admin_user_id);
+using ((select auth.uid()) = admin_user_id);
 
 create policy "Allow authenticated users to insert organization data"
 on public.organizations
 for insert
-with check (auth.uid() = admin_user_id);
+with check ((select auth.uid()) = admin_user_id);
 
 create policy "Allow service role to update any organization data"
 on public.organizations
 for update
-using (auth.role() = 'service_role');
+using ((select auth.role()) = 'service_role');
 
 -- Recreate policies on public.validated_subscriptions
 create policy "Allow authenticated users to read their own validated subscriptions"
 on public.validated_subscriptions
 for select
-using (auth.uid() = user_id);
+using ((select auth.uid()) = user_id);
 
 create policy "Allow authenticated users to insert validated subscriptions"
 on public.validated_subscriptions
 for insert
-with check (auth.uid() = user_id);
+with check ((select auth.uid()) = user_id);
 
 create policy "Allow service role to update any validated subscriptions"
 on public.validated_subscriptions
 for update
-using (auth.role() = 'service_role');
+using ((select auth.role()) = 'service_role');
 
 -- Recreate policies on public.uploaded_files
 create policy "Allow authenticated users to read their own uploaded files"
 on public.uploaded_files
 for select
-using (auth.uid() = user_id);
+using ((select auth.uid()) = user_id);
 
 create policy "Allow authenticated users to insert uploaded files"
 on public.uploaded_files
 for insert
-with check (auth.uid() = user_id);
+with check ((select auth.uid()) = user_id);
 
 create policy "Allow service role to update any uploaded files"
 on public.uploaded_files
 for update
-using (auth.role() = 'service_role');
+using ((select auth.role()) = 'service_role');
 
 -- Recreate policies on public.enriched_data
 create policy "Allow authenticated users to read their own enriched data"
 on public.enriched_data
 for select
-using (auth.uid() = user_id);
+using ((select auth.uid()) = user_id);
 
 create policy "Allow authenticated users to insert enriched data"
 on public.enriched_data
 for insert
-with check (auth.uid() = user_id);
+with check ((select auth.uid()) = user_id);
 
 create policy "Allow service role to update any enriched data"
 on public.enriched_data
 for update
-using (auth.role() = 'service_role');
+using ((select auth.role()) = 'service_role');
 
 -- Recreate policies on public.app_logs
 create policy "Allow service role to insert logs"
 on public.app_logs
 for insert
-with check (auth.role() = 'service_role');
+with check ((select auth.role()) = 'service_role');
 
 create policy "Allow service role to read logs"
 on public.app_logs
 for select
-using (auth.role() = 'service_role');
+using ((select auth.role()) = 'service_role');
 
 -- Allow authenticated users to read organizations
 CREATE POLICY "Allow authenticated users to read organizations"
@@ -535,4 +535,386 @@ CREATE POLICY "Allow anon users to read organizations"
 ON public.organizations
 FOR SELECT
 TO anon
-USING (true);
\ No newline at end of file
+USING (true);
+
+-- ---------------------------------------------------------------------------
+-- Organization-scoped schema revision
+--
+-- * Every tenant table carries organization_id, filled in on insert from the
+--   caller's profile when the app does not pass it.
+-- * Composite indexes match the filters used in supabase_integration.py.
+-- * Policies call auth.uid()/auth.role() through (select ...) so Postgres
+--   evaluates them once per statement (initPlan) instead of once per row.
+-- ---------------------------------------------------------------------------
+
+-- Organization membership lives on the user's profile
+ALTER TABLE public.profiles ADD COLUMN IF NOT EXISTS organization_id integer NULL REFERENCES public.organizations(id);
+ALTER TABLE public.validated_subscriptions ADD COLUMN IF NOT EXISTS organization_id integer NULL REFERENCES public.organizations(id);
+ALTER TABLE public.enriched_data ADD COLUMN IF NOT EXISTS organization_id integer NULL REFERENCES public.organizations(id);
+
+CREATE TABLE IF NOT EXISTS public.keywords (
+  id serial NOT NULL,
+  organization_id integer NULL,
+  category text NOT NULL,
+  keyword text NOT NULL,
+  created_at timestamp without time zone NULL DEFAULT now(),
+  CONSTRAINT keywords_pkey PRIMARY KEY (id),
+  CONSTRAINT keywords_organization_id_fkey FOREIGN KEY (organization_id) REFERENCES organizations(id)
+);
+
+CREATE TABLE IF NOT EXISTS public.thresholds (
+  id serial NOT NULL,
+  organization_id integer NULL,
+  pattern text NOT NULL,
+  days integer NOT NULL,
+  updated_at timestamp without time zone NULL DEFAULT now(),
+  CONSTRAINT thresholds_pkey PRIMARY KEY (id),
+  CONSTRAINT thresholds_organization_id_fkey FOREIGN KEY (organization_id) REFERENCES organizations(id)
+);
+
+-- The caller's organization, looked up once per statement inside policies
+CREATE OR REPLACE FUNCTION public.current_organization_id()
+RETURNS integer
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+  SELECT organization_id FROM public.profiles WHERE id = (SELECT auth.uid())
+$$;
+
+-- Fill organization_id from the caller's profile when inserts omit it
+CREATE OR REPLACE FUNCTION public.set_organization_id()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.organization_id IS NULL THEN
+    NEW.organization_id := public.current_organization_id();
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS set_organization_id ON public.validated_subscriptions;
+CREATE TRIGGER set_organization_id BEFORE INSERT ON public.validated_subscriptions
+FOR EACH ROW EXECUTE FUNCTION public.set_organization_id();
+
+DROP TRIGGER IF EXISTS set_organization_id ON public.uploaded_files;
+CREATE TRIGGER set_organization_id BEFORE INSERT ON public.uploaded_files
+FOR EACH ROW EXECUTE FUNCTION public.set_organization_id();
+
+DROP TRIGGER IF EXISTS set_organization_id ON public.enriched_data;
+CREATE TRIGGER set_organization_id BEFORE INSERT ON public.enriched_data
+FOR EACH ROW EXECUTE FUNCTION public.set_organization_id();
+
+DROP TRIGGER IF EXISTS set_organization_id ON public.keywords;
+CREATE TRIGGER set_organization_id BEFORE INSERT ON public.keywords
+FOR EACH ROW EXECUTE FUNCTION public.set_organization_id();
+
+DROP TRIGGER IF EXISTS set_organization_id ON public.thresholds;
+CREATE TRIGGER set_organization_id BEFORE INSERT ON public.thresholds
+FOR EACH ROW EXECUTE FUNCTION public.set_organization_id();
+
+-- Backfill existing rows from the owning user's profile
+UPDATE public.validated_subscriptions t SET organization_id = p.organization_id
+FROM public.profiles p WHERE t.user_id = p.id AND t.organization_id IS NULL;
+
+UPDATE public.uploaded_files t SET organization_id = p.organization_id
+FROM public.profiles p WHERE t.user_id = p.id AND t.organization_id IS NULL;
+
+UPDATE public.enriched_data t SET organization_id = p.organization_id
+FROM public.profiles p WHERE t.user_id = p.id AND t.organization_id IS NULL;
+
+-- Indexes matching supabase_integration query shapes
+
+-- fetch_stored_subscriptions: user_id = ?
+-- fetch_organization_data('validated_subscriptions'): organization_id = ?
+CREATE INDEX IF NOT EXISTS idx_validated_subscriptions_org_created
+ON public.validated_subscriptions (organization_id, created_at DESC);
+
+-- fetch_uploaded_files: user_id = ? (newest first)
+DROP INDEX IF EXISTS public.idx_uploaded_files_user_id;
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_user_uploaded
+ON public.uploaded_files (user_id, uploaded_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_org_uploaded
+ON public.uploaded_files (organization_id, uploaded_at DESC);
+
+-- fetch_enriched_data: user_id = ? AND file_name = ?
+DROP INDEX IF EXISTS public.idx_enriched_data_user_id;
+CREATE INDEX IF NOT EXISTS idx_enriched_data_user_file
+ON public.enriched_data (user_id, file_name, uploaded_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_enriched_data_org
+ON public.enriched_data (organization_id);
+
+-- fetch_logs / log_action: per-organization, newest first
+CREATE INDEX IF NOT EXISTS idx_app_logs_org_created
+ON public.app_logs (organization_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_app_logs_created
+ON public.app_logs (created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_keywords_org_category
+ON public.keywords (organization_id, category);
+
+-- Global rows (organization_id IS NULL) must conflict with each other too, so
+-- update_thresholds' ON CONFLICT (organization_id, pattern) replaces them
+-- instead of adding a duplicate on every save. Keep the newest of any duplicates.
+DELETE FROM public.thresholds t USING public.thresholds newer
+WHERE t.organization_id IS NOT DISTINCT FROM newer.organization_id AND t.pattern = newer.pattern AND t.id < newer.id;
+
+DROP INDEX IF EXISTS public.idx_thresholds_org_pattern;
+CREATE UNIQUE INDEX idx_thresholds_org_pattern
+ON public.thresholds (organization_id, pattern) NULLS NOT DISTINCT;
+
+CREATE INDEX IF NOT EXISTS idx_profiles_org
+ON public.profiles (organization_id);
+
+-- Organization-wide read policies
+
+ALTER TABLE public.keywords ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.thresholds ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Organization members can read validated subscriptions" ON public.validated_subscriptions;
+CREATE POLICY "Organization members can read validated subscriptions"
+ON public.validated_subscriptions
+FOR SELECT
+TO authenticated
+USING (organization_id = (select public.current_organization_id()));
+
+DROP POLICY IF EXISTS "Organization members can read uploaded files" ON public.uploaded_files;
+CREATE POLICY "Organization members can read uploaded files"
+ON public.uploaded_files
+FOR SELECT
+TO authenticated
+USING (organization_id = (select public.current_organization_id()));
+
+DROP POLICY IF EXISTS "Organization members can read enriched data" ON public.enriched_data;
+CREATE POLICY "Organization members can read enriched data"
+ON public.enriched_data
+FOR SELECT
+TO authenticated
+USING (organization_id = (select public.current_organization_id()));
+
+DROP POLICY IF EXISTS "Organization members can read keywords" ON public.keywords;
+CREATE POLICY "Organization members can read keywords"
+ON public.keywords
+FOR SELECT
+TO authenticated
+USING (organization_id IS NULL OR organization_id = (select public.current_organization_id()));
+
+DROP POLICY IF EXISTS "Organization members can manage keywords" ON public.keywords;
+CREATE POLICY "Organization members can manage keywords"
+ON public.keywords
+FOR INSERT
+TO authenticated
+WITH CHECK (organization_id = (select public.current_organization_id()));
+
+DROP POLICY IF EXISTS "Organization members can read thresholds" ON public.thresholds;
+CREATE POLICY "Organization members can read thresholds"
+ON public.thresholds
+FOR SELECT
+TO authenticated
+USING (organization_id IS NULL OR organization_id = (select public.current_organization_id()));
+
+DROP POLICY IF EXISTS "Organization members can manage thresholds" ON public.thresholds;
+CREATE POLICY "Organization members can manage thresholds"
+ON public.thresholds
+FOR ALL
+TO authenticated
+USING (organization_id = (select public.current_organization_id()))
+WITH CHECK (organization_id = (select public.current_organization_id()));
+
+
+-- ---------------------------------------------------------------------------
+-- Admin statistics
+--
+-- Aggregates computed in the database so the superuser dashboard transfers a
+-- handful of rows regardless of tenant count. Only the service role may call them.
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE public.validated_subscriptions ADD COLUMN IF NOT EXISTS status text NOT NULL DEFAULT 'active';
+
+CREATE INDEX IF NOT EXISTS idx_validated_subscriptions_status
+ON public.validated_subscriptions (status);
+
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_uploaded
+ON public.uploaded_files (uploaded_at);
+
+CREATE OR REPLACE FUNCTION public.users_per_organization()
+RETURNS TABLE (organization_id integer, organization_name text, users bigint)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+  SELECT o.id, o.name, count(p.id)
+  FROM public.organizations o
+  LEFT JOIN public.profiles p ON p.organization_id = o.id
+  GROUP BY o.id, o.name
+  ORDER BY o.id
+$$;
+
+CREATE OR REPLACE FUNCTION public.uploads_per_day(p_days integer DEFAULT 30)
+RETURNS TABLE (day date, uploads bigint)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+  SELECT uploaded_at::date, count(*)
+  FROM public.uploaded_files
+  WHERE uploaded_at >= now() - make_interval(days => p_days)
+  GROUP BY 1
+  ORDER BY 1
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.users_per_organization() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.uploads_per_day(integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.users_per_organization() TO service_role;
+GRANT EXECUTE ON FUNCTION public.uploads_per_day(integer) TO service_role;
+
+-- Categorization feedback: one corrected row per user and canonical merchant,
+-- written by supabase_integration.upsert_validated_subscriptions
+ALTER TABLE public.validated_subscriptions ADD COLUMN IF NOT EXISTS merchant_key text NULL;
+
+-- Rows without a merchant key (NULL) never conflict with each other
+CREATE UNIQUE INDEX IF NOT EXISTS idx_validated_subscriptions_user_merchant_key
+ON public.validated_subscriptions (user_id, merchant_key);
+
+DROP POLICY IF EXISTS "Users can update their own validated subscriptions" ON public.validated_subscriptions;
+CREATE POLICY "Users can update their own validated subscriptions"
+ON public.validated_subscriptions
+FOR UPDATE
+TO authenticated
+USING ((select auth.uid()) = user_id);
+
+-- Bulk save of validated subscriptions over PostgREST: one INSERT statement, so
+-- a failing row rolls back the whole batch. SECURITY INVOKER keeps the
+-- caller's insert policy and the set_organization_id trigger in force
+CREATE OR REPLACE FUNCTION public.save_validated_subscriptions(p_rows jsonb)
+RETURNS integer
+LANGUAGE sql
+SECURITY INVOKER
+SET search_path = ''
+AS $$
+  WITH inserted AS (
+    INSERT INTO public.validated_subscriptions
+      (user_id, organization_id, merchant, description, amount, category)
+    SELECT user_id, organization_id, merchant, description, amount, category
+    FROM jsonb_populate_recordset(NULL::public.validated_subscriptions, p_rows)
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM inserted
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.save_validated_subscriptions(jsonb) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.save_validated_subscriptions(jsonb) TO authenticated, service_role;
+
+-- Configuration versions: every change to thresholds or keywords bumps the
+-- owning organization's counter (0 for global rows), so app processes poll
+-- one small row instead of re-reading both tables (see config_store.py)
+CREATE TABLE IF NOT EXISTS public.config_versions (
+  organization_id integer NOT NULL,
+  version bigint NOT NULL DEFAULT 0,
+  updated_at timestamp with time zone NOT NULL DEFAULT now(),
+  CONSTRAINT config_versions_pkey PRIMARY KEY (organization_id)
+);
+
+CREATE OR REPLACE FUNCTION public.bump_config_version()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = ''
+AS $$
+DECLARE
+  scope integer := coalesce(CASE WHEN TG_OP = 'DELETE' THEN OLD.organization_id ELSE NEW.organization_id END, 0);
+BEGIN
+  INSERT INTO public.config_versions (organization_id, version, updated_at)
+  VALUES (scope, 1, now())
+  ON CONFLICT (organization_id)
+  DO UPDATE SET version = public.config_versions.version + 1, updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS bump_config_version ON public.thresholds;
+CREATE TRIGGER bump_config_version AFTER INSERT OR UPDATE OR DELETE ON public.thresholds
+FOR EACH ROW EXECUTE FUNCTION public.bump_config_version();
+
+DROP TRIGGER IF EXISTS bump_config_version ON public.keywords;
+CREATE TRIGGER bump_config_version AFTER INSERT OR UPDATE OR DELETE ON public.keywords
+FOR EACH ROW EXECUTE FUNCTION public.bump_config_version();
+
+ALTER TABLE public.config_versions ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Authenticated users can read config versions" ON public.config_versions;
+CREATE POLICY "Authenticated users can read config versions"
+ON public.config_versions
+FOR SELECT
+TO authenticated
+USING (organization_id IN (0, (select public.current_organization_id())));
+
+-- Renewal index: one row per user and canonical merchant with the series'
+-- period and next expected charge, maintained incrementally on upload by
+-- renewals.RenewalIndex. The partial indexes serve "renewing in the next N
+-- days" and "expected charge missing" as range scans.
+CREATE TABLE IF NOT EXISTS public.upcoming_renewals (
+  id bigserial NOT NULL,
+  user_id uuid NOT NULL,
+  organization_id integer NULL,
+  merchant_key text NOT NULL,
+  merchant text NULL,
+  pattern text NULL,
+  period_days integer NULL,
+  amount numeric NULL,
+  charges integer NOT NULL,
+  interval_count integer NOT NULL DEFAULT 0,
+  regular_intervals integer NOT NULL DEFAULT 0,
+  first_charge_date date NOT NULL,
+  last_charge_date date NOT NULL,
+  next_charge_date date NULL,
+  missed_after date NULL,
+  updated_at timestamp with time zone NOT NULL DEFAULT now(),
+  CONSTRAINT upcoming_renewals_pkey PRIMARY KEY (id),
+  CONSTRAINT upcoming_renewals_user_merchant_key UNIQUE (user_id, merchant_key),
+  CONSTRAINT upcoming_renewals_user_id_fkey FOREIGN KEY (user_id) REFERENCES auth.users(id) ON DELETE CASCADE,
+  CONSTRAINT upcoming_renewals_organization_id_fkey FOREIGN KEY (organization_id) REFERENCES organizations(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_upcoming_renewals_user_next
+ON public.upcoming_renewals (user_id, next_charge_date)
+WHERE next_charge_date IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_upcoming_renewals_user_missed
+ON public.upcoming_renewals (user_id, missed_after)
+WHERE missed_after IS NOT NULL;
+
+DROP TRIGGER IF EXISTS set_organization_id ON public.upcoming_renewals;
+CREATE TRIGGER set_organization_id BEFORE INSERT ON public.upcoming_renewals
+FOR EACH ROW EXECUTE FUNCTION public.set_organization_id();
+
+ALTER TABLE public.upcoming_renewals ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can read their own renewals" ON public.upcoming_renewals;
+CREATE POLICY "Users can read their own renewals"
+ON public.upcoming_renewals
+FOR SELECT
+TO authenticated
+USING ((select auth.uid()) = user_id);
+
+DROP POLICY IF EXISTS "Users can insert their own renewals" ON public.upcoming_renewals;
+CREATE POLICY "Users can insert their own renewals"
+ON public.upcoming_renewals
+FOR INSERT
+TO authenticated
+WITH CHECK ((select auth.uid()) = user_id);
+
+DROP POLICY IF EXISTS "Users can update their own renewals" ON public.upcoming_renewals;
+CREATE POLICY "Users can update their own renewals"
+ON public.upcoming_renewals
+FOR UPDATE
+TO authenticated
+USING ((select auth.uid()) = user_id);
@@ -0,0 +1,283 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import model_store
+from instrumentation import timed
+
+# Rows explained for the global summary, stratified by category
+DEFAULT_SAMPLE_SIZE = 200
+
+# Rows densified and explained at once; bounds memory for wide TF-IDF inputs
+ROW_CHUNK = 25
+
+# Features kept per summary and per single-row explanation
+TOP_FEATURES = 20
+
+# Background rows for linear explainers
+BACKGROUND_SIZE = 100
+
+# Global summaries kept in memory; each is small and also stored as a sidecar
+MAX_CACHED_SUMMARIES = 64
+
+# One background job at a time: explanations are CPU-heavy and cached per version
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explanations")
+_lock = threading.Lock()
+# All keyed by model_store.cache_key(org_id, version, root); explainers hold
+# their model, so they are bounded like the model cache
+_jobs = {}
+_cache = model_store.LRUCache(MAX_CACHED_SUMMARIES)
+_explainers = model_store.LRUCache(model_store.MAX_CACHED_MODELS)
+
+
+def _split_pipeline(model):
+    """
+    Return (vectorizer, classifier) for a fitted text pipeline.
+    """
+    steps = getattr(model, "named_steps", None)
+    if not steps:
+        raise ValueError("Explanations need a pipeline of a vectorizer and a classifier.")
+    return model[:-1], model[-1]
+
+
+def stratified_sample(texts, labels, size=DEFAULT_SAMPLE_SIZE, seed=0):
+    """
+    Sample about `size` rows, proportionally per label with at least one row per label.
+    """
+    frame = pd.DataFrame({"text": list(texts), "label": list(labels)})
+    if len(frame) <= size:
+        return frame
+    fraction = size / len(frame)
+    parts = [
+        group.sample(n=max(1, round(len(group) * fraction)), random_state=seed)
+        for _, group in frame.groupby("label", sort=False)
+    ]
+    return pd.concat(parts).reset_index(drop=True)
+
+
+def build_explainer(model, background_texts=None):
+    """
+    Create a SHAP explainer for the pipeline's classifier: TreeExplainer for
+    tree ensembles, LinearExplainer (with a small background sample) for linear models.
+    """
+    import shap
+
+    vectorizer, classifier = _split_pipeline(model)
+    if hasattr(classifier, "estimators_") or hasattr(classifier, "tree_"):
+        return shap.TreeExplainer(classifier)
+    if hasattr(classifier, "coef_"):
+        if background_texts is None:
+            raise ValueError("Linear explanations need background texts.")
+        background = vectorizer.transform(list(background_texts)[:BACKGROUND_SIZE])
+        return shap.LinearExplainer(classifier, background)
+    raise ValueError(f"Unsupported model type for explanations: {type(classifier).__name__}")
+
+
+def _shap_values(explainer, matrix, n_classes):
+    """
+    SHAP values as a (rows, features, classes) array regardless of explainer output shape.
+    """
+    import shap
+
+    if isinstance(explainer, shap.TreeExplainer):
+        # Exact TreeSHAP needs dense input; additivity checks cost as much as the explanation
+        values = explainer.shap_values(matrix.toarray(), check_additivity=False)
+    else:
+        values = explainer.shap_values(matrix)
+    if isinstance(values, list):
+        values = np.stack(values, axis=-1)
+    values = np.asarray(values)
+    if values.ndim == 2:
+        # Binary linear models explain the positive class only
+        values = np.stack([-values, values], axis=-1) if n_classes == 2 else values[..., np.newaxis]
+    return values
+
+
+@timed()
+def global_importance(model, texts, explainer=None, top=TOP_FEATURES, chunk=ROW_CHUNK):
+    """
+    Mean absolute SHAP value per feature over `texts`, overall and per class.
+
+    Rows are processed in chunks so only `chunk` dense rows exist at a time.
+    """
+    vectorizer, classifier = _split_pipeline(model)
+    explainer = explainer or build_explainer(model, texts)
+    classes = [str(label) for label in classifier.classes_]
+    feature_names = np.asarray(vectorizer.get_feature_names_out())
+    texts = list(texts)
+    totals = np.zeros((len(feature_names), len(classes)))
+    for start in range(0, len(texts), chunk):
+        matrix = vectorizer.transform(texts[start:start + chunk])
+        totals += np.abs(_shap_values(explainer, matrix, len(classes))).sum(axis=0)
+    totals /= max(len(texts), 1)
+
+    overall = totals.sum(axis=1)
+    order = np.argsort(-overall)[:top]
+    importance = pd.DataFrame({"feature": feature_names[order], "importance": overall[order]})
+    per_class = {}
+    for index, label in enumerate(classes):
+        class_order = np.argsort(-totals[:, index])[:top]
+        per_class[label] = pd.DataFrame({
+            "feature": feature_names[class_order],
+            "importance": totals[class_order, index],
+        })
+    return importance, per_class
+
+
+@timed()
+def explain_rows(model, texts, explainer=None, top=10):
+    """
+    Explain individual predictions: the features pushing each row toward its
+    predicted category, strongest first. Returns one row per (input, feature).
+    """
+    vectorizer, classifier = _split_pipeline(model)
+    texts = list(texts)
+    explainer = explainer or build_explainer(model, texts)
+    classes = np.asarray(classifier.classes_)
+    feature_names = np.asarray(vectorizer.get_feature_names_out())
+    matrix = vectorizer.transform(texts)
+    probabilities = classifier.predict_proba(matrix)
+    values = _shap_values(explainer, matrix, len(classes))
+
+    rows = []
+    for row, text in enumerate(texts):
+        predicted = int(np.argmax(probabilities[row]))
+        contributions = values[row, :, predicted]
+        # Absent words can matter too (no "tidal" lowers Music); zero effects are dropped
+        order = [index for index in np.argsort(-np.abs(contributions))[:top] if contributions[index] != 0]
+        for index in order:
+            rows.append({
+                "text": text,
+                "predicted": classes[predicted],
+                "probability": float(probabilities[row, predicted]),
+                "feature": feature_names[index],
+                "contribution": float(contributions[index]),
+            })
+    return pd.DataFrame(rows, columns=["text", "predicted", "probability", "feature", "contribution"])
+
+
+def explain_transactions(org_id, texts, version=None, top=10, root=None):
+    """
+    On-demand explanation of single predictions with the organization's model;
+    the explainer is built once per model version and process.
+    """
+    version = version or model_store.current_version(org_id, root)
+    if version is None:
+        raise ValueError(f"Model for organization {org_id} not found. Train the model first.")
+    model = model_store.load_model(org_id, version, root)
+    key = model_store.cache_key(org_id, version, root)
+    explainer = _explainers.get(key)
+    if explainer is None:
+        try:
+            explainer = build_explainer(model)
+        except ValueError:
+            # Linear models need background data
+            explainer = build_explainer(model, _load_training_sample(org_id)[0])
+        _explainers.put(key, explainer)
+    return explain_rows(model, texts, explainer, top)
+
+
+def _load_training_sample(org_id):
+    from ml_model import load_validated_subscriptions
+
+    data = pd.DataFrame(load_validated_subscriptions(org_id))
+    if data.empty:
+        raise ValueError("No validated subscriptions available to explain.")
+    texts = data["merchant"].fillna("").astype(str).str.cat(data["description"].fillna("").astype(str), sep=" ")
+    return texts, data["category"]
+
+
+@timed()
+def compute_explanations(org_id, version=None, texts=None, labels=None, sample_size=DEFAULT_SAMPLE_SIZE, root=None):
+    """
+    Explain a stratified sample for one model version and cache the summary
+    next to the model artifact (see `model_store.write_sidecar`).
+
+    Without `texts`/`labels`, the organization's validated subscriptions are sampled.
+    """
+    version = version or model_store.current_version(org_id, root)
+    if version is None:
+        raise ValueError(f"Model for organization {org_id} not found. Train the model first.")
+    model = model_store.load_model(org_id, version, root)
+    if texts is None:
+        texts, labels = _load_training_sample(org_id)
+    sample = stratified_sample(texts, labels if labels is not None else [""] * len(texts), sample_size)
+
+    start = time.perf_counter()
+    importance, per_class = global_importance(model, sample["text"], build_explainer(model, sample["text"]))
+    payload = {
+        "org_id": org_id,
+        "version": version,
+        "sample_rows": len(sample),
+        "seconds": time.perf_counter() - start,
+        "created_at": pd.Timestamp.now().isoformat(),
+        "importance": importance.to_dict(orient="records"),
+        "per_class": {label: frame.to_dict(orient="records") for label, frame in per_class.items()},
+    }
+    model_store.write_sidecar(org_id, version, "shap", payload, root)
+    _cache.put(model_store.cache_key(org_id, version, root), payload)
+    return payload
+
+
+def get_explanations(org_id, version=None, root=None):
+    """
+    Return the cached summary for a model version (current by default), or None.
+    """
+    version = version or model_store.current_version(org_id, root)
+    if version is None:
+        return None
+    key = model_store.cache_key(org_id, version, root)
+    payload = _cache.get(key)
+    if payload is None:
+        payload = model_store.read_sidecar(org_id, version, "shap", root)
+        if payload is not None:
+            _cache.put(key, payload)
+    return payload
+
+
+def explain_in_background(org_id, version=None, **kwargs):
+    """
+    Start computing explanations for a model version unless cached or already
+    running. Returns the job's Future, or None when nothing needed to run.
+    """
+    root = kwargs.get("root")
+    version = version or model_store.current_version(org_id, root)
+    if version is None or get_explanations(org_id, version, root) is not None:
+        return None
+    key = model_store.cache_key(org_id, version, root)
+    with _lock:
+        # Finished jobs are only kept for their errors; results live in the sidecars
+        for done in [k for k, job in _jobs.items() if job.done() and job.exception() is None]:
+            del _jobs[done]
+        job = _jobs.get(key)
+        if job is None or (job.done() and job.exception() is not None):
+            job = _jobs[key] = _executor.submit(compute_explanations, org_id, version, **kwargs)
+        return job
+
+
+def explanation_status(org_id, version=None, root=None):
+    """
+    Return "ready", "running", "failed: <error>" or "missing" for a model version.
+    """
+    version = version or model_store.current_version(org_id, root)
+    if version is None:
+        return "missing"
+    if get_explanations(org_id, version, root) is not None:
+        return "ready"
+    with _lock:
+        job = _jobs.get(model_store.cache_key(org_id, version, root))
+    if job is None:
+        return "missing"
+    if not job.done():
+        return "running"
+    error = job.exception()
+    return f"failed: {error}" if error else "ready"
+
+
+def importance_frame(payload, category=None):
+    """
+    Feature importance from a cached summary, overall or for one category.
+    """
+    records = payload["per_class"].get(category, []) if category else payload["importance"]
+    return pd.DataFrame(records, columns=["feature", "importance"])
@@ -1,71 +1,165 @@
-import json
+import pandas as pd
 import streamlit as st
-import json
-from supabase_integration import update_keywords, update_thresholds
-from ml_model import retrain_model
-from supabase_integration import update_keywords
-
-# Load or initialize thresholds
-try:
-    with open("data/thresholds.json", "r") as f:
-        RENEWAL_THRESHOLDS = json.load(f)
-except FileNotFoundError:
-    RENEWAL_THRESHOLDS = {
-        "Daily": 1,
-        "Weekly": 7,
-        "Bi-Weekly": 15,
-        "Monthly": 45,
-        "Quarterly": 90,
-        "Yearly": 370,
-    }
-    
-    with open("data/keywords.json", "r") as f:
-        CATEGORY_KEYWORDS = json.load(f)
-except FileNotFoundError:
-    CATEGORY_KEYWORDS = {
-        "Entertainment": ["Netflix", "Spotify", "Hulu"],
-        "Utilities": ["Electric", "Water", "Gas"],
-        "Others": []
-    }
-
-
-def adjust_keywords():
+from config_store import get_config_store
+from supabase_integration import upsert_validated_subscriptions
+from ml_model import update_model_from_feedback
+from merchant_normalization import add_merchant_key
+
+# Columns shown in the feedback grid; only Category is editable
+FEEDBACK_COLUMNS = ["Merchant Key", "Merchant", "Description", "Transactions", "Total", "Category"]
+
+
+def adjust_keywords(org_id=None):
     """
     Allow users to add new keywords dynamically.
     """
     st.title("Adjust Keywords")
-    category = st.selectbox("Select a category:", ["Entertainment", "Utilities", "Others"])
+    store = get_config_store()
+    keywords = store.keywords(org_id)
+    category = st.selectbox("Select a category:", sorted(keywords))
+    st.caption(", ".join(keywords.get(category, [])) or "No keywords yet.")
     new_keyword = st.text_input("Enter a new keyword:")
-    if st.button("Add Keyword"):
-        update_keywords(category, new_keyword)
-        st.success(f"Keyword '{new_keyword}' added to category '{category}'!")
+    if st.button("Add Keyword") and new_keyword.strip():
+        if store.add_keyword(org_id, category, new_keyword.strip()):
+            st.success(f"Keyword '{new_keyword}' added to category '{category}'!")
+        else:
+            st.info(f"Category '{category}' already has keyword '{new_keyword}'.")
 
-def adjust_thresholds():
+def adjust_thresholds(org_id=None):
     """
     Allow users to refine thresholds for subscription patterns.
+
+    Only thresholds that differ from the stored values are written, and only on submit.
     """
-    global RENEWAL_THRESHOLDS
     st.title("Adjust Renewal Thresholds")
-    for pattern, threshold in RENEWAL_THRESHOLDS.items():
-        new_threshold = st.number_input(f"Threshold for {pattern} (days)", value=threshold, min_value=1)
-        RENEWAL_THRESHOLDS[pattern] = new_threshold
+    store = get_config_store()
+    with st.form("renewal_thresholds"):
+        thresholds = {
+            pattern: st.number_input(f"Threshold for {pattern} (days)", value=int(days), min_value=1)
+            for pattern, days in store.thresholds(org_id).items()
+        }
+        submitted = st.form_submit_button("Save Thresholds")
+    if submitted:
+        changed = store.set_thresholds(org_id, thresholds)
+        if changed:
+            st.success(f"Thresholds updated: {', '.join(changed)}")
+        else:
+            st.info("No thresholds changed.")
+
+
+def feedback_groups(data):
+    """
+    Collapse categorized transactions to one row per canonical merchant.
+
+    Each group shows its most common merchant name, description and category,
+    the number of transactions and their total amount.
+    """
+    if "Merchant Key" not in data.columns:
+        data = add_merchant_key(data)
+    data = data[data["Merchant Key"].astype(str) != ""]
+    grouped = data.groupby("Merchant Key", observed=True, sort=True)
+    groups = pd.DataFrame({
+        "Merchant": grouped["Merchant"].agg(lambda values: values.mode().iloc[0]),
+        "Description": grouped["Description"].agg(lambda values: values.mode().iloc[0]),
+        "Transactions": grouped.size(),
+        "Total": grouped["Amount"].sum().round(2),
+        "Median Amount": grouped["Amount"].median(),
+        "Category": grouped["Category"].agg(lambda values: values.mode().iloc[0]),
+    })
+    groups = groups.reset_index()
+    for col in ["Merchant Key", "Merchant", "Description", "Category"]:
+        groups[col] = groups[col].astype(object)
+    return groups
+
+
+def diff_categories(original, edited):
+    """
+    Compare the grid before and after editing and return only the merchants
+    whose category changed, with `Old Category` and `New Category` columns.
+    """
+    new_category = edited["Category"].astype(object).where(edited["Category"].notna(), "").astype(str).str.strip()
+    changed = (new_category != original["Category"].astype(str)) & (new_category != "")
+    delta = original.loc[changed, ["Merchant Key", "Merchant", "Description", "Median Amount", "Category"]]
+    delta = delta.rename(columns={"Category": "Old Category"})
+    delta["New Category"] = new_category[changed]
+    return delta.reset_index(drop=True)
+
+
+def apply_delta(data, delta):
+    """
+    Recategorize every transaction of the changed merchants.
+    """
+    from transaction_schema import writable
+
+    if delta.empty:
+        return data
+    data = writable(data.copy(), ["Category", "Category Source"])
+    categories = data["Merchant Key"].astype(object).map(dict(zip(delta["Merchant Key"], delta["New Category"])))
+    changed = categories.notna()
+    data.loc[changed, "Category"] = categories[changed]
+    if "Category Source" in data.columns:
+        data.loc[changed, "Category Source"] = "feedback"
+    return data
 
-    update_thresholds(RENEWAL_THRESHOLDS)
-    st.success("Thresholds updated!")
-    
+
+def feedback_rows(delta):
+    """
+    Shape a category delta as validated_subscriptions rows, one per merchant key.
+    """
+    return pd.DataFrame({
+        "merchant_key": delta["Merchant Key"].to_numpy(),
+        "merchant": delta["Merchant"].to_numpy(),
+        "description": delta["Description"].to_numpy(),
+        "amount": delta["Median Amount"].round(2).to_numpy(),
+        "category": delta["New Category"].to_numpy(),
+    })
 
 
-def gather_feedback(data):
+def gather_feedback(data, user_id, organization_id=None, groups=None):
     """
-    Gather user feedback and retrain the ML model.
+    Let the user correct categories per canonical merchant and retrain the ML model.
+
+    Edits are made in a single grid; on submit only the changed merchants are
+    written (one bulk upsert) and handed to the model update. `groups` is
+    `feedback_groups(data)` when the caller already has it. Returns the
+    recategorized transactions after a submit, otherwise None.
     """
     st.title("User Feedback for Categorization")
 
-    for index, row in data.iterrows():
-        new_category = st.text_input(f"Category for {row['Merchant']}:", value=row['Category'])
-        data.at[index, 'Category'] = new_category
+    original = feedback_groups(data) if groups is None else groups
+    if original.empty:
+        st.warning("No transactions to review.")
+        return None
+
+    st.caption(f"{len(original)} merchants, {len(data)} transactions. Changing a category applies to all of a merchant's transactions.")
+    edited = st.data_editor(
+        original[FEEDBACK_COLUMNS],
+        column_config={
+            "Category": st.column_config.TextColumn("Category", required=True),
+            "Total": st.column_config.NumberColumn("Total", format="%.2f"),
+        },
+        disabled=[col for col in FEEDBACK_COLUMNS if col != "Category"],
+        hide_index=True,
+        use_container_width=True,
+        key="feedback_editor",
+    )
+
+    delta = diff_categories(original, edited)
+    st.write(f"{len(delta)} merchant(s) changed.")
+    if not delta.empty:
+        st.dataframe(delta[["Merchant Key", "Old Category", "New Category"]], hide_index=True)
 
-    if st.button("Submit Feedback"):
-        train_model(data, features=['Merchant', 'Description'], target='Category')
-        update_keywords(data['Category'].unique())
-        st.success("Feedback submitted and model retrained!")
+    if st.button("Submit Feedback", disabled=delta.empty):
+        response = upsert_validated_subscriptions(user_id, feedback_rows(delta), organization_id)
+        if response is None or response.data is None:
+            return None
+        if organization_id is not None:
+            try:
+                with st.spinner("Updating model..."):
+                    update_model_from_feedback(organization_id, delta)
+            except ValueError as e:
+                st.error(f"Error retraining model: {e}")
+                return None
+        st.success(f"Feedback for {len(delta)} merchant(s) saved and model updated!")
+        return apply_delta(data, delta)
+    return None
@@ -1,4 +1,5 @@
 from auth_management import create_superuser
+from instrumentation import start_metrics_server
 
 def initialize_app():
     """
@@ -13,5 +14,11 @@ def initialize_app():
     except Exception as e:
         print(f"Error during superuser creation: {e}")
 
+    # Step 2: Expose /metrics for Prometheus when METRICS_PORT is set
+    try:
+        start_metrics_server()
+    except OSError as e:
+        print(f"Error starting metrics server: {e}")
+
     # Add other initialization steps if needed
     print("Initialization complete.")
@@ -0,0 +1,260 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+
+# Set METRICS_ENABLED=false to turn recording into a single flag check
+ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Histogram bucket upper bounds in seconds (Prometheus-style, cumulative on export)
+BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+# Recent samples kept per operation for percentile estimates
+RECENT_SAMPLES = 1024
+
+_lock = threading.Lock()
+_metrics = {}
+
+
+class _Operation:
+    """
+    Accumulated measurements for one operation name.
+    """
+
+    __slots__ = ("count", "seconds", "rows", "bytes", "errors", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+
+class Span:
+    """
+    Handle yielded by `span`; set `rows` and `bytes` to annotate the measurement.
+    """
+
+    __slots__ = ("rows", "bytes")
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = enabled
+
+
+def record(name, seconds, rows=0, nbytes=0, error=False):
+    """
+    Record one measurement for `name`.
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        op = _metrics.get(name)
+        if op is None:
+            op = _metrics[name] = _Operation()
+        op.count += 1
+        op.seconds += seconds
+        op.rows += rows
+        op.bytes += nbytes
+        op.errors += error
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        op.buckets[index] += 1
+        op.recent.append(seconds)
+
+
+def _measure(result):
+    """
+    Best-effort (rows, bytes) for common return values: DataFrames, lists and
+    PostgREST responses. Byte counts are shallow in-memory sizes.
+    """
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=False, deep=False).sum())
+    data = getattr(result, "data", result)
+    if isinstance(data, list):
+        return len(data), 0
+    return 0, 0
+
+
+@contextmanager
+def span(name):
+    """
+    Time a block of code under `name`.
+
+        with span("page:Dashboard") as s:
+            ...
+            s.rows = len(data)
+    """
+    if not ENABLED:
+        yield Span()
+        return
+    handle = Span()
+    start = time.perf_counter()
+    error = False
+    try:
+        yield handle
+    except Exception:
+        # Only real failures count as errors; Streamlit's rerun/stop control
+        # flow derives from BaseException and passes through untouched
+        error = True
+        raise
+    finally:
+        record(name, time.perf_counter() - start, handle.rows, handle.bytes, error)
+
+
+def timed(name=None):
+    """
+    Decorator that records latency, row count and size of the returned value.
+
+    The operation name defaults to "<module>.<function>".
+    """
+    def decorator(fn):
+        op_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                record(op_name, time.perf_counter() - start, error=True)
+                raise
+            rows, nbytes = _measure(result)
+            record(op_name, time.perf_counter() - start, rows, nbytes)
+            return result
+
+        return wrapper
+    return decorator
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+def summary():
+    """
+    Return one row per operation with count, errors, mean and p50/p95/p99 latency
+    (milliseconds, over recent samples), and total rows and bytes.
+    """
+    with _lock:
+        snapshot = {name: (op.count, op.errors, op.seconds, op.rows, op.bytes, list(op.recent))
+                    for name, op in _metrics.items()}
+    rows = []
+    for name, (count, errors, seconds, total_rows, total_bytes, recent) in sorted(snapshot.items()):
+        samples = pd.Series(recent) * 1000
+        rows.append({
+            "operation": name,
+            "count": count,
+            "errors": errors,
+            "mean_ms": seconds * 1000 / count if count else 0.0,
+            "p50_ms": samples.quantile(0.50) if recent else 0.0,
+            "p95_ms": samples.quantile(0.95) if recent else 0.0,
+            "p99_ms": samples.quantile(0.99) if recent else 0.0,
+            "rows": total_rows,
+            "bytes": total_bytes,
+        })
+    return pd.DataFrame(rows, columns=["operation", "count", "errors", "mean_ms", "p50_ms",
+                                       "p95_ms", "p99_ms", "rows", "bytes"])
+
+
+def prometheus_text():
+    """
+    Render all operations in the Prometheus text exposition format.
+    """
+    with _lock:
+        snapshot = {name: (op.count, op.seconds, op.rows, op.bytes, op.errors, list(op.buckets))
+                    for name, op in _metrics.items()}
+    lines = [
+        "# HELP trkacka_operation_seconds Operation latency.",
+        "# TYPE trkacka_operation_seconds histogram",
+    ]
+    for name, (count, seconds, _, _, _, buckets) in sorted(snapshot.items()):
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, buckets):
+            cumulative += bucket
+            lines.append(f'trkacka_operation_seconds_bucket{{operation="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'trkacka_operation_seconds_bucket{{operation="{label}",le="+Inf"}} {count}')
+        lines.append(f'trkacka_operation_seconds_sum{{operation="{label}"}} {seconds}')
+        lines.append(f'trkacka_operation_seconds_count{{operation="{label}"}} {count}')
+    for metric, position, help_text in (
+        ("trkacka_operation_rows_total", 2, "Rows returned or written."),
+        ("trkacka_operation_bytes_total", 3, "Approximate bytes returned or written."),
+        ("trkacka_operation_errors_total", 4, "Operations that raised."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, values in sorted(snapshot.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{operation="{label}"}} {values[position]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path="metrics.json"):
+    """
+    Write the current summary to a JSON file (atomically) and return the path.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "written_at": pd.Timestamp.now().isoformat(),
+            "operations": summary().to_dict(orient="records"),
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """
+    Serve /metrics for Prometheus on a background thread (once per process).
+
+    The port defaults to the METRICS_PORT environment variable; nothing is
+    started when neither is set.
+    """
+    global _server
+    port = port or os.environ.get("METRICS_PORT")
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+        _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
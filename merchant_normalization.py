@@ -0,0 +1,254 @@
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from instrumentation import timed
+
+# MinHash signature length and LSH banding (bands * rows must equal NUM_PERM)
+NUM_PERM = 64
+BANDS = 16
+
+# Character shingle size for similarity
+SHINGLE_SIZE = 3
+
+# Minimum similarity for two cleaned names to be treated as the same merchant
+DEFAULT_THRESHOLD = 0.6
+
+# Names sharing a leading token are compared directly only in blocks up to this size
+MAX_BLOCK_SIZE = 200
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Applied in order to upper-cased descriptions
+_NOISE_PATTERNS = [
+    # Payment processor and card prefixes
+    (r"^(?:(?:POS|DEBIT|CREDIT|CARD|PURCHASE|PAYMENT|RECURRING|DIRECT DEBIT|DD|SO|VISA|MC)\b[\s:*-]*)+", " "),
+    (r"^(?:SQ|SQU|TST|PAYPAL|PP|GOOGLE|APPLE\.COM/BILL)\s*\*\s*", " "),
+    # Card numbers and masked PANs
+    (r"(?:X{2,}|\*{2,})\d{2,}", " "),
+    (r"\b\d{4}(?:[ -]?\d{4}){2,3}\b", " "),
+    # Dates and times
+    (r"\b\d{1,4}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b", " "),
+    (r"\b\d{1,2}:\d{2}(?::\d{2})?\b", " "),
+    # Phone numbers
+    (r"\+?\d[\d -]{6,}\d", " "),
+    # Reference IDs: "REF 123", "#12345", tokens mixing letters and 3+ digits
+    (r"\b(?:REF|REFERENCE|ID|TXN|AUTH)\b[\s.:#]*\S+", " "),
+    # "NO 123" only after other text, so names like "NO FRILLS" survive
+    (r"(?<=\S)\s+NO\b[\s.:#]*\S+", " "),
+    (r"#\s*\S+", " "),
+    (r"\b(?=[A-Z]*\d)(?=(?:\D*\d){3})[A-Z0-9]+\b", " "),
+    # Web suffixes and separators
+    (r"\.(?:COM|NET|ORG|CO\.UK|CO|IO|DE|FR)\b", " "),
+    (r"\b(?:WWW|HTTPS?)\b\.?", " "),
+    (r"[*_/\\|.,;:#'\"()\[\]-]+", " "),
+    # Remaining standalone numbers
+    (r"\b\d+\b", " "),
+]
+
+# Trailing location codes (US states, common country codes)
+_LOCATIONS = (
+    "AL AK AZ AR CA CO CT DE FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH NJ NM NY NC ND "
+    "OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY DC US USA GB UK IE DE FR NL ES IT AU NZ"
+).split()
+_LOCATION_SUFFIX = rf"(?:\s+(?:{'|'.join(_LOCATIONS)}))+$"
+
+# Trailing company forms
+_COMPANY_SUFFIX = r"\s+(?:LTD|LIMITED|INC|LLC|GMBH|AB|AG|PLC|CORP|SA|BV)$"
+
+_COMPILED = [(re.compile(pattern), replacement) for pattern, replacement in _NOISE_PATTERNS]
+
+
+@timed()
+def clean_descriptions(values):
+    """
+    Strip card numbers, dates, phone numbers, reference IDs, web suffixes and
+    trailing location codes from descriptions. Blank descriptions stay blank.
+
+    Each distinct value is cleaned once with vectorized string operations;
+    the result is aligned to `values`.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values.astype(object).where(values.notna(), ""))
+    upper = pd.Series(uniques, dtype=object).astype(str).str.upper()
+    cleaned = upper
+    for pattern, replacement in _COMPILED:
+        cleaned = cleaned.str.replace(pattern, replacement, regex=True)
+    cleaned = cleaned.str.replace(r"\s+", " ", regex=True).str.strip()
+    stripped = (
+        cleaned.str.replace(_LOCATION_SUFFIX, "", regex=True)
+        .str.replace(_COMPANY_SUFFIX, "", regex=True)
+        .str.strip()
+    )
+    # Keep the original when nothing else is left
+    cleaned = stripped.where(stripped != "", cleaned)
+    # Descriptions made only of noise (e.g. a bare reference) keep their own
+    # text; an empty key would group them with every other such row
+    cleaned = cleaned.where(cleaned != "", upper.str.replace(r"\s+", " ", regex=True).str.strip())
+    return pd.Series(cleaned.to_numpy()[codes], index=values.index, dtype=object)
+
+
+def _shingles(name):
+    padded = f" {name} "
+    if len(padded) <= SHINGLE_SIZE:
+        return {padded}
+    return {padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signatures(shingle_sets, num_perm=NUM_PERM, seed=1):
+    """
+    Compute MinHash signatures (one row per set) with universal hashing of
+    CRC32 shingle hashes, so results are stable across processes.
+    """
+    rng = np.random.default_rng(seed)
+    # a, b < 2**32 and x < 2**32 keep a * x + b within uint64
+    a = rng.integers(1, _MAX_HASH, num_perm, dtype=np.uint64)
+    b = rng.integers(0, _MAX_HASH, num_perm, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), num_perm), _MAX_HASH, dtype=np.uint64)
+    for row, shingles in enumerate(shingle_sets):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a * x + b) mod p, truncated to 32 bits
+        permuted = ((np.outer(hashes, a) + b) % _MERSENNE_PRIME) & _MAX_HASH
+        signatures[row] = permuted.min(axis=0)
+    return signatures
+
+
+def candidate_pairs(signatures, bands=BANDS):
+    """
+    Return index pairs that share at least one LSH band bucket.
+    """
+    rows_per_band = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        chunk = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        buckets = {}
+        for index, key in enumerate(map(bytes, chunk)):
+            buckets.setdefault(key, []).append(index)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    pairs.add((members[i], members[j]))
+    return pairs
+
+
+def _block_pairs(names):
+    """
+    Pairs of names sharing a leading token, within blocks small enough to compare directly.
+    """
+    blocks = {}
+    for index, name in enumerate(names):
+        token = name.split(" ", 1)[0]
+        if len(token) >= 3:
+            blocks.setdefault(token, []).append(index)
+    pairs = set()
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                pairs.add((members[i], members[j]))
+    return pairs
+
+
+def _jaccard(left, right):
+    return len(left & right) / len(left | right)
+
+
+def _token_prefix(shorter, longer):
+    """
+    True when `longer` is `shorter` plus trailing words, e.g. "NETFLIX" and "NETFLIX STREAMING".
+    """
+    return longer.startswith(shorter + " ")
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, left, right):
+        left, right = self.find(left), self.find(right)
+        if left != right:
+            self.parent[right] = left
+
+
+@timed()
+def group_names(names, weights=None, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """
+    Group near-duplicate cleaned names and return {name: canonical name}.
+
+    Candidates come from MinHash/LSH buckets plus leading-token blocks, so only
+    likely matches are compared exactly: by shingle Jaccard similarity, or as
+    an unambiguous word-prefix extension. The canonical name of a group is its
+    shortest member, then the alphabetically first, so it does not depend on
+    how often each variant occurs in a particular file. `weights`, when given,
+    take precedence (the highest-weighted member wins), e.g. to keep already
+    stored keys canonical.
+    """
+    names = list(names)
+    if not names:
+        return {}
+    weights = list(weights) if weights is not None else [1] * len(names)
+    shingle_sets = [_shingles(name) for name in names]
+    signatures = minhash_signatures(shingle_sets, num_perm)
+    pairs = candidate_pairs(signatures, bands) | _block_pairs(names)
+
+    groups = _UnionFind(len(names))
+    extensions = {}
+    for i, j in pairs:
+        if _jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+            groups.union(i, j)
+            continue
+        shorter, longer = (i, j) if len(names[i]) <= len(names[j]) else (j, i)
+        if _token_prefix(names[shorter], names[longer]):
+            extensions.setdefault(shorter, []).append(longer)
+    # A name extended in only one way is the same merchant ("NETFLIX" / "NETFLIX STREAMING");
+    # one extended several ways is a brand prefix ("AMAZON" / "AMAZON PRIME", "AMAZON MKTP")
+    for shorter, longer in extensions.items():
+        if len(longer) == 1:
+            groups.union(shorter, longer[0])
+
+    best = {}
+    for index, name in enumerate(names):
+        root = groups.find(index)
+        rank = (-weights[index], len(name), name)
+        if root not in best or rank < best[root][0]:
+            best[root] = (rank, name)
+    return {name: best[groups.find(index)][1] for index, name in enumerate(names)}
+
+
+@timed()
+def merchant_keys(values, threshold=DEFAULT_THRESHOLD, known_keys=None):
+    """
+    Map raw descriptions (or merchant names) to canonical merchant keys.
+
+    Keys are persisted and joined across files, so a group's key is chosen
+    from its members' names alone, never from their frequency in `values`.
+    `known_keys` are keys already stored for the user; a group containing one
+    takes it as its key, so later files join to it whichever variants they hold.
+    """
+    cleaned = clean_descriptions(values)
+    known = sorted({key for key in known_keys or () if key})
+    names = sorted(set(cleaned[cleaned != ""].unique()) - set(known))
+    # Any stored key outranks any new name
+    weights = [2] * len(known) + [1] * len(names)
+    canonical = group_names(known + names, weights, threshold=threshold)
+    # Stored keys never move, even when near-duplicates of each other
+    canonical.update((key, key) for key in known)
+    return cleaned.map(canonical).fillna("")
+
+
+def add_merchant_key(data, source="Description", threshold=DEFAULT_THRESHOLD, known_keys=None):
+    """
+    Add a `Merchant Key` column derived from `source`; recurring detection,
+    categorization and clustering group on it when present.
+    """
+    data = data.copy()
+    data["Merchant Key"] = merchant_keys(data[source], threshold, known_keys).to_numpy()
+    return data
@@ -1,22 +1,61 @@
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
 import pickle
+import time
+import model_store
+from instrumentation import timed
+from transaction_schema import text_values
 from supabase_integration import fetch_organization_data
 
+# Rows per prediction chunk; bounds memory regardless of input size
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Model loaded once per worker process by `_init_worker`
+_worker_model = None
+
 def load_validated_subscriptions(org_id):
     """
     Load validated subscriptions for an organization from Supabase.
     """
     return fetch_organization_data(org_id, "validated_subscriptions")
 
-def train_model(org_id):
+def apply_feedback(data):
+    """
+    Relabel validated subscriptions with the latest feedback for their merchant.
+
+    Feedback rows carry a `merchant_key`; other rows take the corrected
+    category when their description maps to the same canonical key or their
+    merchant name matches the feedback row's.
+    """
+    if "merchant_key" not in data.columns or data["merchant_key"].isna().all():
+        return data
+    from categorizer import normalize_merchant
+    from merchant_normalization import merchant_keys
+
+    feedback = data[data["merchant_key"].notna()]
+    by_key = dict(zip(feedback["merchant_key"], feedback["category"]))
+    by_merchant = dict(zip(normalize_merchant(feedback["merchant"]), feedback["category"]))
+    descriptions = data["description"].fillna(data["merchant"]).astype(str)
+    keys = merchant_keys(descriptions, known_keys=by_key.keys()).set_axis(data.index)
+    corrected = keys.map(by_key).fillna(normalize_merchant(data["merchant"]).map(by_merchant))
+    data = data.copy()
+    data["category"] = corrected.fillna(data["category"])
+    return data
+
+@timed()
+def train_model(org_id, keep=model_store.DEFAULT_KEEP, metadata=None):
     """
     Train a machine learning model for transaction categorization using validated subscriptions.
+
+    The fitted pipeline is stored as a new, compressed model version together
+    with its training metadata (plus `metadata`, if given); see `model_store`.
     """
-    # Load validated subscriptions
-    data = load_validated_subscriptions(org_id)
+    # Load validated subscriptions, with feedback corrections applied
+    data = apply_feedback(pd.DataFrame(load_validated_subscriptions(org_id)))
 
     if data.empty:
         raise ValueError("No validated subscriptions available for training.")
@@ -28,23 +67,52 @@ def train_model(org_id):
     ])
 
     # Prepare training data
-    X = data['merchant'] + " " + data['description']
+    X = data['merchant'].fillna("").astype(str).str.cat(data['description'].fillna("").astype(str), sep=" ")
     y = data['category']
 
     # Train the model
+    start = time.perf_counter()
     pipeline.fit(X, y)
+    duration = time.perf_counter() - start
 
-    # Save the model to a file
-    model_path = f"models/categorization_model_org_{org_id}.pkl"
-    with open(model_path, "wb") as f:
-        pickle.dump(pipeline, f)
+    # Save a new model version
+    model_store.save_model(org_id, pipeline, {
+        "training_rows": len(data),
+        "training_seconds": duration,
+        "metrics": {
+            "train_accuracy": float(pipeline.score(X, y)),
+            "classes": len(pipeline.classes_),
+        },
+        "feature_hash": model_store.feature_hash(X, y),
+        **(metadata or {}),
+    }, keep=keep)
 
     return pipeline
 
-def load_model(org_id):
+def update_model_from_feedback(org_id, delta, keep=model_store.DEFAULT_KEEP):
+    """
+    Retrain after categorization feedback.
+
+    `delta` holds only the changed merchants (`Merchant Key`, `Old Category`,
+    `New Category`); nothing is trained when it is empty. The new model
+    version records what changed. Returns the pipeline, or None.
+    """
+    if delta.empty:
+        return None
+    return train_model(org_id, keep=keep, metadata={
+        "feedback_changes": len(delta),
+        "feedback_categories": sorted(delta["New Category"].astype(str).unique()),
+    })
+
+@timed()
+def load_model(org_id, version=None):
     """
     Load a trained machine learning model for an organization.
     """
+    if version is not None or model_store.current_version(org_id) is not None:
+        return model_store.load_model(org_id, version)
+
+    # Models trained before versioning was introduced
     model_path = f"models/categorization_model_org_{org_id}.pkl"
     try:
         with open(model_path, "rb") as f:
@@ -53,16 +121,101 @@ def load_model(org_id):
     except FileNotFoundError:
         raise ValueError(f"Model for organization {org_id} not found. Train the model first.")
 
-def predict_categories(org_id, data):
+def prepare_features(data):
     """
-    Predict transaction categories using the trained model for an organization.
+    Build the model input text ("<Merchant> <Description>") with vectorized string ops.
     """
-    # Load the trained model
-    model = load_model(org_id)
+    merchant = text_values(data['Merchant'])
+    description = text_values(data['Description'])
+    return merchant.str.cat(description, sep=" ")
 
-    # Prepare input data
-    X = data['Merchant'] + " " + data['Description']
+@timed()
+def predict_chunk(model, data, top_k=1):
+    """
+    Predict one chunk, running the model once per distinct input text.
 
-    # Predict categories
-    data['Predicted Category'] = model.predict(X)
-    return data
+    Returns a DataFrame aligned to `data.index` with `Predicted Category`,
+    `Confidence` and, for i in 1..top_k, `Top {i} Category` / `Top {i} Probability`.
+    """
+    codes, uniques = pd.factorize(prepare_features(data))
+    result = pd.DataFrame(index=data.index)
+    if len(uniques) == 0:
+        result['Predicted Category'] = pd.Series(dtype=object)
+        result['Confidence'] = pd.Series(dtype=float)
+        return result
+
+    probabilities = model.predict_proba(np.asarray(uniques, dtype=object))
+    classes = np.asarray(model.classes_)
+    top_k = min(top_k, len(classes))
+    # Column indices of the k most likely classes, best first
+    ranked = np.argsort(-probabilities, axis=1)[:, :top_k]
+    ranked_probabilities = np.take_along_axis(probabilities, ranked, axis=1)
+
+    for i in range(top_k):
+        result[f'Top {i + 1} Category'] = classes[ranked[:, i]][codes]
+        result[f'Top {i + 1} Probability'] = ranked_probabilities[:, i][codes]
+    result.insert(0, 'Predicted Category', result['Top 1 Category'])
+    result.insert(1, 'Confidence', result['Top 1 Probability'])
+    return result
+
+def _init_worker(org_id):
+    global _worker_model
+    _worker_model = load_model(org_id)
+
+def _predict_in_worker(data, top_k):
+    return predict_chunk(_worker_model, data, top_k)
+
+def _iter_chunks(data, chunk_size):
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        # Already an iterable of frames, e.g. pd.read_csv(..., chunksize=...)
+        yield from data
+
+def predict_batches(org_id, data, chunk_size=DEFAULT_CHUNK_SIZE, top_k=1, n_jobs=1):
+    """
+    Stream predictions for arbitrarily large inputs, one chunk at a time.
+
+    Parameters:
+    - data: A DataFrame or an iterable of DataFrames with `Merchant` and `Description`.
+    - chunk_size: Rows per chunk when `data` is a single DataFrame.
+    - top_k: Number of ranked categories and probabilities to return per row.
+    - n_jobs: Worker processes; each loads the model once. At most 2 * n_jobs
+      chunks are in flight, so memory stays flat for any input size.
+
+    Yields prediction frames (see `predict_chunk`) in input order.
+    """
+    chunks = _iter_chunks(data, chunk_size)
+    if n_jobs <= 1:
+        model = load_model(org_id)
+        for chunk in chunks:
+            yield predict_chunk(model, chunk, top_k)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(org_id,)) as executor:
+        pending = []
+        for chunk in chunks:
+            pending.append(executor.submit(_predict_in_worker, chunk, top_k))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+@timed()
+def predict_categories(org_id, data, top_k=1, chunk_size=DEFAULT_CHUNK_SIZE, n_jobs=1):
+    """
+    Predict transaction categories using the trained model for an organization.
+
+    Returns a copy of `data` with the prediction columns added; the input is not modified.
+    """
+    result = data.copy()
+    predictions = list(predict_batches(org_id, data, chunk_size=chunk_size, top_k=top_k, n_jobs=n_jobs))
+    if not predictions:
+        result['Predicted Category'] = pd.Series(dtype=object)
+        return result
+    predictions = pd.concat(predictions)
+    # Chunks are yielded in input order, so assign positionally
+    for col in predictions.columns:
+        result[col] = predictions[col].to_numpy()
+    return result
@@ -0,0 +1,271 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import joblib
+import pandas as pd
+
+# Shared directory for model artifacts; point every app instance at the same volume
+MODEL_ROOT = os.environ.get("MODEL_STORE_PATH", "models")
+
+# Versions kept per organization
+DEFAULT_KEEP = 5
+
+# joblib compression (zlib level); small artifacts load faster from shared storage
+DEFAULT_COMPRESS = 3
+
+# Loaded models kept per process; the least recently used are dropped beyond this
+MAX_CACHED_MODELS = int(os.environ.get("MODEL_CACHE_SIZE", 8))
+
+
+class LRUCache:
+    """
+    Thread-safe mapping that drops its least recently used entries beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Loaded models keyed by cache_key(org_id, version, root)
+_model_cache = LRUCache(MAX_CACHED_MODELS)
+
+
+def _org_dir(org_id, root=None):
+    return os.path.join(root or MODEL_ROOT, f"org_{org_id}")
+
+
+def cache_key(org_id, version, root=None):
+    """
+    Identify a model version across stores: (resolved store root, org_id, version).
+    """
+    return os.path.realpath(root or MODEL_ROOT), org_id, version
+
+
+def _atomic_write(path, write):
+    """
+    Write a file via a temporary file in the same directory and an atomic rename,
+    so readers never see a partially written artifact.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _reserve_version(directory):
+    """
+    Claim the next version number by creating its artifact file exclusively, so
+    instances training at the same time never write the same version.
+    """
+    existing = [int(name[1:7]) for name in os.listdir(directory) if name.startswith("v") and name.endswith(".joblib")]
+    version = max(existing, default=0) + 1
+    while True:
+        try:
+            os.close(os.open(os.path.join(directory, f"v{version:06d}.joblib"), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return version
+        except FileExistsError:
+            version += 1
+
+
+def _write_json(path, payload):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, indent=2, default=str)
+    _atomic_write(path, write)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def feature_hash(X, y):
+    """
+    Fingerprint training inputs so identical training sets can be recognized.
+    """
+    hashed = pd.util.hash_pandas_object(pd.DataFrame({"X": list(X), "y": list(y)}), index=False)
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def list_versions(org_id, root=None):
+    """
+    Return metadata for all stored versions of an organization's model, oldest first.
+    """
+    directory = _org_dir(org_id, root)
+    if not os.path.isdir(directory):
+        return []
+    versions = []
+    for name in os.listdir(directory):
+        if name.startswith("v") and name.endswith(".json"):
+            with open(os.path.join(directory, name)) as f:
+                versions.append(json.load(f))
+    return sorted(versions, key=lambda meta: meta["version"])
+
+
+def current_version(org_id, root=None):
+    """
+    Return the current version number for an organization, or None.
+    """
+    pointer = os.path.join(_org_dir(org_id, root), "current.json")
+    try:
+        with open(pointer) as f:
+            return json.load(f)["version"]
+    except FileNotFoundError:
+        return None
+
+
+def sidecar_path(org_id, version, name, root=None):
+    """
+    Path of a derived artifact (e.g. "shap") stored next to a model version.
+    """
+    return os.path.join(_org_dir(org_id, root), f"{name}_v{version:06d}.json")
+
+
+def write_sidecar(org_id, version, name, payload, root=None):
+    """
+    Atomically store JSON derived from a model version; it is pruned with the version.
+    """
+    path = sidecar_path(org_id, version, name, root)
+    _write_json(path, payload)
+    return path
+
+
+def read_sidecar(org_id, version, name, root=None):
+    try:
+        with open(sidecar_path(org_id, version, name, root)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_model(org_id, model, metadata=None, keep=DEFAULT_KEEP, compress=DEFAULT_COMPRESS, root=None):
+    """
+    Store a new model version and make it current.
+
+    The artifact, its metadata and the `current.json` pointer are each written
+    atomically; the pointer is updated last so readers switch only once the
+    new version is complete. Versions beyond the newest `keep` are removed.
+    """
+    _check_keep(keep)
+    directory = _org_dir(org_id, root)
+    os.makedirs(directory, exist_ok=True)
+    version = _reserve_version(directory)
+    artifact = os.path.join(directory, f"v{version:06d}.joblib")
+
+    try:
+        _atomic_write(artifact, lambda tmp_path: joblib.dump(model, tmp_path, compress=compress))
+    except BaseException:
+        # Release the reservation
+        os.remove(artifact)
+        raise
+
+    meta = dict(metadata or {})
+    meta.update({
+        "version": version,
+        "org_id": org_id,
+        "artifact": os.path.basename(artifact),
+        "sha256": _sha256(artifact),
+        "size_bytes": os.path.getsize(artifact),
+        "created_at": pd.Timestamp.now().isoformat(),
+    })
+    _write_json(os.path.join(directory, f"v{version:06d}.json"), meta)
+    _write_json(os.path.join(directory, "current.json"), {"version": version})
+
+    prune_versions(org_id, keep, root)
+    return meta
+
+
+def _check_keep(keep):
+    if keep < 1:
+        raise ValueError("At least one model version must be kept.")
+
+
+def prune_versions(org_id, keep=DEFAULT_KEEP, root=None):
+    """
+    Delete all but the newest `keep` versions (never the current one).
+    """
+    _check_keep(keep)
+    current = current_version(org_id, root)
+    directory = _org_dir(org_id, root)
+    versions = list_versions(org_id, root)
+    for meta in versions[:max(len(versions) - keep, 0)]:
+        if meta["version"] == current:
+            continue
+        paths = [os.path.join(directory, f"v{meta['version']:06d}{suffix}") for suffix in (".joblib", ".json")]
+        paths += glob.glob(os.path.join(directory, f"*_v{meta['version']:06d}.json"))
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        _model_cache.pop(cache_key(org_id, meta["version"], root))
+
+
+def load_model(org_id, version=None, root=None):
+    """
+    Load an organization's model (the current version by default).
+
+    Only the small `current.json` pointer is read on warm calls; the artifact
+    is loaded once per version and process. The artifact checksum is verified
+    against its metadata before unpickling.
+    """
+    if version is None:
+        version = current_version(org_id, root)
+        if version is None:
+            raise ValueError(f"Model for organization {org_id} not found. Train the model first.")
+
+    key = cache_key(org_id, version, root)
+    model = _model_cache.get(key)
+    if model is not None:
+        return model
+
+    directory = _org_dir(org_id, root)
+    meta_path = os.path.join(directory, f"v{version:06d}.json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"Model version {version} for organization {org_id} not found.")
+
+    artifact = os.path.join(directory, meta["artifact"])
+    if _sha256(artifact) != meta["sha256"]:
+        raise ValueError(f"Model artifact {artifact} does not match its recorded checksum.")
+
+    model = joblib.load(artifact)
+    _model_cache.put(key, model)
+    return model
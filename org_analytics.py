@@ -0,0 +1,267 @@
+import hashlib
+import os
+import threading
+import pandas as pd
+from instrumentation import timed
+
+# DuckDB worker threads per query (0 uses one per core)
+ANALYTICS_THREADS = int(os.environ.get("ORG_ANALYTICS_THREADS", 0))
+
+# Memory DuckDB may use before sorts and aggregations spill to disk
+ANALYTICS_MEMORY_LIMIT = os.environ.get("ORG_ANALYTICS_MEMORY", "1GB")
+
+# Local Parquet copies of payloads DuckDB cannot scan in place (JSON rows, bucket objects)
+ANALYTICS_CACHE_PATH = os.environ.get("ORG_ANALYTICS_CACHE", os.path.join("data", "org_analytics"))
+
+# Same rule as detect_recurring_charges: a charge repeating within this many days is recurring
+RECURRING_MAX_INTERVAL = 30
+
+RECURRING_COLUMNS = ["Merchant", "Users", "Charges", "Average Amount", "Median Interval", "Estimated Yearly Cost"]
+
+
+class SupabaseFileSource:
+    """
+    Organization files and their payloads through supabase_integration.
+    """
+
+    def __init__(self):
+        import supabase_integration
+
+        self.db = supabase_integration
+
+    def list_files(self, org_id):
+        return self.db.fetch_organization_files(org_id)
+
+    def local_path(self, key):
+        store = self.db.frame_store
+        return store.local_path(key) if store is not None else None
+
+    def open(self, key):
+        return self.db.frame_store.open(key)
+
+    def load_frame(self, file):
+        return self.db.fetch_file_data(file["id"], client=self.db.service_supabase)
+
+
+def _sql_path(path):
+    return path.replace("'", "''")
+
+
+class OrgAnalytics:
+    """
+    Organization-wide analyses run by DuckDB directly over the files' Parquet payloads.
+
+    Files stored with the local Parquet backend are scanned in place; bucket
+    objects and legacy JSON payloads are converted once to Parquet under
+    `cache_dir` (one file at a time, keyed by file ID and upload time). Queries
+    read only the columns they use, skip row groups outside the requested
+    dates, run on `threads` threads and spill to disk beyond `memory_limit`,
+    so the organization's data never has to fit in memory.
+    """
+
+    def __init__(self, source, cache_dir=ANALYTICS_CACHE_PATH, threads=ANALYTICS_THREADS,
+                 memory_limit=ANALYTICS_MEMORY_LIMIT):
+        self.source = source
+        self.cache_dir = cache_dir
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self._db = None
+        self._lock = threading.Lock()
+        self._materialize_lock = threading.Lock()
+
+    def _connect(self):
+        import duckdb
+
+        with self._lock:
+            if self._db is None:
+                db = duckdb.connect()
+                db.execute(f"SET memory_limit = '{self.memory_limit}'")
+                db.execute(f"SET temp_directory = '{_sql_path(os.path.join(self.cache_dir, 'spill'))}'")
+                if self.threads:
+                    db.execute(f"SET threads = {int(self.threads)}")
+                self._db = db
+        # Each query gets its own cursor; cursors share the database and its thread pool
+        return self._db.cursor()
+
+    def files(self, org_id, user_ids=None):
+        """
+        The organization's uploaded files, optionally only those of `user_ids`.
+        """
+        files = self.source.list_files(org_id)
+        if user_ids is not None:
+            files = [file for file in files if file["user_id"] in set(user_ids)]
+        return files
+
+    def _cache_path(self, file):
+        version = hashlib.sha256(repr((file["id"], file.get("uploaded_at"))).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, "files", f"{file['id']}-{version}.parquet")
+
+    def _materialize(self, file):
+        """
+        Return a local Parquet path for one file, converting its payload on first use.
+        """
+        key = file.get("path")
+        if key:
+            path = self.source.local_path(key)
+            if path and os.path.exists(path):
+                return path
+        path = self._cache_path(file)
+        if os.path.exists(path):
+            return path
+
+        import pyarrow.parquet as pq
+        from parquet_storage import write_frame, LocalParquetStore
+
+        # Conversions happen once per file; serializing them keeps concurrent
+        # sessions from writing the same cache file
+        with self._materialize_lock:
+            if os.path.exists(path):
+                return path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if key:
+                with self.source.open(key) as source:
+                    table = pq.read_table(source)
+                tmp_path = f"{path}.tmp"
+                pq.write_table(table, tmp_path, compression="zstd")
+                os.replace(tmp_path, path)
+            else:
+                data = self.source.load_frame(file)
+                if data.empty:
+                    return None
+                write_frame(LocalParquetStore(os.path.dirname(path)), os.path.basename(path), data)
+        return path
+
+    def _relation(self, conn, files, start=None, end=None):
+        """
+        Register the files and return the SQL of a transactions relation with
+        user_id, day, amount and merchant columns, or None when there is no data.
+        """
+        rows = []
+        for file in files:
+            path = self._materialize(file)
+            if path:
+                rows.append({"path": os.path.abspath(path), "file_id": file["id"], "user_id": str(file["user_id"])})
+        if not rows:
+            return None
+        conn.register("org_files", pd.DataFrame(rows))
+        paths = ", ".join(f"'{_sql_path(row['path'])}'" for row in rows)
+        scan = f"read_parquet([{paths}], union_by_name = true, filename = true)"
+        columns = {column[0] for column in conn.execute(f"SELECT * FROM {scan} LIMIT 0").description}
+        if not {"Date", "Amount"} <= columns:
+            return None
+
+        # One key rule for every file, whether or not it stored a Merchant Key:
+        # the description (else the merchant name) upper-cased with digits and
+        # punctuation stripped; values that strip to nothing fall through
+        normalized = [
+            f"""NULLIF(trim(regexp_replace(regexp_replace(upper(CAST(t."{name}" AS VARCHAR)), '[^A-Z ]+', ' ', 'g'), ' +', ' ', 'g')), '')"""
+            for name in ("Description", "Merchant") if name in columns
+        ]
+        merchant = f"coalesce({', '.join(normalized)})" if normalized else "NULL"
+
+        # Filters on the raw column so DuckDB can skip row groups by their statistics
+        where = ['t."Date" IS NOT NULL']
+        if start is not None:
+            where.append(f"t.\"Date\" >= TIMESTAMP '{pd.Timestamp(start)}'")
+        if end is not None:
+            where.append(f"t.\"Date\" < TIMESTAMP '{pd.Timestamp(end) + pd.Timedelta(days=1)}'")
+        return f"""
+            SELECT f.user_id, CAST(t."Date" AS DATE) AS day, CAST(t."Amount" AS DOUBLE) AS amount,
+                   {merchant} AS merchant
+            FROM {scan} AS t JOIN org_files AS f ON t.filename = f.path
+            WHERE {' AND '.join(where)}
+        """
+
+    @timed()
+    def recurring_summary(self, files, start=None, end=None):
+        """
+        Recurring charges across all `files`, one row per merchant.
+
+        Intervals are measured between a user's consecutive charges from the
+        same merchant across all of their files; as in detect_recurring_charges,
+        a charge is recurring when it follows the previous one within
+        RECURRING_MAX_INTERVAL days. The yearly cost (what cancelling would save)
+        is estimated per user as in estimate_subscription_costs and summed.
+        """
+        conn = self._connect()
+        try:
+            relation = self._relation(conn, files, start, end)
+            if relation is None:
+                return pd.DataFrame(columns=RECURRING_COLUMNS)
+            return conn.execute(f"""
+                WITH tx AS ({relation}),
+                intervals AS (
+                    SELECT user_id, merchant, amount,
+                           day - lag(day) OVER (PARTITION BY user_id, merchant ORDER BY day, amount) AS interval
+                    FROM tx WHERE merchant IS NOT NULL AND merchant <> ''
+                ),
+                per_user AS (
+                    SELECT merchant, user_id, count(*) AS charges, avg(amount) AS average_amount,
+                           median(interval) AS median_interval
+                    FROM intervals
+                    WHERE interval > 0 AND interval <= {RECURRING_MAX_INTERVAL}
+                    GROUP BY merchant, user_id
+                )
+                SELECT merchant AS "Merchant",
+                       count(*) AS "Users",
+                       CAST(sum(charges) AS BIGINT) AS "Charges",
+                       round(sum(average_amount * charges) / sum(charges), 2) AS "Average Amount",
+                       median(median_interval) AS "Median Interval",
+                       round(sum(abs(average_amount) * 365 / greatest(median_interval, 1)), 2) AS "Estimated Yearly Cost"
+                FROM per_user
+                GROUP BY merchant
+                ORDER BY "Estimated Yearly Cost" DESC
+            """).df()
+        finally:
+            conn.close()
+
+    @timed()
+    def spending_trends(self, files, start=None, end=None):
+        """
+        Total amount per month across all `files`, as in analyze_spending_trends.
+        """
+        conn = self._connect()
+        try:
+            relation = self._relation(conn, files, start, end)
+            if relation is None:
+                return pd.DataFrame(columns=["Month", "Amount"])
+            return conn.execute(f"""
+                WITH tx AS ({relation})
+                SELECT CAST(date_trunc('month', day) AS TIMESTAMP) AS "Month", sum(amount) AS "Amount"
+                FROM tx GROUP BY 1 ORDER BY 1
+            """).df()
+        finally:
+            conn.close()
+
+    @timed()
+    def scope_summary(self, files, start=None, end=None):
+        """
+        Transaction count, users, date span and total amount across `files`.
+        """
+        conn = self._connect()
+        try:
+            relation = self._relation(conn, files, start, end)
+            if relation is None:
+                return {"transactions": 0, "users": 0, "first": None, "last": None, "amount": 0.0}
+            transactions, users, first, last, amount = conn.execute(f"""
+                WITH tx AS ({relation})
+                SELECT count(*), count(DISTINCT user_id), min(day), max(day), coalesce(sum(amount), 0) FROM tx
+            """).fetchone()
+            return {"transactions": transactions, "users": users, "first": first, "last": last, "amount": amount}
+        finally:
+            conn.close()
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_org_analytics():
+    """
+    Process-wide OrgAnalytics over Supabase-stored files, created on first use.
+    """
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = OrgAnalytics(SupabaseFileSource())
+        return _analytics
@@ -0,0 +1,141 @@
+import io
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows per Parquet row group; small enough that date/amount filters can skip groups
+DEFAULT_ROW_GROUP_SIZE = 64_000
+
+# Columns with a known logical type in bank and enriched data
+DATE_COLUMNS = ["Date"]
+NUMERIC_COLUMNS = ["Amount", "Interval", "Frequency"]
+
+
+class LocalParquetStore:
+    """
+    Store Parquet objects in a local directory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def write(self, key, payload):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def open(self, key):
+        return pa.OSFile(self._path(key), "rb")
+
+    def local_path(self, key):
+        return self._path(key)
+
+
+class BucketParquetStore:
+    """
+    Store Parquet objects in a Supabase Storage bucket (or any client exposing
+    the same `storage.from_(bucket).upload/download` interface).
+    """
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def write(self, key, payload):
+        self.client.storage.from_(self.bucket).upload(
+            key, payload, {"content-type": "application/vnd.apache.parquet", "upsert": "true"}
+        )
+
+    def open(self, key):
+        payload = self.client.storage.from_(self.bucket).download(key)
+        return pa.BufferReader(payload)
+
+    def local_path(self, key):
+        return None
+
+
+def build_store(settings, client=None):
+    """
+    Create a Parquet store from the `[storage]` settings block.
+
+    Supported settings:
+    - backend: "json" (default, no store), "parquet_local" or "parquet_bucket".
+    - path: Directory for "parquet_local" (defaults to "data/parquet").
+    - bucket: Bucket name for "parquet_bucket" (defaults to "bank-data").
+    """
+    backend = settings.get("backend", "json")
+    if backend == "parquet_local":
+        return LocalParquetStore(settings.get("path", "data/parquet"))
+    if backend == "parquet_bucket":
+        if client is None:
+            raise ValueError("A Supabase client is required for the parquet_bucket backend.")
+        return BucketParquetStore(client, settings.get("bucket", "bank-data"))
+    return None
+
+
+def make_key(user_id, kind):
+    """
+    Build a unique object key for a stored frame.
+    """
+    stamp = pd.Timestamp.now().strftime("%Y%m%dT%H%M%S")
+    return f"{user_id}/{kind}/{stamp}-{uuid.uuid4().hex}.parquet"
+
+
+def to_typed_frame(data):
+    """
+    Coerce known columns to their logical types so they round-trip through Parquet.
+    """
+    data = data.copy()
+    for col in DATE_COLUMNS:
+        if col in data.columns and not pd.api.types.is_datetime64_any_dtype(data[col]):
+            data[col] = pd.to_datetime(data[col], errors="coerce")
+    for col in NUMERIC_COLUMNS:
+        if col in data.columns and not pd.api.types.is_numeric_dtype(data[col]):
+            data[col] = pd.to_numeric(data[col], errors="coerce")
+    return data
+
+
+def write_frame(store, key, data, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """
+    Write a DataFrame to the store as Parquet and return its key.
+    """
+    table = pa.Table.from_pandas(to_typed_frame(data), preserve_index=False)
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, row_group_size=row_group_size, compression="zstd")
+    store.write(key, buffer.getvalue())
+    return key
+
+
+def read_frame(store, key, columns=None, filters=None):
+    """
+    Read a stored Parquet frame.
+
+    Parameters:
+    - columns: Optional list of columns to read; other columns are never decoded.
+    - filters: Optional pyarrow filter list, e.g. [("Date", ">=", pd.Timestamp("2024-01-01"))].
+      Row groups whose statistics exclude the filter are skipped.
+    """
+    with store.open(key) as source:
+        table = pq.read_table(source, columns=columns, filters=filters)
+    return table.to_pandas()
+
+
+def filter_frame(data, columns=None, filters=None):
+    """
+    Apply `read_frame`'s `columns` and `filters` to an in-memory frame, so
+    payloads stored as JSON are restricted the same way as Parquet ones.
+    """
+    if filters:
+        table = pa.Table.from_pandas(to_typed_frame(data), preserve_index=False)
+        data = table.filter(pq.filters_to_expression(filters)).to_pandas()
+    if columns is not None:
+        data = data[[col for col in columns if col in data.columns]]
+    return data
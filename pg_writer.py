@@ -0,0 +1,115 @@
+# Rows sent per COPY write call; all batches of one call share a transaction
+DEFAULT_BATCH_ROWS = 5_000
+
+
+class WriteResult:
+    """
+    Minimal stand-in for a PostgREST response so callers can keep checking `.data`.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __repr__(self):
+        return f"WriteResult(rows={len(self.data)})"
+
+
+class PostgresWriter:
+    """
+    Write directly to Postgres over a connection pool, bypassing PostgREST.
+
+    Each call runs in a single transaction, so a file's rows are either all
+    written or none are.
+    """
+
+    def __init__(self, dsn, min_size=1, max_size=5, batch_rows=DEFAULT_BATCH_ROWS):
+        from psycopg_pool import ConnectionPool
+
+        self.pool = ConnectionPool(dsn, min_size=min_size, max_size=max_size, open=True)
+        self.batch_rows = batch_rows
+
+    def close(self):
+        self.pool.close()
+
+    def insert_returning(self, table, row):
+        """
+        Insert one row and return it (with generated columns) as a WriteResult.
+        """
+        from psycopg.rows import dict_row
+        from psycopg.types.json import Jsonb
+
+        columns = list(row)
+        values = [Jsonb(value) if isinstance(value, (dict, list)) else value for value in row.values()]
+        placeholders = ", ".join(["%s"] * len(columns))
+        sql = f"INSERT INTO public.{table} ({', '.join(columns)}) VALUES ({placeholders}) RETURNING *"
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                with conn.cursor(row_factory=dict_row) as cur:
+                    cur.execute(sql, values)
+                    return WriteResult(cur.fetchall())
+
+    def copy_frame(self, table, data, columns=None):
+        """
+        Bulk-load a DataFrame of scalar columns whose names match the table's columns.
+
+        Batches are serialized with pandas' CSV writer rather than per value in
+        Python; missing values are loaded as NULL.
+        """
+        columns = list(columns or data.columns)
+        sql = f"COPY public.{table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        data = data[columns]
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    with cur.copy(sql) as copy:
+                        for start in range(0, len(data), self.batch_rows):
+                            batch = data.iloc[start:start + self.batch_rows]
+                            copy.write(batch.to_csv(header=False, index=False))
+        return WriteResult([{"rows": len(data)}])
+
+    def upsert_frame(self, table, data, conflict_columns, update_columns=None):
+        """
+        Insert or update a DataFrame's rows in one statement.
+
+        Rows are loaded with COPY into a temporary table and merged with
+        INSERT ... ON CONFLICT (conflict_columns) DO UPDATE, all in one
+        transaction. `update_columns` defaults to every non-conflict column.
+        """
+        columns = list(data.columns)
+        update_columns = update_columns or [col for col in columns if col not in conflict_columns]
+        column_list = ", ".join(columns)
+        assignments = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"CREATE TEMP TABLE _upsert (LIKE public.{table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    )
+                    with cur.copy(f"COPY _upsert ({column_list}) FROM STDIN WITH (FORMAT csv)") as copy:
+                        for start in range(0, len(data), self.batch_rows):
+                            copy.write(data.iloc[start:start + self.batch_rows].to_csv(header=False, index=False))
+                    cur.execute(
+                        f"INSERT INTO public.{table} ({column_list}) SELECT {column_list} FROM _upsert "
+                        f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {assignments}"
+                    )
+                    count = cur.rowcount
+        return WriteResult([{"rows": count}])
+
+
+def build_writer(settings):
+    """
+    Create a PostgresWriter from the `[postgres]` settings block, or None when
+    no `dsn` is configured or psycopg is not installed.
+    """
+    dsn = settings.get("dsn")
+    if not dsn:
+        return None
+    try:
+        return PostgresWriter(
+            dsn,
+            min_size=settings.get("min_pool_size", 1),
+            max_size=settings.get("max_pool_size", 5),
+            batch_rows=settings.get("batch_rows", DEFAULT_BATCH_ROWS),
+        )
+    except ImportError:
+        return None
@@ -0,0 +1,183 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+
+# Where profile files are written
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+# Reports kept in memory for the dashboard
+MAX_REPORTS = 50
+
+# Rows shown in hot-spot and allocation tables
+TOP_N = 25
+
+_lock = threading.Lock()
+# Only one page run is profiled at a time: cProfile and tracemalloc are not
+# designed for overlapping sessions
+_active = threading.Lock()
+_settings = {"pages": None, "remaining": 0, "mode": "cprofile"}
+_reports = deque(maxlen=MAX_REPORTS)
+
+
+def enable_profiling(pages=None, runs=1, mode="cprofile"):
+    """
+    Profile the next `runs` page dispatches, optionally only for the given page names.
+
+    `mode` is "cprofile" (deterministic) or "sampling" (pyinstrument, if installed).
+    """
+    with _lock:
+        _settings.update({"pages": set(pages) if pages else None, "remaining": runs, "mode": mode})
+
+
+def disable_profiling():
+    with _lock:
+        _settings["remaining"] = 0
+
+
+def profiling_status():
+    with _lock:
+        return dict(_settings)
+
+
+def _claim(page):
+    with _lock:
+        if _settings["remaining"] <= 0:
+            return None
+        if _settings["pages"] is not None and page not in _settings["pages"]:
+            return None
+        if not _active.acquire(blocking=False):
+            return None
+        _settings["remaining"] -= 1
+        return _settings["mode"]
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9_-]+", "-", str(text)).strip("-")[:40]
+
+
+def _cprofile_hot_spots(profiler):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (calls, _, self_time, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": function,
+            "location": f"{filename}:{line}",
+            "calls": calls,
+            "self_s": self_time,
+            "cumulative_s": cumulative,
+        })
+    hot = pd.DataFrame(rows, columns=["function", "location", "calls", "self_s", "cumulative_s"])
+    return hot.sort_values("self_s", ascending=False).head(TOP_N).reset_index(drop=True)
+
+
+def _allocation_hot_spots(snapshot):
+    rows = [
+        {"location": str(stat.traceback[0]), "size_kb": stat.size / 1024, "blocks": stat.count}
+        for stat in snapshot.statistics("lineno")[:TOP_N]
+    ]
+    return pd.DataFrame(rows, columns=["location", "size_kb", "blocks"])
+
+
+@contextmanager
+def profile_run(session_id, page):
+    """
+    Profile one page dispatch if profiling was requested for it; otherwise a no-op.
+
+    The report (hot spots, peak traced memory, top allocations) is kept in
+    memory and the raw profile is written under PROFILE_DIR.
+    """
+    mode = _claim(page)
+    if mode is None:
+        yield
+        return
+
+    try:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+        sampler = None
+        profiler = None
+        if mode == "sampling":
+            try:
+                from pyinstrument import Profiler
+                sampler = Profiler()
+            except ImportError:
+                mode = "cprofile"
+        if sampler is not None:
+            sampler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if sampler is not None:
+                sampler.stop()
+            else:
+                profiler.disable()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            allocations = _allocation_hot_spots(tracemalloc.take_snapshot())
+            if started_tracing:
+                tracemalloc.stop()
+
+            report_id = uuid.uuid4().hex[:12]
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{_slug(session_id)}-{_slug(page)}-{report_id}")
+            if sampler is not None:
+                path = f"{base}.html"
+                with open(path, "w") as f:
+                    f.write(sampler.output_html())
+                hot_spots = pd.DataFrame({"profile": [sampler.output_text(unicode=False, color=False)]})
+            else:
+                path = f"{base}.prof"
+                profiler.dump_stats(path)
+                hot_spots = _cprofile_hot_spots(profiler)
+
+            with _lock:
+                _reports.append({
+                    "id": report_id,
+                    "session_id": session_id,
+                    "page": page,
+                    "mode": mode,
+                    "started_at": pd.Timestamp.now() - pd.Timedelta(seconds=seconds),
+                    "seconds": seconds,
+                    # tracemalloc is process-wide: concurrent sessions contribute too
+                    "peak_memory_mb": peak_bytes / 1024 ** 2,
+                    "path": path,
+                    "hot_spots": hot_spots,
+                    "allocations": allocations,
+                })
+    finally:
+        _active.release()
+
+
+def list_reports():
+    """
+    Return a summary row per stored report, newest first.
+    """
+    with _lock:
+        reports = list(_reports)
+    columns = ["id", "session_id", "page", "mode", "started_at", "seconds", "peak_memory_mb", "path"]
+    return pd.DataFrame([{key: report[key] for key in columns} for report in reversed(reports)], columns=columns)
+
+
+def get_report(report_id):
+    with _lock:
+        for report in _reports:
+            if report["id"] == report_id:
+                return report
+    return None
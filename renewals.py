@@ -0,0 +1,348 @@
+import threading
+import numpy as np
+import pandas as pd
+from instrumentation import timed
+from transaction_schema import text_values
+
+# Charges on distinct days before a series is scheduled as a renewal
+MIN_CHARGES = 3
+
+# A series has a threshold pattern when its period is within this share of the pattern's days
+PERIOD_TOLERANCE = 0.25
+
+# Share of a series' intervals that must lie within PERIOD_TOLERANCE of its
+# period before it is scheduled, so a few coincidentally regular gaps (coffee
+# bought on consecutive days, groceries that average a week) are not renewals
+MIN_REGULAR_SHARE = 0.75
+
+# Days past the expected date before a renewal counts as missed: this share of
+# the period, but at least MIN_GRACE_DAYS
+GRACE_RATIO = 0.25
+MIN_GRACE_DAYS = 3
+
+# Most stored intervals weighed against new ones when a period is re-estimated
+MAX_HISTORY_WEIGHT = 12
+
+DATE_COLUMNS = ["first_charge_date", "last_charge_date", "next_charge_date", "missed_after"]
+
+SERIES_COLUMNS = ["merchant_key", "merchant", "pattern", "period_days", "amount", "charges", "interval_count",
+                  "regular_intervals", "first_charge_date", "last_charge_date", "next_charge_date", "missed_after"]
+
+
+def classify_period(period_days, thresholds):
+    """
+    Return the threshold pattern (e.g. "Monthly") closest to `period_days`,
+    or None when no pattern is within PERIOD_TOLERANCE.
+    """
+    if not period_days or not thresholds:
+        return None
+    pattern, days = min(thresholds.items(), key=lambda item: abs(item[1] - period_days))
+    return pattern if abs(days - period_days) <= PERIOD_TOLERANCE * days else None
+
+
+def is_regular(series):
+    """
+    True when most of a series' intervals are close to its period and together
+    they span its charges, i.e. it has no long gaps the median hides.
+    """
+    period, count = series.get("period_days"), series.get("interval_count")
+    if not period or not count:
+        return False
+    span = (pd.Timestamp(series["last_charge_date"]) - pd.Timestamp(series["first_charge_date"])).days
+    return (series.get("regular_intervals", 0) >= MIN_REGULAR_SHARE * count
+            and count * period >= (1 - PERIOD_TOLERANCE) * span)
+
+
+def _count_regular(intervals, period):
+    return sum(1 for interval in intervals if abs(interval - period) <= PERIOD_TOLERANCE * period) if period else 0
+
+
+def schedule(series, thresholds):
+    """
+    Set a series' pattern, next expected charge date and the date after which
+    that charge counts as missed. Irregular or short series are not scheduled.
+    """
+    period = series.get("period_days")
+    pattern = classify_period(period, thresholds) if series["charges"] >= MIN_CHARGES and is_regular(series) else None
+    series["pattern"] = pattern
+    if pattern is None:
+        series["next_charge_date"] = series["missed_after"] = None
+        return series
+    next_charge = pd.Timestamp(series["last_charge_date"]) + pd.Timedelta(days=period)
+    grace = max(MIN_GRACE_DAYS, round(period * GRACE_RATIO))
+    series["next_charge_date"] = next_charge
+    series["missed_after"] = next_charge + pd.Timedelta(days=grace)
+    return series
+
+
+def charge_series(data):
+    """
+    Group a statement's charges by merchant key.
+
+    Returns {key: (merchant name, sorted distinct charge dates, latest amount)}.
+    """
+    from merchant_normalization import merchant_keys
+
+    data = data.dropna(subset=["Date"])
+    if "Merchant Key" in data.columns:
+        keys = data["Merchant Key"].astype(str)
+    else:
+        source = data["Description"] if "Description" in data.columns else data["Merchant"]
+        keys = merchant_keys(source).set_axis(data.index)
+    names = text_values(data["Merchant"]) if "Merchant" in data.columns else keys
+    frame = pd.DataFrame({
+        "key": keys, "merchant": names, "date": pd.to_datetime(data["Date"]).dt.normalize(),
+        "amount": pd.to_numeric(data["Amount"], errors="coerce"),
+    })
+    frame = frame[frame["key"] != ""].sort_values(["key", "date"], kind="stable")
+    series = {}
+    for key, group in frame.groupby("key", sort=False):
+        series[key] = (group["merchant"].iloc[-1], group["date"].drop_duplicates().tolist(), group["amount"].iloc[-1])
+    return series
+
+
+def align_keys(new_keys, stored_keys):
+    """
+    Map merchant keys from a new statement onto already stored keys naming
+    the same merchant, so a series continues across uploads.
+    """
+    from merchant_normalization import group_names
+
+    stored_keys = list(stored_keys)
+    new_keys = [key for key in new_keys if key not in set(stored_keys)]
+    if not stored_keys or not new_keys:
+        return {}
+    # Stored keys outweigh new ones, so they become the canonical names of their groups
+    weights = [len(stored_keys) + len(new_keys)] * len(stored_keys) + [1] * len(new_keys)
+    canonical = group_names(stored_keys + new_keys, weights)
+    stored = set(stored_keys)
+    return {key: canonical[key] for key in new_keys if canonical[key] in stored}
+
+
+def merge_series(stored, merchant, dates, amount):
+    """
+    Fold a statement's charge dates for one merchant into its stored series.
+
+    Only charges outside the stored first/last dates are new; statements that
+    repeat already indexed periods change nothing. Returns the updated series,
+    or None when nothing changed.
+    """
+    if stored is None:
+        intervals = np.diff(np.array(dates, dtype="datetime64[D]")).astype(int).tolist()
+        period = int(round(np.median(intervals))) if intervals else None
+        return {
+            "merchant": merchant,
+            "amount": amount,
+            "charges": len(dates),
+            "interval_count": len(intervals),
+            "regular_intervals": _count_regular(intervals, period),
+            "period_days": period,
+            "first_charge_date": dates[0],
+            "last_charge_date": dates[-1],
+        }
+
+    first, last = pd.Timestamp(stored["first_charge_date"]), pd.Timestamp(stored["last_charge_date"])
+    before = [date for date in dates if date < first]
+    after = [date for date in dates if date > last]
+    if not before and not after:
+        return None
+    intervals = []
+    for run in (before + [first] if before else [], [last] + after if after else []):
+        intervals += np.diff(np.array(run, dtype="datetime64[D]")).astype(int).tolist()
+    history = [stored["period_days"]] * min(stored["interval_count"], MAX_HISTORY_WEIGHT) if stored["period_days"] else []
+    period = int(round(np.median(history + intervals))) if history + intervals else None
+    series = dict(stored)
+    series.update({
+        "charges": stored["charges"] + len(before) + len(after),
+        "interval_count": stored["interval_count"] + len(intervals),
+        # Stored intervals were judged against the stored period, which the new one stays close to
+        "regular_intervals": (stored.get("regular_intervals") or 0) + _count_regular(intervals, period),
+        "period_days": period,
+        "first_charge_date": min(before + [first]),
+        "last_charge_date": max(after + [last]),
+    })
+    if after:
+        series["merchant"], series["amount"] = merchant, amount
+    return series
+
+
+def series_frame(rows):
+    """
+    Series dicts as a DataFrame with SERIES_COLUMNS, dates as ISO strings.
+    """
+    frame = pd.DataFrame(rows, columns=SERIES_COLUMNS)
+    for col in DATE_COLUMNS:
+        frame[col] = pd.to_datetime(frame[col]).dt.strftime("%Y-%m-%d").astype(object)
+        frame.loc[frame[col].isna(), col] = None
+    frame["period_days"] = frame["period_days"].astype("Int64")
+    return frame
+
+
+class SupabaseRenewalBackend:
+    """
+    Renewal series reads and writes through supabase_integration.
+    """
+
+    def __init__(self):
+        import supabase_integration
+
+        self.db = supabase_integration
+
+    def fetch_series(self, user_id):
+        return self.db.fetch_renewal_series(user_id)
+
+    def upsert_series(self, user_id, rows, organization_id=None):
+        self.db.upsert_renewal_series(user_id, rows, organization_id)
+
+    def upcoming(self, user_id, start, end):
+        return self.db.fetch_upcoming_renewals(user_id, start, end)
+
+    def missed(self, user_id, as_of):
+        return self.db.fetch_missed_renewals(user_id, as_of)
+
+    def horizon(self, user_id):
+        return self.db.fetch_renewal_horizon(user_id)
+
+
+class PostgresRenewalBackend:
+    """
+    Renewal series reads and writes over a direct Postgres connection (a PostgresWriter).
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def _query(self, sql, params):
+        from psycopg.rows import dict_row
+
+        with self.writer.pool.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
+
+    def fetch_series(self, user_id):
+        return self._query("SELECT * FROM public.upcoming_renewals WHERE user_id = %s", (user_id,))
+
+    def upsert_series(self, user_id, rows, organization_id=None):
+        rows = rows.assign(user_id=user_id, organization_id=organization_id, updated_at=pd.Timestamp.now(tz="UTC"))
+        self.writer.upsert_frame("upcoming_renewals", rows, ["user_id", "merchant_key"])
+
+    def upcoming(self, user_id, start, end):
+        return self._query(
+            "SELECT * FROM public.upcoming_renewals WHERE user_id = %s AND next_charge_date BETWEEN %s AND %s "
+            "ORDER BY next_charge_date",
+            (user_id, start, end),
+        )
+
+    def missed(self, user_id, as_of):
+        return self._query(
+            "SELECT * FROM public.upcoming_renewals WHERE user_id = %s AND missed_after < %s ORDER BY missed_after",
+            (user_id, as_of),
+        )
+
+    def horizon(self, user_id):
+        rows = self._query("SELECT max(last_charge_date) AS horizon FROM public.upcoming_renewals WHERE user_id = %s",
+                           (user_id,))
+        return rows[0]["horizon"] if rows else None
+
+
+class RenewalIndex:
+    """
+    Each user's charge series with their period and next expected charge,
+    kept in the indexed `upcoming_renewals` table.
+
+    `update` folds a new statement into the stored series (only merchants
+    with new charges are written), so "renewing in the next N days" and
+    "expected but missing" are range lookups on (user_id, next_charge_date)
+    and (user_id, missed_after) instead of detection over all history.
+    Periods are matched against the organization's renewal thresholds.
+    """
+
+    def __init__(self, backend, config=None):
+        self.backend = backend
+        self.config = config
+
+    def thresholds(self, org_id=None):
+        if self.config is None:
+            from config_store import get_config_store
+
+            self.config = get_config_store()
+        return self.config.thresholds(org_id)
+
+    @timed()
+    def update(self, user_id, data, organization_id=None):
+        """
+        Index a newly uploaded statement for `user_id`; returns the number of series written.
+        """
+        if data.empty or not {"Date", "Amount"} <= set(data.columns):
+            return 0
+        new = charge_series(data)
+        stored = {row["merchant_key"]: row for row in self.backend.fetch_series(user_id)}
+        aliases = align_keys(new, stored)
+        thresholds = self.thresholds(organization_id)
+
+        # Several new keys may continue the same stored series
+        merged = {}
+        for key, (merchant, dates, amount) in new.items():
+            key = aliases.get(key, key)
+            if key in merged:
+                _, previous, _ = merged[key]
+                dates = sorted(set(previous) | set(dates))
+            merged[key] = (merchant, dates, amount)
+
+        rows = []
+        for key, (merchant, dates, amount) in merged.items():
+            series = merge_series(stored.get(key), merchant, dates, amount)
+            if series is not None:
+                series["merchant_key"] = key
+                rows.append(schedule(series, thresholds))
+        if rows:
+            self.backend.upsert_series(user_id, series_frame(rows), organization_id)
+        return len(rows)
+
+    @timed()
+    def upcoming(self, user_id, days=30, as_of=None):
+        """
+        Renewals expected within `days` days of `as_of` (today by default), soonest first.
+        """
+        start = pd.Timestamp(as_of).normalize() if as_of is not None else pd.Timestamp.now().normalize()
+        end = start + pd.Timedelta(days=days)
+        return self._frame(self.backend.upcoming(user_id, start.date().isoformat(), end.date().isoformat()))
+
+    @timed()
+    def missed(self, user_id, as_of=None):
+        """
+        Renewals whose expected charge is overdue, i.e. likely cancelled.
+
+        By default overdue is judged against the user's latest indexed charge
+        rather than today, so a user who simply has not uploaded recent
+        statements does not see every subscription as missed.
+        """
+        if as_of is None:
+            as_of = self.backend.horizon(user_id)
+            if as_of is None:
+                return self._frame([])
+        return self._frame(self.backend.missed(user_id, pd.Timestamp(as_of).date().isoformat()))
+
+    @staticmethod
+    def _frame(rows):
+        frame = pd.DataFrame(rows, columns=SERIES_COLUMNS) if not rows else pd.DataFrame(rows)[SERIES_COLUMNS]
+        for col in DATE_COLUMNS:
+            frame[col] = pd.to_datetime(frame[col])
+        frame["amount"] = pd.to_numeric(frame["amount"])
+        return frame
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_renewal_index():
+    """
+    Process-wide RenewalIndex backed by Supabase, created on first use.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RenewalIndex(SupabaseRenewalBackend())
+        return _index
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Directory for cached agent/task results; shared by all sessions of an instance
+CACHE_ROOT = os.environ.get("RESULT_CACHE_PATH", os.path.join("data", "result_cache"))
+
+# Total size the cache may grow to before least-recently-used entries are evicted
+DEFAULT_MAX_BYTES = 64 * 1024 ** 2
+
+# Seconds between full rescans of the cache directory; in between, sizes are
+# tracked in memory and entries other processes add are picked up by the next rescan
+RESCAN_SECONDS = 300
+
+
+def fingerprint(*parts):
+    """
+    Return a stable sha256 hex digest of JSON-serializable parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def agent_config(agent):
+    """
+    Describe what determines an agent's answers: role, goal, backstory, model and tools.
+    """
+    llm = getattr(agent, "llm", None)
+    return {
+        "role": getattr(agent, "role", None),
+        "goal": getattr(agent, "goal", None),
+        "backstory": getattr(agent, "backstory", None),
+        "llm": getattr(llm, "model", None) or getattr(llm, "model_name", None) or (str(llm) if llm else None),
+        "tools": sorted(getattr(tool, "name", type(tool).__name__) for tool in getattr(agent, "tools", None) or []),
+    }
+
+
+def task_key(task, inputs):
+    """
+    Content address for running `task` (with its agent's configuration) on `inputs`.
+    """
+    return fingerprint(
+        getattr(task, "description", None),
+        getattr(task, "expected_output", None),
+        agent_config(getattr(task, "agent", None)),
+        inputs,
+    )
+
+
+class ResultCache:
+    """
+    Content-addressed, on-disk cache of JSON-serializable results.
+
+    Entries are written atomically; reads refresh an entry's mtime so eviction
+    removes the least recently used entries once `max_bytes` is exceeded.
+    Entry sizes and recency are kept in memory, so writes do not walk the
+    cache directory; it is rescanned on first use and every `rescan_seconds`.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, rescan_seconds=RESCAN_SECONDS):
+        self.root = root or CACHE_ROOT
+        self.max_bytes = max_bytes
+        self.rescan_seconds = rescan_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # path -> size, least recently used first
+        self._index = None
+        self._total = 0
+        self._scanned_at = 0.0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if self._index is not None and path in self._index:
+                self._index.move_to_end(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = os.path.getsize(path)
+        with self._lock:
+            self._refresh()
+            self._total += size - self._index.pop(path, 0)
+            self._index[path] = size
+        self.evict()
+
+    def entries(self):
+        """
+        Return (mtime, size, path) for every cached entry.
+        """
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".json") or name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, path))
+        return found
+
+    def _refresh(self):
+        """
+        Rebuild the in-memory index from disk when it is missing or stale; call with the lock held.
+        """
+        if self._index is not None and time.monotonic() - self._scanned_at < self.rescan_seconds:
+            return
+        self._index = OrderedDict((path, size) for _, size, path in sorted(self.entries()))
+        self._total = sum(self._index.values())
+        self._scanned_at = time.monotonic()
+
+    def size(self):
+        with self._lock:
+            self._refresh()
+            return self._total
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in `max_bytes`.
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            self._refresh()
+            removed = 0
+            while self._total > self.max_bytes and self._index:
+                path, size = self._index.popitem(last=False)
+                self._total -= size
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+            return removed
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self.entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._index = OrderedDict()
+            self._total = 0
+            self._scanned_at = time.monotonic()
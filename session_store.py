@@ -0,0 +1,347 @@
+import hashlib
+import itertools
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+
+# In-memory budget for frames shared by all sessions of this process
+SESSION_STORE_BYTES = int(os.environ.get("SESSION_STORE_BYTES", 512 * 1024 ** 2))
+
+# Evicted frames are written here (one subdirectory per process) for fast reloads
+SPILL_ROOT = os.environ.get("SESSION_SPILL_PATH", os.path.join("data", "session_spill"))
+
+# Disk budget for spilled frames; the oldest spill files are deleted beyond it
+SPILL_MAX_BYTES = int(os.environ.get("SESSION_SPILL_BYTES", 4 * 1024 ** 3))
+
+# "arrow" (uncompressed IPC, memory-mapped on reload) or "parquet" (zstd, smaller)
+SPILL_FORMAT = os.environ.get("SESSION_SPILL_FORMAT", "arrow")
+
+# Sessions not seen for this long no longer count as holding their frames
+SESSION_TTL_SECONDS = 30 * 60
+
+
+def current_session_id():
+    """
+    Return the Streamlit session ID, or "unknown" outside a session.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "unknown"
+    except ImportError:
+        return "unknown"
+
+
+def frame_bytes(data):
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+
+class _Entry:
+    def __init__(self, key, data):
+        self.key = key
+        self.data = data
+        self.nbytes = frame_bytes(data)
+        self.spill_path = None
+        self.spill_bytes = 0
+
+
+class SessionFrameStore:
+    """
+    DataFrames shared across sessions, keyed by what identifies their content
+    (e.g. ("uploaded_files", file_id, uploaded_at)).
+
+    Identical keys load once per process. Frames stay in memory up to
+    `max_bytes`; beyond that the least recently used are evicted to local
+    Arrow IPC (memory-mapped on reload) or Parquet files and reloaded from
+    there on the next access. Callers receive shallow copies, so adding or
+    replacing columns never affects other sessions.
+    """
+
+    def __init__(self, max_bytes=SESSION_STORE_BYTES, spill_root=SPILL_ROOT, spill_format=SPILL_FORMAT,
+                 spill_max_bytes=SPILL_MAX_BYTES, session_ttl=SESSION_TTL_SECONDS):
+        if spill_format not in ("arrow", "parquet"):
+            raise ValueError(f"Unsupported spill format: {spill_format}")
+        self.max_bytes = max_bytes
+        self.spill_dir = os.path.join(spill_root, str(os.getpid()))
+        self.spill_format = spill_format
+        self.spill_max_bytes = spill_max_bytes
+        self.session_ttl = session_ttl
+        self.stats = {"hits": 0, "loads": 0, "spills": 0, "reloads": 0}
+        self._memory = OrderedDict()
+        self._spilled = OrderedDict()
+        self._sessions = {}
+        self._memory_bytes = 0
+        self._spill_bytes = 0
+        self._lock = threading.RLock()
+        self._loading = {}
+        self._spill_seq = itertools.count()
+        # Spill files from an earlier process with the same pid are stale
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def get(self, key, loader, session_id=None):
+        """
+        Return the frame for `key`, calling `loader()` only when it is neither
+        in memory nor spilled. Concurrent requests for the same key share one
+        load. Empty results are returned but not stored.
+        """
+        session_id = current_session_id() if session_id is None else session_id
+        with self._lock:
+            self._touch_session(session_id, key)
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.data.copy(deep=False)
+            event = self._loading.get(key)
+            owner = event is None
+            if owner:
+                event = self._loading[key] = threading.Event()
+        if not owner:
+            event.wait()
+            return self.get(key, loader, session_id)
+
+        try:
+            with self._lock:
+                spilled = self._spilled.get(key)
+                # Evicted frames still being written out keep their data
+                pending = spilled.data if spilled is not None else None
+            if pending is not None:
+                data = pending
+            elif spilled is not None:
+                try:
+                    data = self._read_spill(spilled.spill_path)
+                except OSError:
+                    # Pruned or invalidated meanwhile
+                    spilled, data = None, loader()
+            else:
+                data = loader()
+            with self._lock:
+                self.stats["reloads" if spilled is not None else "loads"] += 1
+            if spilled is None and data.empty:
+                # Loaders return an empty frame when a fetch fails or the row is
+                # missing; keep that out of the store so the next access retries
+                return data
+            with self._lock:
+                if spilled is not None and self._spilled.get(key) is spilled:
+                    # Back in memory, the spill file is kept for the next eviction
+                    # but no longer counts against the disk budget
+                    del self._spilled[key]
+                    if spilled.spill_path is not None:
+                        self._spill_bytes -= spilled.spill_bytes
+                    entry = spilled
+                    entry.data = data
+                else:
+                    entry = _Entry(key, data)
+                self._memory[key] = entry
+                self._memory_bytes += entry.nbytes
+                victims = self._evict()
+            self._spill(victims)
+            return data.copy(deep=False)
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def invalidate(self, key):
+        """
+        Forget a key everywhere, e.g. after its source changed.
+        """
+        with self._lock:
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory_bytes -= entry.nbytes
+                if entry.spill_path is not None:
+                    self._remove_spill(entry.spill_path)
+            entry = self._spilled.pop(key, None)
+            if entry is not None and entry.spill_path is not None:
+                self._spill_bytes -= entry.spill_bytes
+                self._remove_spill(entry.spill_path)
+
+    def release_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _touch_session(self, session_id, key):
+        now = time.monotonic()
+        keys, _ = self._sessions.get(session_id, (set(), now))
+        keys.add(key)
+        self._sessions[session_id] = (keys, now)
+        for other, (_, seen) in list(self._sessions.items()):
+            if now - seen > self.session_ttl:
+                del self._sessions[other]
+
+    def _evict(self):
+        """
+        Move least recently used frames to the spilled set until the memory
+        budget holds (the newest frame always stays, even if it alone exceeds
+        the budget). Call with the lock held; returns (entry, data) pairs whose
+        spill files `_spill` must write once the lock is released.
+        """
+        victims = []
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            key, entry = self._memory.popitem(last=False)
+            self._memory_bytes -= entry.nbytes
+            self._spilled[key] = entry
+            if entry.spill_path is None:
+                victims.append((entry, entry.data))
+            else:
+                entry.data = None
+                self._spill_bytes += entry.spill_bytes
+        self._prune_spill()
+        return victims
+
+    def _spill(self, victims):
+        """
+        Write evicted frames to disk without holding the lock; until then
+        `get` serves them from the data their entries still hold.
+        """
+        for entry, data in victims:
+            try:
+                path, nbytes = self._write_spill(entry.key, data)
+            except OSError:
+                with self._lock:
+                    # Not kept anywhere; the next access loads it again
+                    if self._spilled.get(entry.key) is entry:
+                        del self._spilled[entry.key]
+                continue
+            with self._lock:
+                self.stats["spills"] += 1
+                spilled = self._spilled.get(entry.key) is entry
+                if entry.spill_path is None and (spilled or self._memory.get(entry.key) is entry):
+                    # A frame reloaded meanwhile keeps the file for its next eviction
+                    entry.spill_path, entry.spill_bytes = path, nbytes
+                    if spilled:
+                        self._spill_bytes += nbytes
+                else:
+                    # Invalidated, pruned or already written meanwhile
+                    self._remove_spill(path)
+                if spilled:
+                    entry.data = None
+                    self._prune_spill()
+
+    def _prune_spill(self):
+        """
+        Delete the oldest spill files beyond the disk budget (call with the lock held).
+        """
+        for key in list(self._spilled):
+            if self._spill_bytes <= self.spill_max_bytes:
+                break
+            entry = self._spilled[key]
+            if entry.spill_path is None:
+                continue
+            del self._spilled[key]
+            self._spill_bytes -= entry.spill_bytes
+            self._remove_spill(entry.spill_path)
+
+    def _spill_path(self, key):
+        # One file per write, so a late write never replaces a newer file for the same key
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}-{next(self._spill_seq)}.{self.spill_format}")
+
+    def _write_spill(self, key, data):
+        import pyarrow as pa
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = self._spill_path(key)
+        # RangeIndexes are kept as metadata, other indexes as columns
+        table = pa.Table.from_pandas(data)
+        tmp_path = f"{path}.tmp"
+        if self.spill_format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, tmp_path, compression="zstd")
+        else:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path, os.path.getsize(path)
+
+    def _read_spill(self, path):
+        import pyarrow as pa
+
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            return pq.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+        # Arrow buffers point into the mapped file; numeric columns without
+        # nulls convert to pandas without a copy
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=True)
+
+    def _remove_spill(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def usage(self):
+        """
+        Per-session usage: frames referenced, bytes of those in memory and
+        on disk, and how many of the frames are shared with other sessions.
+        """
+        with self._lock:
+            holders = {}
+            for keys, _ in self._sessions.values():
+                for key in keys:
+                    holders[key] = holders.get(key, 0) + 1
+            rows = []
+            for session_id, (keys, seen) in self._sessions.items():
+                memory = [self._memory[key].nbytes for key in keys if key in self._memory]
+                spilled = [self._spilled[key].spill_bytes for key in keys if key in self._spilled]
+                rows.append({
+                    "session": session_id,
+                    "frames": len(keys),
+                    "memory_mb": sum(memory) / 1024 ** 2,
+                    "spilled_mb": sum(spilled) / 1024 ** 2,
+                    "shared_frames": sum(1 for key in keys if holders[key] > 1),
+                    "idle_seconds": time.monotonic() - seen,
+                })
+        return pd.DataFrame(rows, columns=["session", "frames", "memory_mb", "spilled_mb", "shared_frames", "idle_seconds"])
+
+    def summary(self):
+        """
+        Store-wide totals and counters.
+        """
+        with self._lock:
+            return {
+                "frames_in_memory": len(self._memory),
+                "frames_spilled": len(self._spilled),
+                "memory_mb": self._memory_bytes / 1024 ** 2,
+                "budget_mb": self.max_bytes / 1024 ** 2,
+                "spilled_mb": self._spill_bytes / 1024 ** 2,
+                "sessions": len(self._sessions),
+                **self.stats,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Process-wide SessionFrameStore, created on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionFrameStore()
+        return _store
+
+
+def shared_file_data(file, session_id=None):
+    """
+    Load an uploaded file's DataFrame through the shared store.
+
+    `file` is an uploaded_files row (or a bare id); its `uploaded_at` acts as
+    the version, so a re-uploaded file is never served from a stale copy.
+    """
+    from supabase_integration import fetch_file_data
+
+    file_id = file["id"] if isinstance(file, dict) else file
+    version = file.get("uploaded_at") if isinstance(file, dict) else None
+    return get_session_store().get(("uploaded_files", file_id, version), lambda: fetch_file_data(file_id), session_id)
@@ -1,5 +1,7 @@
 import pandas as pd
-from supabase_integration import upload_bank_data
+from csv_parser import parse_bank_csv
+from instrumentation import timed
+from transaction_schema import compact_frame
 
 def validate_file(data, required_columns=None):
     """
@@ -17,35 +19,32 @@ def validate_file(data, required_columns=None):
     
     return data
 
+@timed()
 def validate_and_normalize(file_path):
     """
     Validate and normalize the uploaded file.
+
+    The file's delimiter, encoding, header row, bank column layout, date format
+    and decimal conventions are detected once from a sample, so columns are
+    renamed to `Date`/`Amount`/`Description` and parsed with explicit types.
     """
     try:
-        data = pd.read_csv(file_path)
+        data = parse_bank_csv(file_path)
     except Exception as e:
         raise ValueError(f"Error reading the CSV file: {e}")
 
-    # Normalize columns
-    column_mappings = {
-        "Date": "Date",
-        "Amount": "Amount",
-        "Description": "Description"
-    }
-    data.rename(columns=column_mappings, inplace=True)
-
     # Validate columns
     validate_file(data)
 
-    # Normalize date format
-    data["Date"] = pd.to_datetime(data["Date"], errors="coerce")
+    # Dates are parsed with the detected format; failures are left as NaT
     if data["Date"].isnull().any():
         raise ValueError("Some dates could not be converted. Please check the date format.")
 
     data.dropna(subset=["Date"], inplace=True)
 
-    return data
+    return compact_frame(data)
 
+@timed()
 def enrich_merchant_data(data):
     """
     Enrich merchant information using SerperDevTool.
@@ -83,6 +82,7 @@ def infer_merchant_from_description(description):
     else:
         return "Unknown Merchant"
 
+@timed()
 def detect_recurring_charges(data, historical_data=None):
     """
     Detect recurring charges by analyzing transaction intervals and comparing
@@ -93,18 +93,19 @@ def detect_recurring_charges(data, historical_data=None):
     if missing_columns:
         raise ValueError(f"The following required columns are missing from the data: {', '.join(missing_columns)}")
 
-    # Calculate intervals between transactions for each merchant
-    data["Interval"] = data.groupby("Merchant")["Date"].diff().dt.days
-    data["Is_Recurring"] = data["Interval"].apply(
-        lambda x: "Yes" if x and x <= 30 else "No"
-    )
+    # Calculate intervals between transactions for each merchant (its canonical
+    # key when available, so "NETFLIX.COM 0423" and "NETFLIX *STREAMING" are one series)
+    merchant = "Merchant Key" if "Merchant Key" in data.columns else "Merchant"
+    data["Interval"] = data.groupby(merchant, observed=True)["Date"].diff().dt.days
+    data["Is_Recurring"] = (data["Interval"] > 0) & (data["Interval"] <= 30)
 
     if historical_data is not None:
         # Compare with historical subscriptions to detect new recurring charges
         known_merchants = historical_data["Merchant"].unique()
         data["Is_New_Subscription"] = ~data["Merchant"].isin(known_merchants)
     else:
-        data["Is_New_Subscription"] = "Unknown"
+        # Unknown without history
+        data["Is_New_Subscription"] = pd.Series(pd.NA, index=data.index, dtype="boolean")
 
     return data
 
@@ -113,9 +114,10 @@ def detect_subscriptions(data):
     Detect subscriptions by analyzing recurring charges and categories.
     """
     data = detect_recurring_charges(data)
-    subscriptions = data[data["Is_Recurring"] == "Yes"]
+    subscriptions = data[data["Is_Recurring"]]
     return subscriptions
 
+@timed()
 def analyze_spending_trends(data):
     """
     Analyze spending trends over time.
@@ -131,6 +133,7 @@ def filter_others(data):
     others_data = data[data["Category"] == "Others"]
     return others_data
 
+@timed()
 def calculate_savings(data):
     """
     Calculate potential savings based on cancelled subscriptions.
@@ -158,11 +161,40 @@ def calculate_savings(data):
 
     return pd.DataFrame(savings)
 
+@timed()
+def estimate_subscription_costs(data):
+    """
+    Summarize recurring charges per merchant with an estimated yearly cost,
+    i.e. what cancelling each subscription would save.
+    """
+    recurring = data[data["Is_Recurring"]]
+    if recurring.empty:
+        return pd.DataFrame(columns=["Merchant", "Charges", "Average Amount", "Median Interval", "Estimated Yearly Cost"])
+    merchant = "Merchant Key" if "Merchant Key" in recurring.columns else "Merchant"
+    summary = recurring.groupby(merchant, observed=True).agg(
+        Charges=("Amount", "size"),
+        **{"Average Amount": ("Amount", "mean"), "Median Interval": ("Interval", "median")},
+    ).reset_index().rename(columns={merchant: "Merchant"})
+    interval = summary["Median Interval"].clip(lower=1)
+    summary["Estimated Yearly Cost"] = (summary["Average Amount"].abs() * 365 / interval).round(2)
+    return summary.sort_values("Estimated Yearly Cost", ascending=False).reset_index(drop=True)
+
 def process_uploaded_file(data, user):
     """
     Store uploaded files in Supabase.
     """
-    response = upload_bank_data(user.id, "uploaded_file.csv", data)
+    # Imported here so headless callers (batch_process.py) do not need Streamlit secrets
+    from supabase_integration import upload_bank_data
+    from renewals import get_renewal_index
+
+    organization_id = getattr(user, "organization_id", None)
+    response = upload_bank_data(user.id, "uploaded_file.csv", data, organization_id)
     if response.data is None:
         return None
+    # Only merchants with charges outside their indexed history are rewritten.
+    # The file is already stored, so a failed index update must not fail the upload
+    try:
+        get_renewal_index().update(user.id, data, organization_id)
+    except Exception as e:
+        print(f"Error updating renewals: {e}")
     return data
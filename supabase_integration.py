@@ -1,7 +1,13 @@
+import io
 import json
 import pandas as pd
 import streamlit as st
 from supabase import create_client
+from postgrest.exceptions import APIError
+from parquet_storage import build_store, make_key, write_frame, read_frame, filter_frame
+from pg_writer import build_writer
+from instrumentation import timed
+from transaction_schema import compact_frame
 
 # Load credentials from st.secrets
 supabase_url = st.secrets["supabase"]["url"]
@@ -14,6 +20,47 @@ supabase = create_client(supabase_url, supabase_anon_key)
 # Service role client for admin operations
 service_supabase = create_client(supabase_url, supabase_service_role_key)
 
+# Optional columnar storage for file payloads; None keeps the JSON-in-table path
+frame_store = build_store(st.secrets.get("storage", {}), service_supabase)
+
+# Optional direct Postgres writer for bulk writes; None keeps writes on PostgREST
+db_writer = build_writer(st.secrets.get("postgres", {}))
+
+# How long admin statistics are cached
+STATS_TTL_SECONDS = 60
+
+def _insert_row(table, row):
+    """
+    Insert one row through the direct writer when configured, otherwise PostgREST.
+    """
+    if db_writer is not None:
+        return db_writer.insert_returning(table, row)
+    return supabase.table(table).insert(row).execute()
+
+def _serialize_frame(user_id, kind, data):
+    """
+    Serialize a DataFrame for the `data` column: a Parquet reference when a
+    columnar store is configured, otherwise the legacy JSON records string.
+    """
+    if frame_store is None:
+        return data.to_json(orient="records")
+    key = write_frame(frame_store, make_key(user_id, kind), data)
+    return {"format": "parquet", "path": key, "rows": len(data)}
+
+def _deserialize_frame(payload, columns=None, filters=None):
+    """
+    Load a DataFrame from a stored `data` value written by `_serialize_frame`.
+    """
+    if isinstance(payload, dict) and payload.get("format") == "parquet":
+        if frame_store is None:
+            raise ValueError("Data is stored as Parquet but no storage backend is configured.")
+        return read_frame(frame_store, payload["path"], columns=columns, filters=filters)
+    # Legacy payloads are a JSON records string; rows written by the API's
+    # Postgres backend are stored as a JSON array
+    data = pd.read_json(io.StringIO(payload)) if isinstance(payload, str) else pd.DataFrame(payload)
+    return filter_frame(data, columns=columns, filters=filters)
+
+@timed()
 def fetch_stored_subscriptions(user_id):
     """
     Fetch stored validated subscriptions for a specific user.
@@ -24,20 +71,25 @@ def fetch_stored_subscriptions(user_id):
         return []
     return response.data if response.data else []
 
-def upload_bank_data(user_id, file_name, data):
+@timed()
+def upload_bank_data(user_id, file_name, data, organization_id=None):
     """
     Store uploaded bank data in Supabase.
     """
-    response = supabase.table("uploaded_files").insert({
+    row = {
         "user_id": user_id,
         "file_name": file_name,
-        "data": data.to_json(orient="records"),
+        "data": _serialize_frame(user_id, "uploads", data),
         "uploaded_at": pd.Timestamp.now().isoformat()
-    }).execute()
+    }
+    if organization_id is not None:
+        row["organization_id"] = organization_id
+    response = _insert_row("uploaded_files", row)
     if response.data is None:
         st.error(f"Error uploading bank data: {response}")
     return response
 
+@timed()
 def fetch_uploaded_files(user_id):
     """
     Fetch uploaded files for a specific user.
@@ -48,18 +100,40 @@ def fetch_uploaded_files(user_id):
         return []
     return response.data if response.data else []
 
-def fetch_file_data(file_id):
+@timed()
+def fetch_file_data(file_id, columns=None, filters=None, client=None):
     """
     Retrieve file data by ID.
+
+    `columns` and `filters` restrict what is read; with Parquet storage,
+    unused columns and non-matching row groups are skipped entirely.
     """
-    response = supabase.table("uploaded_files").select("data").eq("id", file_id).execute()
+    response = (client or supabase).table("uploaded_files").select("data").eq("id", file_id).execute()
     if response.data is None:
         st.error(f"Error fetching file data: {response}")
         return pd.DataFrame()
     if response.data:
-        return pd.read_json(response.data[0]["data"])
+        return compact_frame(_deserialize_frame(response.data[0]["data"], columns=columns, filters=filters))
     return pd.DataFrame()
 
+@timed()
+def fetch_organization_files(org_id):
+    """
+    List an organization's uploaded files with their storage references but
+    not their payloads (`path` is set for Parquet-stored files).
+    """
+    response = (
+        service_supabase.table("uploaded_files")
+        .select("id, user_id, file_name, uploaded_at, format:data->>format, path:data->>path")
+        .eq("organization_id", org_id)
+        .execute()
+    )
+    if response.data is None:
+        st.error(f"Error fetching organization files: {response}")
+        return []
+    return response.data
+
+@timed()
 def update_keywords(category, keyword):
     """
     Add a new keyword to Supabase.
@@ -72,6 +146,7 @@ def update_keywords(category, keyword):
         st.error(f"Error adding keyword: {response}")
     return response
 
+@timed()
 def fetch_keywords():
     """
     Fetch all keywords from Supabase.
@@ -82,6 +157,7 @@ def fetch_keywords():
         return []
     return response.data if response.data else []
 
+@timed()
 def fetch_thresholds():
     """
     Fetch all thresholds from Supabase.
@@ -92,21 +168,240 @@ def fetch_thresholds():
         return []
     return response.data if response.data else []
 
+@timed()
+def update_thresholds(thresholds, organization_id=None):
+    """
+    Store renewal thresholds ({pattern: days}) in one upsert per organization and pattern.
+    """
+    rows = [{"pattern": pattern, "days": int(days)} for pattern, days in thresholds.items()]
+    if organization_id is not None:
+        for row in rows:
+            row["organization_id"] = organization_id
+    response = supabase.table("thresholds").upsert(rows, on_conflict="organization_id,pattern").execute()
+    if response.data is None:
+        st.error(f"Error updating thresholds: {response}")
+    return response
+
+@timed()
+def fetch_config_versions(org_ids):
+    """
+    Fetch config version counters as {organization_id: version} (0 is the global scope).
+    """
+    response = supabase.table("config_versions").select("organization_id,version").in_("organization_id", list(org_ids)).execute()
+    if response.data is None:
+        st.error(f"Error fetching config versions: {response}")
+        return {}
+    return {row["organization_id"]: row["version"] for row in response.data}
+
+def _org_scope(query, org_id):
+    """
+    Restrict a query to global rows plus the organization's own.
+    """
+    if org_id is None:
+        return query.is_("organization_id", "null")
+    return query.or_(f"organization_id.is.null,organization_id.eq.{int(org_id)}")
+
+@timed()
+def fetch_org_config(org_id):
+    """
+    Fetch the threshold and keyword rows that apply to an organization.
+
+    Returns a (threshold rows, keyword rows) tuple.
+    """
+    thresholds = _org_scope(supabase.table("thresholds").select("organization_id,pattern,days"), org_id).execute()
+    keywords = _org_scope(supabase.table("keywords").select("organization_id,category,keyword"), org_id).order("id").execute()
+    if thresholds.data is None or keywords.data is None:
+        st.error("Error fetching configuration.")
+        return [], []
+    return thresholds.data, keywords.data
+
+@timed()
+def insert_keywords(rows, organization_id=None):
+    """
+    Add (category, keyword) pairs in one request.
+    """
+    records = [{"category": category, "keyword": keyword} for category, keyword in rows]
+    if organization_id is not None:
+        for record in records:
+            record["organization_id"] = organization_id
+    response = supabase.table("keywords").insert(records).execute()
+    if response.data is None:
+        st.error(f"Error adding keywords: {response}")
+    return response
+
+@timed()
+def delete_keywords(rows, organization_id=None):
+    """
+    Remove an organization's (category, keyword) pairs, one request per category.
+    """
+    by_category = {}
+    for category, keyword in rows:
+        by_category.setdefault(category, []).append(keyword)
+    response = None
+    for category, keywords in by_category.items():
+        query = supabase.table("keywords").delete().eq("category", category).in_("keyword", keywords)
+        query = query.is_("organization_id", "null") if organization_id is None else query.eq("organization_id", organization_id)
+        response = query.execute()
+        if response.data is None:
+            st.error(f"Error removing keywords: {response}")
+    return response
+
+@timed()
 def upload_enriched_data(user_id, file_name, data):
     """
     Store enriched merchant data in Supabase.
     """
-    response = supabase.table("enriched_data").insert({
+    response = _insert_row("enriched_data", {
         "user_id": user_id,
         "file_name": file_name,
-        "data": data.to_json(orient="records"),
+        "data": _serialize_frame(user_id, "enriched", data),
         "uploaded_at": pd.Timestamp.now().isoformat()
-    }).execute()
+    })
     if response.data is None:
         st.error(f"Error uploading enriched data: {response}")
     return response
 
-def fetch_enriched_data(user_id, file_name):
+@timed()
+def save_validated_subscriptions(user_id, data, organization_id=None):
+    """
+    Store validated subscriptions in bulk.
+
+    `data` needs `Merchant`, `Amount` and `Category` columns (`Description` is
+    optional). With a direct Postgres writer the rows are loaded with COPY in
+    one transaction; otherwise they are sent to the `save_validated_subscriptions`
+    database function, which inserts them in a single statement, so either all
+    rows are stored or none are.
+    """
+    rows = pd.DataFrame({
+        "user_id": user_id,
+        "merchant": data["Merchant"],
+        "description": data["Description"] if "Description" in data.columns else None,
+        "amount": data["Amount"],
+        "category": data["Category"],
+    })
+    if organization_id is not None:
+        rows["organization_id"] = organization_id
+
+    if db_writer is not None:
+        return db_writer.copy_frame("validated_subscriptions", rows)
+
+    records = rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+    try:
+        return supabase.rpc("save_validated_subscriptions", {"p_rows": records}).execute()
+    except APIError as e:
+        st.error(f"Error saving validated subscriptions: {e}")
+        return None
+
+@timed()
+def upsert_validated_subscriptions(user_id, rows, organization_id=None):
+    """
+    Insert or update one validated subscription per (user, merchant key) in a
+    single bulk upsert.
+
+    `rows` needs `merchant_key`, `merchant`, `description`, `amount` and
+    `category` columns; existing rows for the same key are overwritten.
+    """
+    rows = rows.assign(user_id=user_id)
+    if organization_id is not None:
+        rows["organization_id"] = organization_id
+
+    if db_writer is not None:
+        return db_writer.upsert_frame("validated_subscriptions", rows, ["user_id", "merchant_key"])
+
+    records = rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+    response = supabase.table("validated_subscriptions").upsert(records, on_conflict="user_id,merchant_key").execute()
+    if response.data is None:
+        st.error(f"Error saving feedback: {response}")
+    return response
+
+@timed()
+def fetch_renewal_series(user_id):
+    """
+    Fetch every charge series indexed for a user in upcoming_renewals.
+    """
+    response = supabase.table("upcoming_renewals").select("*").eq("user_id", user_id).execute()
+    if response.data is None:
+        st.error(f"Error fetching renewals: {response}")
+        return []
+    return response.data
+
+@timed()
+def fetch_merchant_keys(user_id):
+    """
+    Fetch the merchant keys already stored for a user (validated subscriptions,
+    feedback and renewal series), so new files are keyed consistently with them.
+    """
+    keys = set()
+    for table in ("validated_subscriptions", "upcoming_renewals"):
+        response = supabase.table(table).select("merchant_key").eq("user_id", user_id).execute()
+        if response.data is None:
+            st.error(f"Error fetching merchant keys: {response}")
+            continue
+        keys.update(row["merchant_key"] for row in response.data if row["merchant_key"])
+    return sorted(keys)
+
+@timed()
+def upsert_renewal_series(user_id, rows, organization_id=None):
+    """
+    Insert or update charge series, one per (user, merchant key), in a single bulk upsert.
+    """
+    rows = rows.assign(user_id=user_id, updated_at=pd.Timestamp.now(tz="UTC").isoformat())
+    if organization_id is not None:
+        rows["organization_id"] = organization_id
+
+    if db_writer is not None:
+        return db_writer.upsert_frame("upcoming_renewals", rows, ["user_id", "merchant_key"])
+
+    records = rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+    response = supabase.table("upcoming_renewals").upsert(records, on_conflict="user_id,merchant_key").execute()
+    if response.data is None:
+        st.error(f"Error saving renewals: {response}")
+    return response
+
+@timed()
+def fetch_upcoming_renewals(user_id, start, end):
+    """
+    Fetch a user's renewals expected between `start` and `end` (ISO dates, inclusive), soonest first.
+    """
+    response = (
+        supabase.table("upcoming_renewals").select("*").eq("user_id", user_id)
+        .gte("next_charge_date", start).lte("next_charge_date", end)
+        .order("next_charge_date").execute()
+    )
+    if response.data is None:
+        st.error(f"Error fetching upcoming renewals: {response}")
+        return []
+    return response.data
+
+@timed()
+def fetch_missed_renewals(user_id, as_of):
+    """
+    Fetch a user's renewals whose expected charge was overdue by `as_of` (ISO date).
+    """
+    response = (
+        supabase.table("upcoming_renewals").select("*").eq("user_id", user_id)
+        .lt("missed_after", as_of).order("missed_after").execute()
+    )
+    if response.data is None:
+        st.error(f"Error fetching missed renewals: {response}")
+        return []
+    return response.data
+
+@timed()
+def fetch_renewal_horizon(user_id):
+    """
+    Return the date of a user's latest indexed charge, or None.
+    """
+    response = (
+        supabase.table("upcoming_renewals").select("last_charge_date").eq("user_id", user_id)
+        .order("last_charge_date", desc=True).limit(1).execute()
+    )
+    if not response.data:
+        return None
+    return response.data[0]["last_charge_date"]
+
+@timed()
+def fetch_enriched_data(user_id, file_name, columns=None, filters=None):
     """
     Fetch enriched merchant data by file name.
     """
@@ -115,9 +410,10 @@ def fetch_enriched_data(user_id, file_name):
         st.error(f"Error fetching enriched data: {response}")
         return pd.DataFrame()
     if response.data:
-        return pd.read_json(response.data[0]["data"])
+        return compact_frame(_deserialize_frame(response.data[0]["data"], columns=columns, filters=filters))
     return pd.DataFrame()
 
+@timed()
 def log_action(action, user_id, organization_id=None, details=None):
     """
     Log an action in the app.
@@ -133,6 +429,7 @@ def log_action(action, user_id, organization_id=None, details=None):
         st.error(f"Error logging action: {response}")
     return response
 
+@timed()
 def fetch_logs():
     """
     Fetch all logs from the app_logs table.
@@ -143,6 +440,7 @@ def fetch_logs():
         return pd.DataFrame()
     return pd.DataFrame(response.data) if response.data else pd.DataFrame()
 
+@timed()
 def fetch_users():
     """
     Fetch all users from the auth.users table.
@@ -153,6 +451,67 @@ def fetch_users():
         return pd.DataFrame()
     return pd.DataFrame(response.data) if response.data else pd.DataFrame()
 
+@timed()
+def fetch_users_page(page=1, page_size=50):
+    """
+    Fetch one page of users and the total user count in a single request.
+
+    Returns a (DataFrame, total) tuple.
+    """
+    start = (page - 1) * page_size
+    response = (
+        service_supabase.table("auth.users")
+        .select("*", count="exact")
+        .order("created_at", desc=True)
+        .range(start, start + page_size - 1)
+        .execute()
+    )
+    if response.data is None:
+        st.error(f"Error fetching users: {response}")
+        return pd.DataFrame(), 0
+    return pd.DataFrame(response.data), response.count or 0
+
+@timed()
+def count_rows(table, client=None, **filters):
+    """
+    Count rows in a table server-side without transferring them.
+
+    Keyword arguments are equality filters, e.g. `count_rows("uploaded_files", user_id=...)`.
+    """
+    query = (client or service_supabase).table(table).select("*", count="exact", head=True)
+    for column, value in filters.items():
+        query = query.eq(column, value)
+    response = query.execute()
+    return response.count or 0
+
+@st.cache_data(ttl=STATS_TTL_SECONDS)
+@timed()
+def fetch_app_statistics(days=30):
+    """
+    Fetch admin statistics using count-only queries and server-side aggregates.
+
+    Returns a dict with total users, organizations, uploads and active
+    subscriptions, plus `users_per_org` and `uploads_per_day` DataFrames.
+    Results are cached for STATS_TTL_SECONDS.
+    """
+    active = (
+        service_supabase.table("validated_subscriptions")
+        .select("*", count="exact", head=True)
+        .neq("status", "cancelled")
+        .execute()
+    )
+    users_per_org = service_supabase.rpc("users_per_organization").execute()
+    uploads_per_day = service_supabase.rpc("uploads_per_day", {"p_days": days}).execute()
+    return {
+        "total_users": count_rows("auth.users"),
+        "total_organizations": count_rows("organizations"),
+        "total_uploads": count_rows("uploaded_files"),
+        "active_subscriptions": active.count or 0,
+        "users_per_org": pd.DataFrame(users_per_org.data or []),
+        "uploads_per_day": pd.DataFrame(uploads_per_day.data or []),
+    }
+
+@timed()
 def update_user(user_id, updates):
     """
     Update user information securely using the service role key.
@@ -162,6 +521,7 @@ def update_user(user_id, updates):
         st.error(f"Error updating user: {response}")
     return response
 
+@timed()
 def update_organization(org_id, updates):
     """
     Update organization information.
@@ -171,6 +531,7 @@ def update_organization(org_id, updates):
         st.error(f"Error updating organization: {response}")
     return response
 
+@timed()
 def fetch_organizations():
     """
     Fetch all organizations from the public.organizations table.
@@ -181,6 +542,7 @@ def fetch_organizations():
         return pd.DataFrame()
     return pd.DataFrame(response.data) if response.data else pd.DataFrame()
 
+@timed()
 def fetch_organization_data(org_id, table_name):
     """
     Fetch data for a specific organization from the specified table.
@@ -0,0 +1,24 @@
+import io
+import pandas as pd
+from categorizer import Categorizer, normalize_merchant
+from subscriptions import validate_and_normalize
+from transaction_schema import compact_frame
+
+
+def statement_with_blank_description():
+    rows = "".join(f"2024-01-{day:02d},Netflix,15.99\n" for day in range(1, 20))
+    csv = "Date,Description,Amount\n" + rows + "2024-01-25,,3.00\n"
+    return validate_and_normalize(io.BytesIO(csv.encode("utf-8")))
+
+
+def test_blank_description_on_categorical_column():
+    data = statement_with_blank_description()
+    assert isinstance(data["Description"].dtype, pd.CategoricalDtype)
+    result, _ = Categorizer(keywords={"Streaming": ["netflix"]}).categorize(data)
+    assert result["Category"].iloc[0] == "Streaming"
+    assert result["Category"].iloc[-1] == "Others"
+
+
+def test_normalize_merchant_fills_missing_categories():
+    values = compact_frame(pd.DataFrame({"Merchant": ["Netflix"] * 4 + [None]}))["Merchant"]
+    assert normalize_merchant(values).tolist() == ["netflix"] * 4 + [""]
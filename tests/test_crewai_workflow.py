@@ -0,0 +1,38 @@
+import json
+import pandas as pd
+import pytest
+
+pytest.importorskip("crewai")
+import crewai_workflow
+from categorizer import Categorizer
+from crewai_workflow import run_crewai_workflow
+from result_cache import ResultCache
+
+
+class StubCrew:
+    """
+    Answers every description with a fixed merchant and category.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def kickoff(self, inputs):
+        self.calls += 1
+        return json.dumps([{"description": description, "merchant": "Acme Cloud", "category": "Software"}
+                           for description in inputs["descriptions"].split("\n")])
+
+
+def test_agent_step_on_compacted_frame(monkeypatch, tmp_path):
+    monkeypatch.setattr(crewai_workflow, "result_cache", ResultCache(root=str(tmp_path)))
+    data = pd.DataFrame({
+        "Date": [f"2024-{month:02d}-03" for month in range(1, 13)],
+        "Description": ["ACME CLOUD STORAGE 42"] * 12,
+        "Amount": [4.99] * 12,
+    })
+    crew = StubCrew()
+    result = run_crewai_workflow(data, categorizer=Categorizer(keywords={}), crew=crew)
+    assert isinstance(result["Description"].dtype, pd.CategoricalDtype)
+    assert crew.calls == 1
+    assert (result["Merchant"] == "Acme Cloud").all()
+    assert (result["Category"] == "Software").all()
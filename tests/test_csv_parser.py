@@ -0,0 +1,50 @@
+import io
+import pytest
+import pandas as pd
+from csv_parser import parse_bank_csv, parse_dates, sniff_csv
+
+
+def parse_amounts(lines, delimiter=","):
+    text = "\n".join([delimiter.join(["Date", "Description", "Amount"])] + lines) + "\n"
+    return parse_bank_csv(io.BytesIO(text.encode("utf-8")))["Amount"].tolist()
+
+
+def test_thousands_without_cents():
+    assert parse_amounts(['2024-01-01,Rent,"1,000"', '2024-02-01,Rent,"2,000"']) == [1000, 2000]
+
+
+def test_thousands_with_cents():
+    assert parse_amounts(['2024-01-01,Rent,"1,234.50"', '2024-02-01,Rent,"1,000"']) == [1234.5, 1000]
+
+
+def test_comma_decimal():
+    assert parse_amounts(["2024-01-01;Netflix;15,99", "2024-02-01;Rent;1.000,00"], delimiter=";") == [15.99, 1000]
+
+
+def test_comma_decimal_with_whole_amounts():
+    assert parse_amounts(["2024-01-01;Netflix;15,99", "2024-02-01;Rent;800"], delimiter=";") == [15.99, 800]
+
+
+@pytest.mark.parametrize("amount, decimal, thousands", [
+    ("1,000", ".", ","),
+    ("1,234.50", ".", ","),
+    ("15,99", ",", "."),
+    ("9.99", ".", None),
+])
+def test_sniffed_separators(amount, decimal, thousands):
+    text = f'Date,Description,Amount\n2024-01-01,Shop,"{amount}"\n'
+    csv_format = sniff_csv(io.BytesIO(text.encode("utf-8")))
+    assert (csv_format["decimal"], csv_format["thousands"]) == (decimal, thousands)
+
+
+def test_all_missing_dates():
+    text = "Date,Description,Amount\n,Shop,1.00\n,Shop,2.00\n"
+    data = parse_bank_csv(io.BytesIO(text.encode("utf-8")))
+    assert data["Date"].isna().all()
+
+
+def test_parse_dates_keeps_missing_values_missing():
+    values = pd.Series(["2024-01-02", None, "2024-01-02"], dtype="string")
+    parsed = parse_dates(values, "%Y-%m-%d")
+    assert parsed.isna().tolist() == [False, True, False]
+    assert parsed.iloc[0] == pd.Timestamp("2024-01-02")
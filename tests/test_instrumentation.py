@@ -0,0 +1,20 @@
+import pytest
+from streamlit.runtime.scriptrunner_utils.exceptions import RerunException
+import instrumentation
+
+
+def errors(name):
+    rows = instrumentation.summary().set_index("operation")
+    return rows.loc[name, "errors"]
+
+
+def test_span_counts_failures_but_not_reruns():
+    instrumentation.reset()
+    with pytest.raises(ValueError):
+        with instrumentation.span("test:failure"):
+            raise ValueError("boom")
+    with pytest.raises(RerunException):
+        with instrumentation.span("test:rerun"):
+            raise RerunException(None)
+    assert errors("test:failure") == 1
+    assert errors("test:rerun") == 0
@@ -0,0 +1,19 @@
+from merchant_normalization import clean_descriptions, merchant_keys
+
+
+def test_leading_no_is_part_of_the_name():
+    cleaned = clean_descriptions(["NO FRILLS #12", "POS NO FRILLS 0423", "INVOICE NO 4411 ACME"])
+    assert cleaned.tolist() == ["NO FRILLS", "NO FRILLS", "INVOICE ACME"]
+
+
+def test_noise_only_descriptions_keep_a_key():
+    keys = merchant_keys(["#9912", "12345678", ""])
+    assert keys.tolist() == ["#9912", "12345678", ""]
+
+
+def test_new_keys_join_stored_keys():
+    assert merchant_keys(["NETFLIX *STREAMING"]).tolist() == ["NETFLIX STREAMING"]
+    keys = merchant_keys(["NETFLIX *STREAMING"], known_keys=["NETFLIX"])
+    assert keys.tolist() == ["NETFLIX"]
+    keys = merchant_keys(["NETFLIX.COM", "NETFLIX *STREAMING"], known_keys=["NETFLIX STREAMING"])
+    assert keys.tolist() == ["NETFLIX STREAMING", "NETFLIX STREAMING"]
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+from org_analytics import OrgAnalytics
+
+
+class FrameSource:
+    """
+    Files held in memory as DataFrames, keyed by file ID.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def local_path(self, key):
+        return None
+
+    def load_frame(self, file):
+        return self.frames[file["id"]]
+
+
+def charges(descriptions, merchants, **columns):
+    days = pd.date_range("2024-01-01", periods=len(descriptions), freq="30D")
+    return pd.DataFrame({"Date": days, "Amount": -15.99, "Description": descriptions, "Merchant": merchants, **columns})
+
+
+def test_recurring_summary_keys_files_with_and_without_merchant_keys_alike(tmp_path):
+    keyed = charges(["NETFLIX.COM 1001", "NETFLIX.COM 1002", "NETFLIX.COM 1003"], "Netflix",
+                    **{"Merchant Key": "NETFLIX"})
+    unkeyed = charges(["NETFLIX.COM 2001", "NETFLIX.COM 2002", "NETFLIX.COM 2003"], "NETFLIX")
+    blank = charges(["", "", ""], ["Spotify", "Spotify", "Spotify"], **{"Merchant Key": ""})
+    analytics = OrgAnalytics(FrameSource({1: keyed, 2: unkeyed, 3: blank}), cache_dir=str(tmp_path))
+    files = [{"id": 1, "user_id": "a"}, {"id": 2, "user_id": "b"}, {"id": 3, "user_id": "c"}]
+
+    summary = analytics.recurring_summary(files).set_index("Merchant")
+    assert sorted(summary.index) == ["NETFLIX COM", "SPOTIFY"]
+    assert summary.loc["NETFLIX COM", "Users"] == 2
+    assert summary.loc["NETFLIX COM", "Charges"] == 4
@@ -0,0 +1,35 @@
+import pandas as pd
+from renewals import merge_series, schedule
+
+THRESHOLDS = {"Daily": 1, "Weekly": 7, "Monthly": 30, "Yearly": 365}
+
+
+def scheduled_pattern(intervals):
+    dates = [pd.Timestamp("2024-01-01")]
+    for interval in intervals:
+        dates.append(dates[-1] + pd.Timedelta(days=interval))
+    series = merge_series(None, "Merchant", dates, 9.99)
+    return schedule(series, THRESHOLDS)["pattern"]
+
+
+def test_regular_series_are_scheduled():
+    assert scheduled_pattern([30, 31, 30, 29, 31]) == "Monthly"
+    assert scheduled_pattern([7] * 8) == "Weekly"
+    # One skipped month does not break a monthly series
+    assert scheduled_pattern([30, 30, 60, 30]) == "Monthly"
+
+
+def test_irregular_series_are_not_scheduled():
+    # Coffee on two consecutive days, then half a year later
+    assert scheduled_pattern([1, 1, 178]) is None
+    # Groceries roughly once a week
+    assert scheduled_pattern([3, 7, 5, 10, 7, 4, 9]) is None
+
+
+def test_merged_series_keep_counting_regular_intervals():
+    dates = [pd.Timestamp("2024-01-01") + pd.Timedelta(days=30 * month) for month in range(4)]
+    stored = schedule(merge_series(None, "Netflix", dates, 15.99), THRESHOLDS)
+    later = [dates[-1] + pd.Timedelta(days=30), dates[-1] + pd.Timedelta(days=60)]
+    series = merge_series(stored, "Netflix", later, 15.99)
+    assert (series["regular_intervals"], series["interval_count"]) == (5, 5)
+    assert schedule(series, THRESHOLDS)["pattern"] == "Monthly"
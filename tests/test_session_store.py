@@ -0,0 +1,68 @@
+import os
+import threading
+import pandas as pd
+from session_store import SessionFrameStore
+
+
+def frame(value, rows=1000):
+    return pd.DataFrame({"value": [float(value)] * rows})
+
+
+def spilled_bytes(store):
+    return sum(entry.spill_bytes for entry in store._spilled.values())
+
+
+class LockCheckingStore(SessionFrameStore):
+    """
+    Records whether other threads could take the lock while a spill file was written.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.blocked_writes = 0
+
+    def _write_spill(self, key, data):
+        probe = threading.Thread(target=self._probe)
+        probe.start()
+        probe.join()
+        return super()._write_spill(key, data)
+
+    def _probe(self):
+        if self._lock.acquire(timeout=1):
+            self._lock.release()
+        else:
+            self.blocked_writes += 1
+
+
+def test_spill_accounting_and_unlocked_writes(tmp_path):
+    one = frame(0).memory_usage(index=True, deep=True).sum()
+    store = LockCheckingStore(max_bytes=one * 2, spill_root=str(tmp_path))
+    for key in range(5):
+        store.get(key, lambda key=key: frame(key), "s")
+    assert store.stats["spills"] == 3
+    assert store.blocked_writes == 0
+    assert store._spill_bytes == spilled_bytes(store)
+
+    # Reloaded frames keep their file but no longer count against the disk budget
+    assert store.get(0, lambda: frame(99), "s")["value"].iloc[0] == 0
+    assert store.stats["reloads"] == 1
+    assert store._spill_bytes == spilled_bytes(store)
+
+    # Re-evicting a reloaded frame reuses its file
+    for key in range(5, 8):
+        store.get(key, lambda key=key: frame(key), "s")
+    assert store._spill_bytes == spilled_bytes(store)
+    files = os.listdir(store.spill_dir)
+    assert len(files) == len(store._spilled) + sum(entry.spill_path is not None for entry in store._memory.values())
+
+    store.invalidate(0)
+    assert store._spill_bytes == spilled_bytes(store)
+
+
+def test_spill_budget_prunes_only_spilled_frames(tmp_path):
+    one = frame(0).memory_usage(index=True, deep=True).sum()
+    store = SessionFrameStore(max_bytes=one, spill_root=str(tmp_path), spill_max_bytes=1)
+    for key in range(4):
+        store.get(key, lambda key=key: frame(key), "s")
+    assert store._spill_bytes == spilled_bytes(store) == 0
+    assert store.get(3, lambda: frame(99), "s")["value"].iloc[0] == 3
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Yes/No style columns stored as booleans (nullable where "unknown" is meaningful)
+FLAG_COLUMNS = ["Is_Recurring", "Is_New_Subscription"]
+
+DATE_COLUMNS = ["Date"]
+
+AMOUNT_COLUMNS = ["Amount"]
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORICAL_MAX_RATIO = 0.5
+
+_FLAG_VALUES = {
+    "yes": True, "true": True, "1": True, "y": True,
+    "no": False, "false": False, "0": False, "n": False,
+}
+
+
+def _string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return pd.StringDtype()
+
+
+def to_cents(amounts):
+    """
+    Convert decimal amounts to integer cents (nullable Int64, rounded half away from zero).
+    """
+    values = pd.to_numeric(pd.Series(amounts), errors="coerce")
+    cents = np.sign(values) * np.floor(values.abs() * 100 + 0.5)
+    return cents.astype("Int64")
+
+
+def from_cents(cents):
+    """
+    Convert integer cents back to decimal amounts (float64).
+    """
+    return pd.Series(cents).astype("Float64").astype("float64") / 100
+
+
+def amount_cents(data, column="Amount"):
+    """
+    Exact integer-cent view of an amount column, for grouping and equality tests
+    that must not depend on float representation.
+    """
+    return to_cents(data[column]).set_axis(data.index)
+
+
+def to_flag(values):
+    """
+    Convert Yes/No, true/false and 1/0 values to booleans; anything else
+    (e.g. "Unknown") becomes <NA>.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype("boolean")
+    return values.astype(str).str.strip().str.lower().map(_FLAG_VALUES).astype("boolean")
+
+
+def compact_text(values, max_ratio=CATEGORICAL_MAX_RATIO):
+    """
+    Store text as a categorical when values repeat, otherwise as Arrow-backed strings.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    if len(values) and values.nunique(dropna=True) <= max_ratio * len(values):
+        return values.astype("category")
+    return values.astype(_string_dtype())
+
+
+def compact_frame(data, max_ratio=CATEGORICAL_MAX_RATIO):
+    """
+    Convert a transactions DataFrame to the canonical compact schema.
+
+    - Date: datetime64
+    - Amount: float64 rounded to whole cents (see `amount_cents` for the exact integer view)
+    - Description, Merchant, Category, ...: categorical or Arrow string
+    - Is_Recurring / Is_New_Subscription: bool, or nullable boolean when some values are unknown
+    Other text columns follow the same categorical/string rule. Returns a new DataFrame.
+    """
+    data = data.copy()
+    for col in DATE_COLUMNS:
+        if col in data.columns and not pd.api.types.is_datetime64_any_dtype(data[col]):
+            data[col] = pd.to_datetime(data[col], errors="coerce")
+    for col in AMOUNT_COLUMNS:
+        if col in data.columns:
+            data[col] = from_cents(to_cents(data[col])).set_axis(data.index)
+    for col in FLAG_COLUMNS:
+        if col in data.columns:
+            flags = to_flag(data[col]).set_axis(data.index)
+            data[col] = flags if flags.isna().any() else flags.astype(bool)
+    for col in data.columns:
+        if col in DATE_COLUMNS or col in AMOUNT_COLUMNS or col in FLAG_COLUMNS:
+            continue
+        if pd.api.types.infer_dtype(data[col], skipna=True) in ("string", "empty", "categorical"):
+            data[col] = compact_text(data[col], max_ratio)
+    return data
+
+
+def writable(data, columns):
+    """
+    Turn categorical columns back into plain strings before values outside
+    their categories are assigned into them.
+    """
+    for col in columns:
+        if col in data.columns and isinstance(data[col].dtype, pd.CategoricalDtype):
+            data[col] = data[col].astype(_string_dtype())
+    return data
+
+
+def text_values(values):
+    """
+    Plain str values with missing entries as "". Use before string operations
+    on columns that may be categorical, whose fillna only accepts existing categories.
+    """
+    return values.astype(object).fillna("").astype(str)
+
+
+def memory_mb(data):
+    """
+    Deep memory usage of a DataFrame in megabytes.
+    """
+    return data.memory_usage(index=True, deep=True).sum() / 1024 ** 2
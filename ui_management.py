@@ -3,8 +3,18 @@ import pandas as pd  # Import pandas
 # from mitosheet import sheet  # Comment out the Mito component import
 from subscriptions import process_uploaded_file, validate_and_normalize, detect_recurring_charges, enrich_merchant_data
 from supabase_integration import fetch_uploaded_files, fetch_file_data, fetch_stored_subscriptions, upload_enriched_data
-from supabase_integration import fetch_users, fetch_logs, fetch_organizations, update_user, update_organization
+from supabase_integration import fetch_users_page, fetch_logs, fetch_organizations, update_user, update_organization
+from supabase_integration import fetch_app_statistics
 from visual_analysis import visualize_feature_importance
+from ml_model import train_model
+from csv_parser import parse_bank_csv
+import instrumentation
+import profiling
+import explanations
+import model_store
+from session_store import get_session_store, shared_file_data
+from org_analytics import get_org_analytics
+from dashboard import DATE_RANGES
 
 def render_navigation():
     """
@@ -81,7 +91,7 @@ def render_upload_page(user):
         st.write("Processing file...")
         try:
             # Read the content of the uploaded file into a DataFrame
-            data = pd.read_csv(uploaded_file)
+            data = parse_bank_csv(uploaded_file)
             # Display a preview of the data
             st.write("Data Preview:")
             st.dataframe(data.head())
@@ -132,12 +142,66 @@ def render_upload_with_mitosheet(user):
         except Exception as e:
             st.error(f"Error processing file: {e}")
 
+@st.cache_data(ttl=300, max_entries=64, show_spinner="Analyzing organization data...")
+def load_organization_analytics(files, start, end):
+    """
+    Organization-wide summary, recurring charges and monthly spending for a set
+    of files; the file list (IDs and upload times) is part of the cache key.
+    """
+    analytics = get_org_analytics()
+    return {
+        "summary": analytics.scope_summary(files, start, end),
+        "recurring": analytics.recurring_summary(files, start, end),
+        "trends": analytics.spending_trends(files, start, end),
+    }
+
+def render_organization_analytics(user):
+    """
+    Render recurring charges, potential savings and spending trends across
+    every file uploaded in the user's organization.
+    """
+    if user.organization_id is None:
+        st.warning("You are not a member of an organization.")
+        return
+    files = get_org_analytics().files(user.organization_id)
+    if not files:
+        st.warning("No uploaded files found for your organization.")
+        return
+
+    range_label = st.selectbox("Date range", list(DATE_RANGES), index=len(DATE_RANGES) - 1)
+    end = pd.Timestamp.now().normalize().date()
+    days = DATE_RANGES[range_label]
+    start = (pd.Timestamp(end) - pd.Timedelta(days=days)).date() if days else None
+    results = load_organization_analytics(files, start, end)
+
+    summary, recurring = results["summary"], results["recurring"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Files", len(files))
+    col2.metric("Users", summary["users"])
+    col3.metric("Transactions", f"{summary['transactions']:,}")
+    col4.metric("Potential Yearly Savings", f"{recurring['Estimated Yearly Cost'].sum():,.2f}")
+
+    st.subheader("Recurring Charges")
+    if recurring.empty:
+        st.info("No recurring charges in this date range.")
+    else:
+        st.dataframe(recurring, use_container_width=True)
+
+    st.subheader("Spending Trends")
+    if not results["trends"].empty:
+        st.line_chart(results["trends"].set_index("Month")["Amount"])
+
 def render_recurring_charge_detection(user):
     """
     Render recurring charge detection results for uploaded data.
     """
     st.title("Recurring Charge Detection")
 
+    scope = st.radio("Scope", ["Single file", "Whole organization"], horizontal=True)
+    if scope == "Whole organization":
+        render_organization_analytics(user)
+        return
+
     files = fetch_uploaded_files(user.id)
     if not files:
         st.warning("No uploaded files found.")
@@ -146,7 +210,7 @@ def render_recurring_charge_detection(user):
     st.write("Uploaded Files:")
     file_id = st.selectbox("Select a file to analyze", [file["id"] for file in files])
     if file_id:
-        file_data = fetch_file_data(file_id)
+        file_data = shared_file_data(next(file for file in files if file["id"] == file_id))
 
         # Enrich merchant data if the 'Merchant' column is missing
         if "Merchant" not in file_data.columns:
@@ -185,7 +249,7 @@ def render_superuser_dashboard():
 
     section = st.sidebar.radio(
         "Superuser Actions",
-        ["View Logs", "Manage Users", "Manage Organizations", "App Statistics"]
+        ["View Logs", "Manage Users", "Manage Organizations", "App Statistics", "Performance", "Profiling"]
     )
 
     if section == "View Logs":
@@ -195,8 +259,13 @@ def render_superuser_dashboard():
 
     elif section == "Manage Users":
         st.subheader("Manage Users")
-        users = fetch_users()
+        page_size = 50
+        page = st.number_input("Page", min_value=1, step=1)
+        users, total_users = fetch_users_page(page, page_size)
+        st.caption(f"{total_users} users, page {page} of {max(1, (total_users - 1) // page_size + 1)}")
         st.dataframe(users)
+        if users.empty:
+            return
 
         user_id = st.selectbox("Select User to Update", users["id"])
         is_active = st.selectbox("Active Status", [True, False])
@@ -217,11 +286,118 @@ def render_superuser_dashboard():
 
     elif section == "App Statistics":
         st.subheader("App Statistics")
-        users = fetch_users()
-        organizations = fetch_organizations()
+        stats = fetch_app_statistics()
+
+        st.metric("Total Users", stats["total_users"])
+        st.metric("Total Organizations", stats["total_organizations"])
+        st.metric("Total Uploads", stats["total_uploads"])
+        st.metric("Active Subscriptions", stats["active_subscriptions"])
+
+        if not stats["users_per_org"].empty:
+            st.write("Users per Organization")
+            st.bar_chart(stats["users_per_org"].set_index("organization_name")["users"])
+        if not stats["uploads_per_day"].empty:
+            st.write("Uploads per Day (last 30 days)")
+            st.bar_chart(stats["uploads_per_day"].set_index("day")["uploads"])
+
+    elif section == "Performance":
+        render_performance_panel()
+        render_session_data_panel()
+
+    elif section == "Profiling":
+        render_profiling_panel()
+
+def render_performance_panel():
+    """
+    Render latency percentiles, row counts and bytes per instrumented operation.
+    """
+    st.subheader("Performance")
+    if not instrumentation.ENABLED:
+        st.info("Instrumentation is disabled (METRICS_ENABLED=false).")
+        return
 
-        st.metric("Total Users", len(users))
-        st.metric("Total Organizations", len(organizations))
+    summary = instrumentation.summary()
+    if summary.empty:
+        st.warning("No measurements recorded yet in this process.")
+        return
+
+    pages = summary[summary["operation"].str.startswith("page:")]
+    if not pages.empty:
+        st.write("Page renders")
+        st.dataframe(pages.set_index("operation"))
+    st.write("Operations")
+    st.dataframe(summary[~summary["operation"].str.startswith("page:")].set_index("operation"))
+    st.bar_chart(summary.set_index("operation")[["p50_ms", "p95_ms", "p99_ms"]])
+
+    col1, col2 = st.columns(2)
+    if col1.button("Write Metrics File"):
+        path = instrumentation.write_metrics_file()
+        st.success(f"Metrics written to {path}")
+    if col2.button("Reset Metrics"):
+        instrumentation.reset()
+        st.success("Metrics reset.")
+    with st.expander("Prometheus metrics"):
+        st.code(instrumentation.prometheus_text(), language="text")
+
+def render_session_data_panel():
+    """
+    Show the shared session DataFrame store: memory budget, spills and per-session usage.
+    """
+    st.subheader("Shared Session Data")
+    store = get_session_store()
+    summary = store.summary()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("In memory (MB)", f"{summary['memory_mb']:.1f} / {summary['budget_mb']:.0f}")
+    col2.metric("Spilled (MB)", f"{summary['spilled_mb']:.1f}")
+    col3.metric("Sessions", summary["sessions"])
+    st.caption(f"{summary['hits']} hits, {summary['loads']} loads, {summary['spills']} spills, {summary['reloads']} reloads from disk")
+    st.dataframe(store.usage().set_index("session"))
+
+def render_profiling_panel():
+    """
+    Let the superuser profile upcoming page runs and inspect the stored reports.
+    """
+    st.subheader("Profiling")
+
+    status = profiling.profiling_status()
+    if status["remaining"] > 0:
+        pages = ", ".join(sorted(status["pages"])) if status["pages"] else "any page"
+        st.info(f"Profiling the next {status['remaining']} run(s) of {pages} ({status['mode']}).")
+        if st.button("Cancel Profiling"):
+            profiling.disable_profiling()
+            st.success("Profiling cancelled.")
+    else:
+        pages = st.multiselect("Pages to profile (empty for any)", [
+            "Dashboard", "Upload Files", "Recurring Charge Detection", "Subscription Validation",
+            "Cancelled Subscriptions", "Train Model", "Feedback", "Run CrewAI Logic",
+        ])
+        runs = st.number_input("Number of runs", min_value=1, max_value=20, value=1)
+        mode = st.selectbox("Profiler", ["cprofile", "sampling"])
+        if st.button("Start Profiling"):
+            profiling.enable_profiling(pages, runs, mode)
+            st.success("Profiling enabled for the next matching page runs.")
+
+    reports = profiling.list_reports()
+    if reports.empty:
+        st.warning("No profiles recorded yet.")
+        return
+    st.dataframe(reports.drop(columns=["path"]))
+
+    report_id = st.selectbox("Select a profile", reports["id"])
+    report = profiling.get_report(report_id)
+    if report is None:
+        return
+    st.metric("Duration (s)", f"{report['seconds']:.3f}")
+    st.metric("Peak traced memory (MB)", f"{report['peak_memory_mb']:.1f}")
+    st.write("Hot spots")
+    if report["mode"] == "sampling":
+        st.code(report["hot_spots"]["profile"].iloc[0], language="text")
+    else:
+        st.dataframe(report["hot_spots"])
+    st.write("Top allocations")
+    st.dataframe(report["allocations"])
+    with open(report["path"], "rb") as f:
+        st.download_button("Download Profile", f.read(), file_name=report["path"].split("/")[-1])
 
 def render_enriched_merchant_data(data):
     """
@@ -229,3 +405,95 @@ def render_enriched_merchant_data(data):
     """
     st.title("Enriched Merchant Data")
     st.dataframe(data)
+
+def render_train_model(org_id):
+    """
+    Train a new model version and show which words drive its predictions.
+    """
+    st.title("Train Model")
+
+    versions = model_store.list_versions(org_id)
+    if versions:
+        st.write("Model Versions")
+        st.dataframe(pd.DataFrame(versions).reindex(columns=["version", "created_at", "training_rows", "training_seconds"]))
+
+    if st.button("Train New Model"):
+        try:
+            with st.spinner("Training model..."):
+                train_model(org_id)
+            st.success("Model trained.")
+            # Explanations for the new version are computed in the background
+            explanations.explain_in_background(org_id)
+            versions = model_store.list_versions(org_id)
+        except ValueError as e:
+            st.error(f"Error training model: {e}")
+
+    if not versions:
+        st.warning("No model trained yet.")
+        return
+
+    st.subheader("Model Explanations")
+    status = explanations.explanation_status(org_id)
+    if status == "ready":
+        payload = explanations.get_explanations(org_id)
+        st.caption(f"Model version {payload['version']}: SHAP values over a stratified sample of {payload['sample_rows']} rows.")
+        category = st.selectbox("Category", ["All categories"] + sorted(payload["per_class"]))
+        importance = explanations.importance_frame(payload, None if category == "All categories" else category)
+        visualize_feature_importance(importance["feature"], importance["importance"])
+    elif status == "running":
+        st.info("Explanations are being computed for the current model version.")
+        st.button("Refresh")
+    else:
+        if status.startswith("failed"):
+            st.error(f"Error computing explanations: {status[len('failed: '):]}")
+        if st.button("Compute Explanations"):
+            explanations.explain_in_background(org_id)
+            st.info("Explanations are being computed; refresh in a moment.")
+
+    text = st.text_input("Explain a transaction (merchant and description)")
+    if text:
+        try:
+            st.dataframe(explanations.explain_transactions(org_id, [text]))
+        except ValueError as e:
+            st.error(f"Error explaining transaction: {e}")
+
+def render_feedback(user):
+    """
+    Review and correct categories for an uploaded file, one row per merchant.
+    """
+    from categorizer import build_categorizer
+    from config_store import get_config_store
+    from feedback import gather_feedback, feedback_groups
+    from merchant_normalization import add_merchant_key
+    from subscriptions import infer_merchant_from_description
+    from supabase_integration import fetch_merchant_keys
+
+    files = fetch_uploaded_files(user.id)
+    if not files:
+        st.warning("No uploaded files found.")
+        return
+
+    file_id = st.selectbox("Select a file to review", [file["id"] for file in files])
+    if not file_id:
+        return
+    file = next(file for file in files if file["id"] == file_id)
+
+    # Grid edits rerun the page; categorize the file again only when the file,
+    # the organization's model or its config changed
+    org_id = user.organization_id
+    key = (file_id, file.get("uploaded_at"), model_store.current_version(org_id), get_config_store().get(org_id).version)
+    cached = st.session_state.get("feedback_categorized")
+    if cached is None or cached[0] != key:
+        file_data = shared_file_data(file)
+        if "Merchant" not in file_data.columns:
+            file_data["Merchant"] = file_data["Description"].astype(str).map(infer_merchant_from_description)
+        file_data = add_merchant_key(file_data, known_keys=fetch_merchant_keys(user.id))
+        categorized, _ = build_categorizer(org_id).categorize(file_data)
+        cached = st.session_state["feedback_categorized"] = (key, categorized, feedback_groups(categorized))
+    _, categorized, groups = cached
+
+    updated = gather_feedback(categorized, user.id, org_id, groups)
+    if updated is not None:
+        # Submitted feedback changes the merchant lookup
+        st.session_state.pop("feedback_categorized", None)
+        st.dataframe(updated)
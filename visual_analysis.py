@@ -1,31 +1,204 @@
-import matplotlib.pyplot as plt
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
 import seaborn as sns
 import streamlit as st
 import pandas as pd
+from matplotlib.figure import Figure
+
+# Rendered images kept in memory, shared by all sessions of a process
+FIGURE_CACHE_BYTES = int(os.environ.get("FIGURE_CACHE_BYTES", 32 * 1024 ** 2))
+
+# Above this many rows, count/scatter plots are drawn as pre-aggregated Vega-Lite charts
+VEGA_LITE_MIN_ROWS = int(os.environ.get("VEGA_LITE_MIN_ROWS", 5000))
+
+# Grid cells per axis when a large scatter plot is binned
+SCATTER_BINS = 60
+
+FIGSIZE = (10, 6)
+DPI = 100
+
+
+def data_fingerprint(*parts):
+    """
+    Stable sha256 digest of DataFrames, Series, arrays and plain values.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series, pd.Index)):
+            digest.update(repr(getattr(part, "columns", getattr(part, "name", None))).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            digest.update(repr((part.dtype, part.shape)).encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, (list, tuple)) and part and isinstance(part[0], (pd.Series, np.ndarray)):
+            digest.update(data_fingerprint(*part).encode())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """
+    In-memory LRU cache of rendered figure bytes, bounded by total size.
+    """
+
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+figure_cache = FigureCache()
+
+
+def render_figure(draw, *data, fmt="png", figsize=FIGSIZE, dpi=DPI, cache=None):
+    """
+    Render `draw(ax, *data)` to PNG or SVG bytes, cached by the drawing
+    function and a fingerprint of its data.
+
+    Figures are created with matplotlib.figure.Figure rather than pyplot, so
+    nothing is registered in pyplot's global state and every figure is freed
+    once rendered.
+    """
+    cache = figure_cache if cache is None else cache
+    key = data_fingerprint(draw.__module__, draw.__qualname__, fmt, figsize, dpi, *data)
+    image = cache.get(key)
+    if image is not None:
+        return image
+    fig = Figure(figsize=figsize, dpi=dpi)
+    try:
+        ax = fig.subplots()
+        draw(ax, *data)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt)
+    finally:
+        fig.clear()
+    image = buffer.getvalue()
+    cache.put(key, image)
+    return image
+
+
+def show_figure(draw, *data, fmt="png", **kwargs):
+    """
+    Render (or reuse) a figure and display it.
+    """
+    image = render_figure(draw, *data, fmt=fmt, **kwargs)
+    st.image(image.decode("utf-8") if fmt == "svg" else image, use_container_width=True)
+
+
+def count_spec(x, y="count", title=None):
+    """
+    Vega-Lite bar chart spec for pre-aggregated counts.
+    """
+    return {
+        "title": title,
+        "mark": "bar",
+        "encoding": {
+            "x": {"field": x, "type": "ordinal"},
+            "y": {"field": y, "type": "quantitative"},
+        },
+    }
+
+
+def binned_points(data, x, y, color=None, bins=SCATTER_BINS):
+    """
+    Pre-aggregate a scatter plot onto a bins x bins grid: one row per
+    occupied cell (and color), with its center and point count.
+    """
+    frame = data[[x, y] + ([color] if color else [])].dropna()
+    cells = {}
+    for col in (x, y):
+        edges = np.linspace(frame[col].min(), frame[col].max(), bins + 1)
+        index = np.clip(np.searchsorted(edges, frame[col], side="right") - 1, 0, bins - 1)
+        cells[col] = (edges[index] + edges[np.minimum(index + 1, bins)]) / 2
+    grid = pd.DataFrame(cells, index=frame.index)
+    keys = [x, y] + ([color] if color else [])
+    if color:
+        grid[color] = frame[color].to_numpy()
+    return grid.groupby(keys, observed=True).size().rename("count").reset_index()
+
+
+def scatter_spec(x, y, color=None, title=None):
+    """
+    Vega-Lite spec for binned scatter data from `binned_points`; point size shows density.
+    """
+    encoding = {
+        "x": {"field": x, "type": "quantitative"},
+        "y": {"field": y, "type": "quantitative"},
+        "size": {"field": "count", "type": "quantitative"},
+    }
+    if color:
+        encoding["color"] = {"field": color, "type": "nominal"}
+    return {"title": title, "mark": {"type": "circle", "opacity": 0.7}, "encoding": encoding}
+
+
+def _draw_feature_importance(ax, feature_names, importances):
+    sns.barplot(x=np.asarray(importances), y=np.asarray(feature_names), hue=np.asarray(feature_names),
+                palette="viridis", legend=False, ax=ax)
+    ax.set_xlabel("Importance")
+    ax.set_ylabel("Feature")
+    ax.set_title("Feature Importance")
 
 
 def visualize_feature_importance(feature_names, importances):
     """
     Visualize feature importance as a bar chart.
     """
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=importances, y=feature_names, palette="viridis")
-    plt.xlabel("Importance")
-    plt.ylabel("Feature")
-    plt.title("Feature Importance")
-    st.pyplot(plt)
+    show_figure(_draw_feature_importance, pd.Series(feature_names), pd.Series(importances))
+
+
+def _draw_spending_trends(ax, trends):
+    trends.plot(kind='line', ax=ax)
+    ax.set_title("Spending Trends Over Time")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Total Amount")
 
 
 def plot_spending_trends(trends):
     """
     Plot spending trends over time.
     """
-    plt.figure(figsize=(10, 6))
-    trends.plot(kind='line')
-    plt.title("Spending Trends Over Time")
-    plt.xlabel("Month")
-    plt.ylabel("Total Amount")
-    st.pyplot(plt)
+    show_figure(_draw_spending_trends, trends)
 
 
 
@@ -37,16 +210,63 @@ def filter_transactions_by_cluster(data, cluster_id):
 
 
 
+def _draw_cluster_counts(ax, counts):
+    sns.barplot(x=counts.index.astype(str), y=counts.to_numpy(), hue=counts.index.astype(str),
+                palette="viridis", legend=False, ax=ax)
+    ax.set_title("Transaction Count by Cluster")
+    ax.set_xlabel("Cluster")
+    ax.set_ylabel("Count")
+
+
 def visualize_cluster_data(data):
     """
     Visualize cluster data.
+
+    Counts are computed once in pandas; large inputs are shown as a Vega-Lite
+    chart of the counts instead of a rendered image.
+    """
+    counts = data['Cluster'].value_counts().sort_index()
+    if len(data) >= VEGA_LITE_MIN_ROWS:
+        frame = counts.rename_axis("Cluster").rename("count").reset_index()
+        st.vega_lite_chart(frame, count_spec("Cluster", title="Transaction Count by Cluster"), use_container_width=True)
+    else:
+        show_figure(_draw_cluster_counts, counts)
+
+
+def _draw_cluster_scatter(ax, data):
+    sns.scatterplot(data=data, x='Amount', y='Frequency', hue='Cluster', palette="viridis", ax=ax)
+    ax.set_title("Clusters by Amount and Frequency")
+
+
+def visualize_cluster_scatter(data):
+    """
+    Scatter transactions by amount and frequency, colored by cluster; large
+    inputs are binned server-side and drawn with Vega-Lite.
     """
-    plt.figure(figsize=(10, 6))
-    sns.countplot(data=data, x='Cluster', palette="viridis")
-    plt.title("Transaction Count by Cluster")
-    plt.xlabel("Cluster")
-    plt.ylabel("Count")
-    st.pyplot(plt)
+    if 'Frequency' not in data.columns:
+        return
+    if len(data) >= VEGA_LITE_MIN_ROWS:
+        points = binned_points(data, 'Amount', 'Frequency', 'Cluster')
+        st.vega_lite_chart(points, scatter_spec('Amount', 'Frequency', 'Cluster',
+                                                title="Clusters by Amount and Frequency"),
+                           use_container_width=True)
+    else:
+        show_figure(_draw_cluster_scatter, data[['Amount', 'Frequency', 'Cluster']])
+
+
+def _draw_elbow(ax, inertia):
+    ax.plot(range(1, len(inertia) + 1), inertia, marker='o')
+    ax.set_title("Elbow Method for Optimal Clusters")
+    ax.set_xlabel("Number of Clusters")
+    ax.set_ylabel("Inertia")
+
+
+def plot_elbow(inertia):
+    """
+    Plot KMeans inertia per number of clusters.
+    """
+    show_figure(_draw_elbow, np.asarray(inertia, dtype="float64"))
+
 
 def render_cluster_insights(data):
     """
@@ -55,3 +275,4 @@ def render_cluster_insights(data):
     st.title("Cluster Insights")
     st.write(data.groupby('Cluster')['Amount'].mean())
     visualize_cluster_data(data)
+    visualize_cluster_scatter(data)